@@ -0,0 +1,199 @@
+"""
+Compares the throughput of a sync (WSGI) and an async (ASGI) gunicorn worker
+proxying ESGF Search API requests to a slow fake upstream service.
+
+Each server runs a single worker, which is sent the same number of requests
+with the same number in flight at once. Every request has a distinct query,
+so none is served from the search cache.
+
+Usage (from the backend directory, with DATABASE_URL set):
+    python benchmarks/proxy_workers.py [--requests 200] [--concurrency 100]
+        [--delay 0.1] [--sync-threads 1]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UPSTREAM_BODY = b'{"response": {"numFound": 0, "start": 0, "docs": []}}'
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def handle_upstream_request(reader, writer, delay: float):
+    """Answers keep-alive HTTP requests after a delay, like a slow index."""
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            await asyncio.sleep(delay)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s"
+                % (len(UPSTREAM_BODY), UPSTREAM_BODY)
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def start_upstream(port: int, delay: float):
+    """Serves the fake upstream service from a background thread."""
+    loop = asyncio.new_event_loop()
+
+    async def serve():
+        await asyncio.start_server(
+            lambda reader, writer: handle_upstream_request(
+                reader, writer, delay
+            ),
+            "127.0.0.1",
+            port,
+            backlog=4096,
+        )
+
+    loop.run_until_complete(serve())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+
+def start_server(
+    name: str, port: int, upstream_url: str, sync_threads: int
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": os.environ.get(
+            "DJANGO_SETTINGS_MODULE", "config.settings.local"
+        ),
+        "ESGF_SEARCH_URL": upstream_url,
+        "ESGF_PROXY_ASYNC": str(name == "async"),
+    }
+    command = [
+        "gunicorn",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        "1",
+        "--timeout",
+        "300",
+        "--log-level",
+        "warning",
+    ]
+    if name == "async":
+        command += ["-k", "uvicorn.workers.UvicornWorker", "config.asgi"]
+    else:
+        command += ["--threads", str(sync_threads), "config.wsgi"]
+
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+
+def wait_until_ready(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"The server at {url} did not start")
+
+
+async def run_load(
+    url: str, requests: int, concurrency: int
+) -> Dict[str, float]:
+    """Sends requests with at most 'concurrency' of them in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []  # type: List[float]
+    errors = 0
+
+    async with httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=concurrency), timeout=300
+    ) as client:
+
+        async def send(index: int):
+            nonlocal errors
+            async with semaphore:
+                started_at = time.perf_counter()
+                response = await client.get(
+                    url, params={"project": "CMIP6", "offset": index}
+                )
+                latencies.append(time.perf_counter() - started_at)
+                if response.status_code != 200:
+                    errors += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(send(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.1,
+        help="Seconds that the fake upstream takes to answer",
+    )
+    parser.add_argument(
+        "--sync-threads",
+        type=int,
+        default=1,
+        help="Threads of the sync worker (gunicorn --threads)",
+    )
+    args = parser.parse_args()
+
+    upstream_port = get_free_port()
+    start_upstream(upstream_port, args.delay)
+    upstream_url = f"http://127.0.0.1:{upstream_port}/esg-search/search/"
+
+    print(
+        f"{args.requests} requests, {args.concurrency} in flight, "
+        f"{args.delay * 1000:.0f} ms upstream delay, 1 worker"
+    )
+    print(
+        f"{'worker':<8}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}"
+        f"{'errors':>8}"
+    )
+    for name in ("sync", "async"):
+        port = get_free_port()
+        server = start_server(name, port, upstream_url, args.sync_threads)
+        try:
+            url = f"http://127.0.0.1:{port}/api/v1/proxy/search/"
+            wait_until_ready(url)
+            result = asyncio.run(
+                run_load(url, args.requests, args.concurrency)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(
+            f"{name:<8}{result['throughput']:>10.1f}{result['p50']:>12.0f}"
+            f"{result['p95']:>12.0f}{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
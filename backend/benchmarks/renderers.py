@@ -0,0 +1,102 @@
+"""
+Compares the render time and payload size of the REST API renderers on
+synthetic carts.
+
+Usage (from the backend directory):
+    python benchmarks/renderers.py [--sizes 1000 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from metagrid.core.renderers import (  # noqa: E402
+    MessagePackRenderer,
+    ORJSONRenderer,
+)
+
+RENDERERS = {
+    "json (stock)": JSONRenderer(),
+    "orjson": ORJSONRenderer(),
+    "msgpack": MessagePackRenderer(),
+}
+
+
+def make_search_result(index: int) -> Dict[str, Any]:
+    """Returns a dataset search result shaped like the ESGF Search API's."""
+    instance_id = f"CMIP6.CMIP.NCAR.CESM2.historical.r{index}i1p1f1.Amon.tas.gn.v20190308"
+    return {
+        "id": f"{instance_id}|esgf-data.ucar.edu",
+        "instance_id": instance_id,
+        "master_id": instance_id.rsplit(".", 1)[0],
+        "title": instance_id,
+        "data_node": "esgf-data.ucar.edu",
+        "index_node": "esgf-node.llnl.gov",
+        "project": ["CMIP6"],
+        "source_id": ["CESM2"],
+        "experiment_id": ["historical"],
+        "variable_id": ["tas"],
+        "frequency": ["mon"],
+        "number_of_files": index % 20 + 1,
+        "size": index * 1024 * 1024,
+        "version": "20190308",
+        "replica": index % 3 == 0,
+        "latest": True,
+        "score": 1.0,
+        "url": [
+            f"https://esgf-data.ucar.edu/thredds/catalog/{instance_id}.xml"
+            f"#{instance_id}|application/xml+thredds|THREDDS"
+        ],
+        "access": ["HTTPServer", "GridFTP", "OPENDAP", "Globus"],
+        "citation_url": [
+            f"https://cera-www.dkrz.de/WDCC/meta/CMIP6/{instance_id}.json"
+        ],
+        "further_info_url": [
+            f"https://furtherinfo.es-doc.org/CMIP6.NCAR.CESM2.r{index}"
+        ],
+    }
+
+
+def make_cart(size: int) -> Dict[str, Any]:
+    return {
+        "user": "0d7e8e4e-1e9b-4d8e-9c5e-6a3f2c1b0a9d",
+        "items": [make_search_result(index) for index in range(size)],
+    }
+
+
+def benchmark(sizes: List[int], repeat: int):
+    print(f"{'items':>8} {'renderer':<14} {'ms/render':>10} {'KiB':>10}")
+
+    for size in sizes:
+        cart = make_cart(size)
+        for name, renderer in RENDERERS.items():
+            payload = renderer.render(cart)
+            seconds = min(
+                timeit.repeat(
+                    lambda: renderer.render(cart), number=1, repeat=repeat
+                )
+            )
+            print(
+                f"{size:>8} {name:<14} {seconds * 1000:>10.2f} "
+                f"{len(payload) / 1024:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.repeat)
@@ -0,0 +1,42 @@
+"""
+ASGI config for MetaGrid project.
+
+This module contains the ASGI application used by production ASGI deployments
+(e.g. gunicorn with uvicorn workers). It exposes a module-level variable named
+``application``.
+
+Served through ASGI with ESGF_PROXY_ASYNC set, the views that wait on upstream
+ESGF services run on the worker's event loop, so a single worker holds many
+upstream requests in flight at once (see metagrid.api_proxy.async_views).
+
+Upstream bodies are streamed to clients as they arrive, through the handler
+of metagrid.core.asgi, since Django's own handler only sends the streamed
+responses of async views synchronously.
+
+The other views are sync, and Django runs them in a single thread per worker,
+so a worker serves them one at a time, like a sync worker does. Scale them
+with the number of workers (e.g. WEB_CONCURRENCY). Django also iterates the
+streamed responses of sync views on the event loop, so sync views that would
+stream from upstream services, such as the cart wget script, respond in full
+instead when served through ASGI.
+
+"""
+import os
+import sys
+
+app_path = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+)
+sys.path.append(os.path.join(app_path, ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+from metagrid.core.asgi import get_asgi_application  # noqa: E402
+
+# This application object is used by any ASGI server configured to use this
+# file.
+application = get_asgi_application()
+
+# Loads the Keycloak lookups of logins as each worker starts
+from metagrid.users.adapters import warm_up_in_background  # noqa: E402
+
+warm_up_in_background()
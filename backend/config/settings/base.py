@@ -58,18 +58,21 @@ INSTALLED_APPS = [
     "allauth.socialaccount.providers.keycloak",
     "drf_yasg",
     # Your apps
-    "metagrid.users",
-    "metagrid.projects",
+    "metagrid.users.apps.UsersConfig",
+    "metagrid.projects.apps.ProjectsConfig",
     "metagrid.cart",
     "metagrid.mysites",
+    "metagrid.api_proxy",
+    "metagrid.core",
 ]
 
 # https://docs.djangoproject.com/en/2.0/topics/http/middleware/
 MIDDLEWARE = (
     "django.middleware.security.SecurityMiddleware",
+    "metagrid.core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "metagrid.core.middleware.AsyncWhiteNoiseMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -105,6 +108,32 @@ MANAGERS = ADMINS
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
 
+# CACHES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#caches
+# https://django-environ.readthedocs.io/en/latest/#supported-types
+CACHES = {
+    "default": env.cache("DJANGO_CACHE_URL", default="locmemcache://"),
+    # ESGF Search API results, keyed on the canonical form of the query
+    "esgf_search": env.cache(
+        "ESGF_SEARCH_CACHE_URL", default="locmemcache://esgf-search"
+    ),
+}
+# Bounds the number of cached search results before the least recently
+# used ones are evicted (only applies to the local-memory and database
+# backends, memcached and redis evict on their own)
+CACHES["esgf_search"]["OPTIONS"] = {
+    "MAX_ENTRIES": env.int("ESGF_SEARCH_CACHE_MAX_ENTRIES", default=1000)
+}
+# Compressed bodies of public responses (metagrid.core.middleware), kept
+# apart so that large bodies cannot evict the entries of the default cache
+CACHES["compression"] = env.cache(
+    "COMPRESSION_CACHE_URL", default="locmemcache://compression"
+)
+CACHES["compression"]["OPTIONS"] = {
+    "MAX_ENTRIES": env.int("COMPRESSION_CACHE_MAX_ENTRIES", default=100)
+}
+
 # STATIC
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#static-root
@@ -233,17 +262,26 @@ LOGGING = {
 
 # django-rest-framework - https://www.django-rest-framework.org/api-guide/settings/
 # -------------------------------------------------------------------------------
-DEFAULT_RENDERER_CLASSES = ["rest_framework.renderers.JSONRenderer"]
+DEFAULT_RENDERER_CLASSES = [
+    "metagrid.core.renderers.ORJSONRenderer",
+    "metagrid.core.renderers.MessagePackRenderer",
+]
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": int(env("DJANGO_PAGINATION_LIMIT", default=10)),
     "DATETIME_FORMAT": "%Y-%m-%dT%H:%M:%S%z",
     "DEFAULT_RENDERER_CLASSES": DEFAULT_RENDERER_CLASSES,
+    "DEFAULT_PARSER_CLASSES": [
+        "metagrid.core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated"
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
+        "metagrid.users.authentication.KeycloakTokenAuthentication",
+        "metagrid.users.authentication.CachedJWTCookieAuthentication",
     ),
 }
 
@@ -255,6 +293,21 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
 }
 
+# drf-yasg
+# -------------------------------------------------------------------------------
+# https://drf-yasg.readthedocs.io/en/stable/settings.html
+# The docs load the pre-generated schema (see metagrid.core.schema) instead
+# of having the schema generated for every page view
+SWAGGER_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+# Directory of the schema files written by the 'generate_schema' command
+OPENAPI_SCHEMA_DIR = env(
+    "OPENAPI_SCHEMA_DIR", default=str(ROOT_DIR("openapi"))
+)
+# Seconds that the docs pages are cached for, and that browsers and proxies
+# may reuse the schema for before revalidating it with its ETag
+OPENAPI_SCHEMA_MAX_AGE = env.int("OPENAPI_SCHEMA_MAX_AGE", default=60 * 60)
+
 # django-allauth
 # -------------------------------------------------------------------------------
 # https://django-allauth.readthedocs.io/en/latest/configuration.html
@@ -271,6 +324,18 @@ SOCIALACCOUNT_PROVIDERS = {
 }
 # Used in data migration to register Keycloak social app
 KEYCLOAK_CLIENT_ID = env("KEYCLOAK_CLIENT_ID")
+# Seconds that the signing keys of the Keycloak realm are cached for before
+# being refreshed, and seconds they may still be used for while refreshing
+KEYCLOAK_JWKS_TTL = env.int("KEYCLOAK_JWKS_TTL", default=60 * 60)
+KEYCLOAK_JWKS_STALE_TTL = env.int("KEYCLOAK_JWKS_STALE_TTL", default=24 * 60 * 60)
+# Seconds that requests to Keycloak may take
+KEYCLOAK_TIMEOUT = env.float("KEYCLOAK_TIMEOUT", default=10)
+# Seconds that the Keycloak profile of an access token is cached for at login
+KEYCLOAK_USERINFO_TTL = env.int("KEYCLOAK_USERINFO_TTL", default=5 * 60)
+# Seconds that the SocialApp of a provider is cached for at login, which is
+# also invalidated when the SocialApp changes
+SOCIAL_APP_CACHE_TTL = env.int("SOCIAL_APP_CACHE_TTL", default=60 * 60)
+SOCIALACCOUNT_ADAPTER = "metagrid.users.adapters.SocialAccountAdapter"
 
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_USER_MODEL_USERNAME_FIELD = None
@@ -285,9 +350,120 @@ ACCOUNT_EMAIL_VERIFICATION = "none"
 # https://dj-rest-auth.readthedocs.io/en/latest/index.html
 REST_USE_JWT = True
 JWT_AUTH_COOKIE = "jwt-auth"
+# Seconds that users are cached for when authenticating requests, which
+# bounds how long a deactivated user stays authenticated by processes that do
+# not share the cache of the process that deactivated it (0 disables caching)
+USER_CACHE_TTL = env.int("USER_CACHE_TTL", default=60)
 
 # django-cors-headers
 # -------------------------------------------------------------------------------
 # https://github.com/adamchainz/django-cors-headers#setup
 CORS_ORIGIN_ALLOW_ALL = False
 CORS_ORIGIN_WHITELIST = env.list("CORS_ORIGIN_WHITELIST")
+
+# Response compression (metagrid.core.middleware)
+# -------------------------------------------------------------------------------
+# Responses smaller than this number of bytes are not compressed
+COMPRESSION_MIN_SIZE = env.int("COMPRESSION_MIN_SIZE", default=1024)
+# Seconds that compressed response bodies are cached for
+COMPRESSION_CACHE_TTL = env.int("COMPRESSION_CACHE_TTL", default=60 * 60)
+# Brotli quality from 0 to 11, which trades compression speed for size
+COMPRESSION_BROTLI_QUALITY = env.int("COMPRESSION_BROTLI_QUALITY", default=5)
+
+# Project catalogue (metagrid.projects)
+# -------------------------------------------------------------------------------
+# Seconds that the precomputed project catalogue is cached for. Changes
+# invalidate it right away, so this only bounds how stale the catalogue can
+# get when each worker process has its own cache (e.g. local-memory caching).
+PROJECTS_CATALOGUE_CACHE_TTL = env.int(
+    "PROJECTS_CATALOGUE_CACHE_TTL", default=60 * 60
+)
+# Seconds that browsers and proxies may reuse the projects API responses
+# before revalidating them with their ETag
+PROJECTS_CATALOGUE_MAX_AGE = env.int("PROJECTS_CATALOGUE_MAX_AGE", default=300)
+
+# ESGF services
+# -------------------------------------------------------------------------------
+# https://esgf.github.io/esg-search/ESGF_Search_RESTful_API.html
+ESGF_SEARCH_URL = env(
+    "ESGF_SEARCH_URL", default="https://esgf-node.llnl.gov/esg-search/search/"
+)
+# https://github.com/ESGF/esgf-wget
+ESGF_WGET_URL = env(
+    "ESGF_WGET_URL", default="https://esgf-node.llnl.gov/esg-search/wget"
+)
+# https://github.com/ESGF/esgf-utils/blob/master/node_status/query_prom.py
+ESGF_NODE_STATUS_URL = env(
+    "ESGF_NODE_STATUS_URL",
+    default="https://aims4.llnl.gov/prometheus/api/v1/query?query=probe_success%7Bjob%3D%22http_2xx%22%2C+target%3D~%22.%2Athredds.%2A%22%7D",
+)
+
+# ESGF proxy (metagrid.api_proxy)
+# -------------------------------------------------------------------------------
+# Hosts the proxy may contact in addition to the hosts of the ESGF service
+# URLs above, such as the citation services linked in search results.
+ESGF_PROXY_ALLOWED_HOSTS = env.list(
+    "ESGF_PROXY_ALLOWED_HOSTS", default=["cera-www.dkrz.de"]
+)
+# Number of keep-alive connections kept open per upstream host
+ESGF_PROXY_POOL_MAXSIZE = env.int("ESGF_PROXY_POOL_MAXSIZE", default=10)
+# Serves the upstream-bound proxy views asynchronously, for deployments
+# through config.asgi (e.g. gunicorn -k uvicorn.workers.UvicornWorker)
+ESGF_PROXY_ASYNC = env.bool("ESGF_PROXY_ASYNC", default=False)
+# Upstream requests that an async worker may have in flight at once
+ESGF_PROXY_ASYNC_MAX_CONNECTIONS = env.int(
+    "ESGF_PROXY_ASYNC_MAX_CONNECTIONS", default=500
+)
+# Seconds to wait for an upstream service to connect and to send data
+ESGF_PROXY_TIMEOUT = env.float("ESGF_PROXY_TIMEOUT", default=30)
+# Seconds that ESGF Search API results are cached for, which can be set per
+# project with the value of the 'project' query parameter
+# (e.g. ESGF_SEARCH_CACHE_PROJECT_TTLS=CMIP6=3600;CMIP5=86400)
+ESGF_SEARCH_CACHE_TTL = env.int("ESGF_SEARCH_CACHE_TTL", default=300)
+ESGF_SEARCH_CACHE_PROJECT_TTLS = env.dict(
+    "ESGF_SEARCH_CACHE_PROJECT_TTLS", cast={"value": int}, default={}
+)
+# Search results larger than this number of bytes are not cached
+ESGF_SEARCH_CACHE_MAX_BYTES = env.int(
+    "ESGF_SEARCH_CACHE_MAX_BYTES", default=2 * 1024 * 1024
+)
+# Seconds before cached facet counts are refreshed in the background, and
+# seconds that they keep being served for while they are refreshed
+ESGF_FACET_COUNTS_TTL = env.int("ESGF_FACET_COUNTS_TTL", default=10 * 60)
+ESGF_FACET_COUNTS_STALE_TTL = env.int(
+    "ESGF_FACET_COUNTS_STALE_TTL", default=60 * 60
+)
+# Fraction of the TTL that expiry times are randomized by
+ESGF_FACET_COUNTS_TTL_JITTER = env.float(
+    "ESGF_FACET_COUNTS_TTL_JITTER", default=0.1
+)
+# Number of files fetched per page while generating the wget script of a cart
+ESGF_WGET_PAGE_SIZE = env.int("ESGF_WGET_PAGE_SIZE", default=1000)
+# Search URLs of the index nodes that federated searches are sent to
+ESGF_FEDERATED_INDEX_NODES = env.list(
+    "ESGF_FEDERATED_INDEX_NODES",
+    default=[
+        "https://esgf-node.llnl.gov/esg-search/search/",
+        "https://esgf-data.dkrz.de/esg-search/search/",
+        "https://esgf-index1.ceda.ac.uk/esg-search/search/",
+        "https://esgf-node.ipsl.upmc.fr/esg-search/search/",
+    ],
+)
+# Seconds that a federated search waits for the index nodes at most, and
+# seconds that the slower nodes get once the first node has answered
+ESGF_FEDERATED_SEARCH_DEADLINE = env.float(
+    "ESGF_FEDERATED_SEARCH_DEADLINE", default=10
+)
+ESGF_FEDERATED_SEARCH_GRACE_PERIOD = env.float(
+    "ESGF_FEDERATED_SEARCH_GRACE_PERIOD", default=1
+)
+# Seconds that fetched citations are stored for before being fetched again
+ESGF_CITATION_TTL = env.int("ESGF_CITATION_TTL", default=30 * 24 * 60 * 60)
+# Seconds between polls of the node status API
+ESGF_NODE_STATUS_POLL_INTERVAL = env.int(
+    "ESGF_NODE_STATUS_POLL_INTERVAL", default=60
+)
+# Days that changes of the node status are kept for
+ESGF_NODE_STATUS_HISTORY_DAYS = env.int(
+    "ESGF_NODE_STATUS_HISTORY_DAYS", default=30
+)
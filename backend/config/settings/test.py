@@ -24,7 +24,15 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "",
-    }
+    },
+    "esgf_search": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "esgf-search",
+    },
+    "compression": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "compression",
+    },
 }
 
 # PASSWORDS
@@ -34,6 +42,8 @@ PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
+# The loaders include the app directories, which APP_DIRS may not also set
+TEMPLATES[0]["APP_DIRS"] = False  # type: ignore # noqa F405
 TEMPLATES[0]["OPTIONS"]["loaders"] = [  # type: ignore # noqa F405
     (
         "django.template.loaders.cached.Loader",
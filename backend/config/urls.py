@@ -1,19 +1,28 @@
-from allauth.socialaccount.providers.keycloak.views import (
-    KeycloakOAuth2Adapter,
-)
 from dj_rest_auth.registration.views import SocialLoginView, VerifyEmailView
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path, re_path, reverse_lazy
 from django.views.generic.base import RedirectView
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
+from drf_yasg.views import UI_RENDERERS
 from rest_framework.routers import DefaultRouter
 
+from metagrid.api_proxy.async_views import ASYNC_VIEWS
+from metagrid.api_proxy.views import (
+    CitationProxyView,
+    CitationsView,
+    FederatedSearchView,
+    NodeStatusHistoryView,
+    NodeStatusProxyView,
+    NodeStatusView,
+    SearchProxyView,
+    WgetProxyView,
+)
 from metagrid.cart.views import CartViewSet, SearchViewSet
+from metagrid.core.schema import schema_view
+from metagrid.core.views import schema_file_view
 from metagrid.projects.views import ProjectsViewSet
+from metagrid.users.adapters import CachedKeycloakOAuth2Adapter, log_duration
 from metagrid.users.views import UserCreateViewSet, UserViewSet
 
 router = DefaultRouter()
@@ -29,12 +38,58 @@ class KeycloakLogin(SocialLoginView):
     https://dj-rest-auth.readthedocs.io/en/latest/installation.html#social-authentication-optional
     """
 
-    adapter_class = KeycloakOAuth2Adapter
+    adapter_class = CachedKeycloakOAuth2Adapter
+
+    def post(self, request, *args, **kwargs):
+        with log_duration("login"):
+            return super().post(request, *args, **kwargs)
+
+
+def proxy_path(route: str, view, name: str):
+    """Routes to the async version of a proxy view if ESGF_PROXY_ASYNC is set."""
+    if settings.ESGF_PROXY_ASYNC and name in ASYNC_VIEWS:
+        view = ASYNC_VIEWS[name]
+    return path(route, view, name=name)
 
 
 urlpatterns = [
     path(settings.ADMIN_URL, admin.site.urls),
     path("api/v1/", include(router.urls)),
+    # ESGF services proxied through pooled upstream connections
+    proxy_path(
+        "api/v1/proxy/search/", SearchProxyView.as_view(), name="proxy-search"
+    ),
+    path(
+        "api/v1/proxy/search/federated/",
+        FederatedSearchView.as_view(),
+        name="proxy-search-federated",
+    ),
+    proxy_path(
+        "api/v1/proxy/citation/",
+        CitationProxyView.as_view(),
+        name="proxy-citation",
+    ),
+    proxy_path(
+        "api/v1/proxy/citations/",
+        CitationsView.as_view(),
+        name="proxy-citations",
+    ),
+    proxy_path(
+        "api/v1/proxy/wget/", WgetProxyView.as_view(), name="proxy-wget"
+    ),
+    proxy_path(
+        "api/v1/proxy/status/",
+        NodeStatusProxyView.as_view(),
+        name="proxy-status",
+    ),
+    proxy_path(
+        "api/v1/status/nodes/", NodeStatusView.as_view(), name="node-status"
+    ),
+    path(
+        "api/v1/status/nodes/history/",
+        NodeStatusHistoryView.as_view(),
+        name="node-status-history",
+    ),
     # the 'api-root' from django rest-frameworks default router
     # http://www.django-rest-framework.org/api-guide/routers/#defaultrouter
     re_path(
@@ -60,35 +115,28 @@ urlpatterns = [
     ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
-# drf-yasg configuration
+# drf-yasg docs, which load the pre-generated schema
 # https://drf-yasg.readthedocs.io/en/stable/readme.html#quickstart
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Snippets API",
-        default_version="v1",
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
 urlpatterns += [
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        schema_file_view,
         name="schema-json",
     ),
     re_path(
         r"^swagger/$",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        schema_view.as_cached_view(
+            settings.OPENAPI_SCHEMA_MAX_AGE,
+            renderer_classes=UI_RENDERERS["swagger"],
+        ),
         name="schema-swagger-ui",
     ),
     re_path(
         r"^redoc/$",
-        schema_view.with_ui("redoc", cache_timeout=0),
+        schema_view.as_cached_view(
+            settings.OPENAPI_SCHEMA_MAX_AGE,
+            renderer_classes=UI_RENDERERS["redoc"],
+        ),
         name="schema-redoc",
     ),
 ]
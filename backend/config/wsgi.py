@@ -32,6 +32,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
 application = get_wsgi_application()
+
+# Loads the Keycloak lookups of logins as each worker starts
+from metagrid.users.adapters import warm_up_in_background  # noqa: E402
+
+warm_up_in_background()
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from metagrid.api_proxy.models import Citation, NodeStatusTransition
+
+
+@admin.register(Citation)
+class CitationAdmin(admin.ModelAdmin):
+    list_display = ("doi", "url", "fetched_at")
+    search_fields = ("doi", "url")
+
+
+@admin.register(NodeStatusTransition)
+class NodeStatusTransitionAdmin(admin.ModelAdmin):
+    list_display = ("node", "is_online", "changed_at")
+    list_filter = ("node", "is_online")
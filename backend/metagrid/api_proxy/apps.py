@@ -0,0 +1,5 @@
+from django.apps import AppConfig
+
+
+class ApiProxyConfig(AppConfig):
+    name = "metagrid.api_proxy"
@@ -0,0 +1,208 @@
+"""
+Async versions of the views that wait on upstream ESGF services.
+
+Served through config.asgi, a worker holds every in-flight upstream request
+on its event loop instead of tying up a thread (or a whole sync worker) for
+each, so slow upstream services no longer exhaust the workers. They replace
+the DRF views of the same URLs when ESGF_PROXY_ASYNC is set, since DRF
+views cannot be async. Responses and errors match those of the DRF views.
+
+Upstream bodies are streamed to the client as they arrive, as
+AsyncStreamingHttpResponse, which the ASGI handler of metagrid.core.asgi
+sends without blocking the event loop. The caches are read in place, which
+is quick next to an upstream request, and the database in a thread.
+ATOMIC_REQUESTS cannot wrap async views, so they opt out of it.
+"""
+from typing import Any, Optional
+
+import httpx
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.http.response import HttpResponseBase
+from rest_framework import exceptions, status
+
+from metagrid.api_proxy.cache import async_cache_stream, get_cached_result
+from metagrid.api_proxy.citations import async_get_citations
+from metagrid.api_proxy.exceptions import UpstreamTimeout, UpstreamUnavailable
+from metagrid.api_proxy.node_status import async_refresh_snapshot, get_snapshot
+from metagrid.api_proxy.query import canonicalize_query
+from metagrid.api_proxy.serializers import CitationsSerializer
+from metagrid.api_proxy.upstream import (
+    UpstreamHostNotAllowed,
+    aiter_response,
+    async_open,
+)
+from metagrid.api_proxy.views import PASSTHROUGH_HEADERS
+from metagrid.core.asgi import AsyncStreamingHttpResponse
+from metagrid.core.renderers import ORJSONRenderer
+
+_renderer = ORJSONRenderer()
+
+
+def render(data: Any, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    """Renders JSON the way the DRF views do."""
+    return HttpResponse(
+        _renderer.render(data),
+        status=status_code,
+        content_type=_renderer.media_type,
+    )
+
+
+def render_exception(exception: exceptions.APIException) -> HttpResponse:
+    return render({"detail": exception.detail}, exception.status_code)
+
+
+async def proxy(url: str, query_string: Optional[str]) -> HttpResponseBase:
+    """Streams the response of an upstream ESGF service to the client."""
+    if query_string:
+        separator = "&" if "?" in url else "?"
+        url = f"{url}{separator}{query_string}"
+
+    try:
+        upstream_response = await async_open(url)
+    except UpstreamHostNotAllowed as e:
+        return render_exception(exceptions.PermissionDenied(str(e)))
+    except httpx.TimeoutException:
+        return render_exception(UpstreamTimeout())
+    except httpx.RequestError:
+        return render_exception(UpstreamUnavailable())
+
+    response = AsyncStreamingHttpResponse(
+        aiter_response(upstream_response),
+        status=upstream_response.status_code,
+        content_type=upstream_response.headers.get("Content-Type"),
+    )
+    for header in PASSTHROUGH_HEADERS:
+        if header in upstream_response.headers:
+            response[header] = upstream_response.headers[header]
+
+    return response
+
+
+@transaction.non_atomic_requests
+async def search_proxy(request):
+    """Async version of SearchProxyView."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    canonical_query = canonicalize_query(request.META.get("QUERY_STRING"))
+
+    cached_result = get_cached_result(canonical_query)
+    if cached_result is not None:
+        content_type, body = cached_result
+        response = HttpResponse(
+            body, content_type=content_type
+        )  # type: HttpResponseBase
+        response["X-Cache"] = "HIT"
+        return response
+
+    response = await proxy(settings.ESGF_SEARCH_URL, canonical_query)
+    response["X-Cache"] = "MISS"
+    if isinstance(response, AsyncStreamingHttpResponse) and (
+        response.status_code == status.HTTP_200_OK
+    ):
+        response.async_streaming_content = async_cache_stream(
+            canonical_query,
+            response.get("Content-Type"),
+            response.async_streaming_content,
+        )
+    return response
+
+
+@transaction.non_atomic_requests
+async def wget_proxy(request):
+    """Async version of WgetProxyView."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    return await proxy(
+        settings.ESGF_WGET_URL, request.META.get("QUERY_STRING")
+    )
+
+
+@transaction.non_atomic_requests
+async def citation_proxy(request):
+    """Async version of CitationProxyView."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    citation_url = request.GET.get("citurl")
+    if not citation_url:
+        return render(
+            {"citurl": ["This query parameter is required."]},
+            status.HTTP_400_BAD_REQUEST,
+        )
+    return await proxy(citation_url, None)
+
+
+@transaction.non_atomic_requests
+async def node_status_proxy(request):
+    """Async version of NodeStatusProxyView."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    snapshot = await sync_to_async(get_snapshot)()
+    if snapshot is not None:
+        return render(snapshot["raw"])
+    return await proxy(settings.ESGF_NODE_STATUS_URL, None)
+
+
+@transaction.non_atomic_requests
+async def node_status(request):
+    """Async version of NodeStatusView."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    snapshot = await sync_to_async(get_snapshot)()
+    if snapshot is None:
+        try:
+            snapshot = await async_refresh_snapshot()
+        except httpx.TimeoutException:
+            return render_exception(UpstreamTimeout())
+        except (httpx.HTTPError, ValueError, KeyError):
+            return render_exception(UpstreamUnavailable())
+
+    return render(
+        {"polled_at": snapshot["polled_at"], "nodes": snapshot["nodes"]}
+    )
+
+
+@transaction.non_atomic_requests
+async def citations_proxy(request):
+    """Async version of CitationsView."""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = orjson.loads(request.body)
+    except orjson.JSONDecodeError as e:
+        return render_exception(
+            exceptions.ParseError(f"JSON parse error - {e}")
+        )
+
+    serializer = CitationsSerializer(data=data)
+    if not serializer.is_valid():
+        return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    citations, errors = await async_get_citations(
+        list(dict.fromkeys(serializer.validated_data["citation_urls"]))
+    )
+    return render({"citations": citations, "errors": errors})
+
+
+# Like the DRF views, the proxy views authenticate no one, so they need no
+# CSRF protection. csrf_exempt cannot wrap async views in this Django version.
+citations_proxy.csrf_exempt = True  # type: ignore
+
+# The async views by the names of the URLs that they serve
+ASYNC_VIEWS = {
+    "proxy-search": search_proxy,
+    "proxy-wget": wget_proxy,
+    "proxy-status": node_status_proxy,
+    "proxy-citation": citation_proxy,
+    "proxy-citations": citations_proxy,
+    "node-status": node_status,
+}
@@ -0,0 +1,97 @@
+"""
+Cache of ESGF Search API results, keyed on the canonical form of the query.
+"""
+import hashlib
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+from django.conf import settings
+from django.core.cache import caches
+
+from metagrid.api_proxy.query import parse_query
+
+CACHE_ALIAS = "esgf_search"
+
+# (content type, body) of a cached search result
+CachedResult = Tuple[Optional[str], bytes]
+
+
+def get_cache_key(canonical_query: str) -> str:
+    digest = hashlib.sha256(canonical_query.encode()).hexdigest()
+    return f"esgf_search:{digest}"
+
+
+def get_cache_ttl(canonical_query: str) -> int:
+    """Returns the number of seconds to cache the result of a query.
+
+    Queries that constrain a single project use that project's TTL if one
+    is configured.
+    """
+    projects = parse_query(canonical_query).get("project", [])
+    if len(projects) == 1:
+        return settings.ESGF_SEARCH_CACHE_PROJECT_TTLS.get(
+            projects[0], settings.ESGF_SEARCH_CACHE_TTL
+        )
+    return settings.ESGF_SEARCH_CACHE_TTL
+
+
+def get_cached_result(canonical_query: str) -> Optional[CachedResult]:
+    return caches[CACHE_ALIAS].get(get_cache_key(canonical_query))
+
+
+def set_cached_result(canonical_query: str, result: CachedResult):
+    ttl = get_cache_ttl(canonical_query)
+    if ttl > 0:
+        caches[CACHE_ALIAS].set(get_cache_key(canonical_query), result, ttl)
+
+
+def cache_stream(
+    canonical_query: str,
+    content_type: Optional[str],
+    chunks: Iterable[bytes],
+) -> Iterator[bytes]:
+    """Yields the chunks of a result and caches them once fully streamed.
+
+    The chunks are passed through as they arrive, so the client is not kept
+    waiting on the cache. Results that are only partially read (e.g. the
+    client disconnected) or larger than ESGF_SEARCH_CACHE_MAX_BYTES are not
+    cached.
+    """
+    body = bytearray()  # type: Optional[bytearray]
+    max_bytes = settings.ESGF_SEARCH_CACHE_MAX_BYTES
+
+    for chunk in chunks:
+        if body is not None:
+            body += chunk
+            if len(body) > max_bytes:
+                body = None
+        yield chunk
+
+    if body is not None:
+        set_cached_result(canonical_query, (content_type, bytes(body)))
+
+
+async def async_cache_stream(
+    canonical_query: str,
+    content_type: Optional[str],
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[bytes]:
+    """Async version of ``cache_stream``."""
+    body = bytearray()  # type: Optional[bytearray]
+    max_bytes = settings.ESGF_SEARCH_CACHE_MAX_BYTES
+
+    async for chunk in chunks:
+        if body is not None:
+            body += chunk
+            if len(body) > max_bytes:
+                body = None
+        yield chunk
+
+    if body is not None:
+        set_cached_result(canonical_query, (content_type, bytes(body)))
@@ -0,0 +1,216 @@
+"""
+Citations of datasets, fetched from their citation URLs.
+
+Citations almost never change, so they are stored in the database and only
+fetched again once they are older than ESGF_CITATION_TTL. Citations that are
+missing are fetched concurrently, at most MAX_CONCURRENT_FETCHES at once,
+through a shared pool or through the async client of the event loop by
+``async_get_citations``.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Any, Dict, List, Set, Tuple
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from metagrid.api_proxy.models import Citation
+from metagrid.api_proxy.upstream import (
+    UpstreamHostNotAllowed,
+    async_fetch,
+    fetch,
+)
+
+# Citations that are fetched at once, which bounds the requests sent to the
+# citation services
+MAX_CONCURRENT_FETCHES = 8
+
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_FETCHES, thread_name_prefix="citation"
+)
+
+# Errors of fetching a citation that are reported instead of raised
+FETCH_ERRORS = (
+    UpstreamHostNotAllowed,
+    requests.RequestException,
+    httpx.HTTPError,
+    ValueError,
+    KeyError,
+    TypeError,
+)
+
+# (citations keyed by URL, errors keyed by URL)
+Citations = Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]
+
+
+def process_citation(citation: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds the DOI URL and the list of creators to a citation.
+
+    This is the processing that the frontend applies to citations, e.g.
+    {"identifier": {"id": "10.22033/ESGF/CMIP6.1234",
+    "identifierType": "DOI"}} gets the "identifierDOI"
+    "http://doi.org/10.22033/ESGF/CMIP6.1234".
+    """
+    identifier = citation["identifier"]
+    return {
+        **citation,
+        "identifierDOI": (
+            f"http://{identifier['identifierType'].lower()}.org/"
+            f"{identifier['id']}"
+        ),
+        "creatorsList": "; ".join(
+            creator["creatorName"] for creator in citation["creators"]
+        ),
+    }
+
+
+def fetch_citation(url: str) -> Dict[str, Any]:
+    """Fetches and processes the citation at a citation URL."""
+    response = fetch(url)
+
+    try:
+        response.raise_for_status()
+        return process_citation(response.json())
+    finally:
+        response.close()
+
+
+async def async_fetch_citation(url: str) -> Dict[str, Any]:
+    """Fetches and processes a citation through the async client."""
+    response = await async_fetch(url)
+    response.raise_for_status()
+    return process_citation(response.json())
+
+
+def describe_error(error: Exception) -> str:
+    if isinstance(error, UpstreamHostNotAllowed):
+        return str(error)
+    if isinstance(error, (requests.RequestException, httpx.HTTPError)):
+        return f"The citation service is unavailable: {error}"
+    return "The citation service returned an invalid citation."
+
+
+def get_citations(urls: List[str]) -> Citations:
+    """Returns the citations at citation URLs, fetching the missing ones.
+
+    Citations that cannot be fetched again are served stale if they were
+    stored before.
+
+    :returns: The citations keyed by URL, and the errors of the URLs whose
+        citation could not be fetched
+    """
+    stored, missing = get_stored_citations(urls)
+
+    futures = {_executor.submit(fetch_citation, url): url for url in missing}
+    fetched = {}  # type: Dict[str, Dict[str, Any]]
+    errors = {}  # type: Dict[str, str]
+
+    for future in as_completed(futures):
+        url = futures[future]
+        try:
+            fetched[url] = future.result()
+        except FETCH_ERRORS as e:
+            errors[url] = describe_error(e)
+
+    return merge_citations(urls, stored, fetched, errors)
+
+
+async def async_get_citations(urls: List[str]) -> Citations:
+    """Returns the citations at citation URLs, like ``get_citations``.
+
+    The missing citations are fetched concurrently on the event loop, and
+    the database is queried in a thread.
+    """
+    stored, missing = await sync_to_async(get_stored_citations)(urls)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    async def fetch_citation(url: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await async_fetch_citation(url)
+
+    missing_urls = list(missing)
+    results = await asyncio.gather(
+        *(fetch_citation(url) for url in missing_urls),
+        return_exceptions=True,
+    )
+    fetched = {}  # type: Dict[str, Dict[str, Any]]
+    errors = {}  # type: Dict[str, str]
+
+    for url, result in zip(missing_urls, results):
+        if isinstance(result, FETCH_ERRORS):
+            errors[url] = describe_error(result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            fetched[url] = result
+
+    return await sync_to_async(merge_citations)(urls, stored, fetched, errors)
+
+
+def get_stored_citations(
+    urls: List[str],
+) -> Tuple[Dict[str, Citation], Set[str]]:
+    """Returns the stored citations of URLs, and the URLs to fetch."""
+    stored = {
+        citation.url: citation
+        for citation in Citation.objects.filter(url__in=urls)
+    }
+    expired_before = timezone.now() - timedelta(
+        seconds=settings.ESGF_CITATION_TTL
+    )
+    missing = {
+        url
+        for url in urls
+        if url not in stored or stored[url].fetched_at < expired_before
+    }
+    return stored, missing
+
+
+def merge_citations(
+    urls: List[str],
+    stored: Dict[str, Citation],
+    fetched: Dict[str, Dict[str, Any]],
+    errors: Dict[str, str],
+) -> Citations:
+    """Stores the fetched citations and merges them with the stored ones."""
+    save_citations(fetched, stored)
+
+    citations = {
+        url: fetched[url] if url in fetched else stored[url].data
+        for url in urls
+        if url in fetched or url in stored
+    }
+    return citations, {
+        url: error for url, error in errors.items() if url not in citations
+    }
+
+
+def save_citations(
+    fetched: Dict[str, Dict[str, Any]], stored: Dict[str, Citation]
+):
+    """Stores fetched citations, replacing the stored ones they refresh."""
+    now = timezone.now()
+    new_citations = []
+    refreshed_citations = []
+
+    for url, data in fetched.items():
+        citation = stored.get(url) or Citation(url=url)
+        citation.doi = data["identifier"]["id"]
+        citation.data = data
+        citation.fetched_at = now
+        if citation.pk is None:
+            new_citations.append(citation)
+        else:
+            refreshed_citations.append(citation)
+
+    # Citations stored by concurrent requests in the meantime are kept
+    with transaction.atomic():
+        Citation.objects.bulk_create(new_citations, ignore_conflicts=True)
+        Citation.objects.bulk_update(
+            refreshed_citations, ["doi", "data", "fetched_at"]
+        )
@@ -0,0 +1,13 @@
+from rest_framework import exceptions, status
+
+
+class UpstreamUnavailable(exceptions.APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "The upstream ESGF service could not be reached."
+    default_code = "upstream_unavailable"
+
+
+class UpstreamTimeout(exceptions.APIException):
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = "The upstream ESGF service did not respond in time."
+    default_code = "upstream_timeout"
@@ -0,0 +1,79 @@
+"""
+Facet value counts of projects, fetched from the ESGF Search API.
+"""
+import hashlib
+from functools import partial
+from typing import Any, Dict, Iterable, Tuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from metagrid.api_proxy.cache import CACHE_ALIAS
+from metagrid.api_proxy.query import canonicalize_query, parse_query
+from metagrid.api_proxy.upstream import fetch
+from metagrid.core.swr import get_or_refresh
+
+# Parameters that the active facet filters cannot set, besides those of the
+# facets URL: the API's own and those that shape the response of this API
+RESERVED_PARAMS = frozenset(
+    (
+        "compact",
+        "expand",
+        "facets",
+        "fields",
+        "format",
+        "limit",
+        "offset",
+        "omit",
+        "type",
+    )
+)
+
+
+def get_facet_counts_query(
+    facets_url: str, filters: Iterable[Tuple[str, str]]
+) -> str:
+    """Returns the canonical query for the facet counts of a project.
+
+    Filters on reserved params, or on params of the facets URL (such as the
+    'project' that selects the project), are ignored.
+
+    :param facets_url: The URL query string of the project's facets
+    :param filters: The active facets as (facet, value) pairs
+    """
+    reserved_params = RESERVED_PARAMS.union(parse_query(facets_url))
+    filter_params = urlencode(
+        [(key, value) for key, value in filters if key not in reserved_params]
+    )
+    return canonicalize_query(f"{facets_url}&{filter_params}")
+
+
+def fetch_facet_counts(canonical_query: str) -> Dict[str, Any]:
+    """Fetches the facet counts of a query from the ESGF Search API."""
+    separator = "&" if "?" in settings.ESGF_SEARCH_URL else "?"
+    response = fetch(f"{settings.ESGF_SEARCH_URL}{separator}{canonical_query}")
+
+    try:
+        response.raise_for_status()
+        results = response.json()
+    finally:
+        response.close()
+
+    return {
+        "num_found": results["response"]["numFound"],
+        "facet_fields": results["facet_counts"]["facet_fields"],
+    }
+
+
+def get_facet_counts(canonical_query: str) -> Dict[str, Any]:
+    """Returns the facet counts of a query, served stale while refreshed."""
+    digest = hashlib.sha256(canonical_query.encode()).hexdigest()
+
+    return get_or_refresh(
+        CACHE_ALIAS,
+        f"facet_counts:{digest}",
+        partial(fetch_facet_counts, canonical_query),
+        ttl=settings.ESGF_FACET_COUNTS_TTL,
+        stale_ttl=settings.ESGF_FACET_COUNTS_STALE_TTL,
+        jitter=settings.ESGF_FACET_COUNTS_TTL_JITTER,
+    )
@@ -0,0 +1,265 @@
+"""
+Federated search across multiple ESGF index nodes.
+
+The same canonical query is sent to every configured index node at once,
+each with 'distrib=false' so that nodes do not fan it out again themselves.
+Once the first node answers, the others get a short grace period to catch
+up, so the latency of a search is set by the fastest healthy node instead of
+the slowest one. Nodes that miss it are reported as timed out and their
+results are left out.
+
+Nodes are fetched from through a shared pool of at most
+MAX_CONCURRENT_FETCHES threads, which bounds the threads held by slow nodes
+however many searches run at once. The deadline is measured on the wall
+clock from when the nodes are queried, so fetches that are still queued when
+it passes are cancelled rather than delaying the search.
+
+Every node is asked for 'limit' datasets, and their results are interleaved
+(the first dataset of every node, then the second, ...) before being cut
+down to 'limit', so that every node that answered is represented. Paging
+would need the results of every node up to the page, so 'offset' is
+rejected.
+https://esgf.github.io/esg-search/ESGF_Search_RESTful_API.html
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain, zip_longest
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from metagrid.api_proxy.query import encode_query, parse_query
+from metagrid.api_proxy.upstream import fetch
+
+# Parameters that every node query is sent with, overriding the client's
+FORCED_PARAMS = {"distrib": "false", "format": "application/solr+json"}
+
+# Datasets returned when the query does not set 'limit', as the ESGF Search
+# API does
+DEFAULT_LIMIT = 10
+
+# Nodes that are fetched from at once, across all searches
+MAX_CONCURRENT_FETCHES = 32
+
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_FETCHES, thread_name_prefix="federation"
+)
+
+
+class InvalidFederatedQuery(ValueError):
+    """Raised when a query cannot be searched across index nodes."""
+
+    def __init__(self, param: str, message: str):
+        super().__init__(message)
+        self.param = param
+
+
+def get_limit(params: Dict[str, List[str]]) -> int:
+    """Returns the number of datasets that a federated search returns.
+
+    :raises InvalidFederatedQuery: If the query asks for a page after the
+        first one, or for an invalid number of datasets
+    """
+    if params.get("offset", ["0"]) != ["0"]:
+        raise InvalidFederatedQuery(
+            "offset",
+            "Federated searches only return the first page of results.",
+        )
+
+    try:
+        limit = int(params.get("limit", [str(DEFAULT_LIMIT)])[0])
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise InvalidFederatedQuery("limit", "Must be a positive integer.")
+    return limit
+
+
+def get_node_query(canonical_query: str) -> str:
+    """Returns the query string that is sent to each index node."""
+    params = parse_query(canonical_query)
+    params.pop("offset", None)
+    params.update({key: [value] for key, value in FORCED_PARAMS.items()})
+
+    return encode_query(dict(sorted(params.items())))
+
+
+def fetch_node_results(node_url: str, query_string: str) -> Dict[str, Any]:
+    """Fetches the Solr JSON results of a query from a single index node."""
+    separator = "&" if "?" in node_url else "?"
+    response = fetch(
+        f"{node_url}{separator}{query_string}",
+        timeout=settings.ESGF_FEDERATED_SEARCH_DEADLINE,
+    )
+
+    try:
+        response.raise_for_status()
+        return response.json()
+    finally:
+        response.close()
+
+
+def merge_docs(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merges dataset docs by 'instance_id', collapsing replicas.
+
+    The original copy of a dataset is kept over its replicas, and the data
+    nodes of all copies are listed in its 'data_nodes'. Datasets keep the
+    order in which they were first seen. Docs without an id cannot be told
+    apart, so they are left out.
+    """
+    merged = {}  # type: Dict[str, Dict[str, Any]]
+    data_nodes = {}  # type: Dict[str, List[str]]
+
+    for doc in docs:
+        instance_id = doc.get("instance_id") or doc.get("id")
+        if not isinstance(instance_id, str):
+            continue
+        data_node = doc.get("data_node")
+
+        nodes = data_nodes.setdefault(instance_id, [])
+        if data_node and data_node not in nodes:
+            nodes.append(data_node)
+
+        kept_doc = merged.get(instance_id)
+        if kept_doc is None or (
+            kept_doc.get("replica") and not doc.get("replica")
+        ):
+            # Replaces the kept doc without changing the dataset's position
+            merged[instance_id] = doc
+
+    return [
+        {**doc, "data_nodes": data_nodes[instance_id]}
+        for instance_id, doc in merged.items()
+    ]
+
+
+def merge_facet_fields(
+    facet_fields: List[Dict[str, List[Any]]]
+) -> Dict[str, List[Any]]:
+    """Sums the facet counts of multiple nodes.
+
+    Solr lists facet counts as flat [value, count, value, count, ...] lists.
+    """
+    counts = {}  # type: Dict[str, Dict[str, int]]
+
+    for fields in facet_fields:
+        for facet, values in fields.items():
+            facet_counts = counts.setdefault(facet, {})
+            for value, count in zip(values[::2], values[1::2]):
+                facet_counts[value] = facet_counts.get(value, 0) + count
+
+    return {
+        facet: [
+            item
+            for value, count in sorted(
+                facet_counts.items(), key=lambda item: (-item[1], item[0])
+            )
+            for item in (value, count)
+        ]
+        for facet, facet_counts in counts.items()
+    }
+
+
+def interleave_docs(
+    node_docs: List[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Interleaves the docs of nodes by their rank on each node."""
+    return [
+        doc
+        for doc in chain.from_iterable(zip_longest(*node_docs))
+        if doc is not None
+    ]
+
+
+def federated_search(
+    canonical_query: str, node_urls: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Searches the index nodes concurrently and merges their results.
+
+    'numFound' is the sum over the nodes that answered, so it counts the
+    replicas of a dataset on different nodes more than once.
+
+    :param canonical_query: The canonical query string of the search
+    :param node_urls: The search URLs of the index nodes, which default to
+        the ESGF_FEDERATED_INDEX_NODES setting
+    :raises InvalidFederatedQuery: If the query sets 'offset' or an invalid
+        'limit'
+    """
+    node_urls = node_urls or settings.ESGF_FEDERATED_INDEX_NODES
+    limit = get_limit(parse_query(canonical_query))
+    query_string = get_node_query(canonical_query)
+
+    started_at = time.monotonic()
+    deadline = started_at + settings.ESGF_FEDERATED_SEARCH_DEADLINE
+    futures = {
+        _executor.submit(fetch_node_results, node_url, query_string): node_url
+        for node_url in node_urls
+    }
+
+    results = {}  # type: Dict[str, Dict[str, Any]]
+    nodes = {}  # type: Dict[str, Dict[str, Any]]
+    pending = set(futures)
+
+    while pending:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+
+        done, pending = wait(pending, timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            node_url = futures[future]
+            elapsed = round(time.monotonic() - started_at, 3)
+
+            try:
+                node_results = future.result()
+                num_found = node_results["response"]["numFound"]
+            except Exception as e:
+                nodes[node_url] = {
+                    "status": "failed",
+                    "elapsed": elapsed,
+                    "error": str(e) or e.__class__.__name__,
+                }
+                continue
+
+            results[node_url] = node_results
+            nodes[node_url] = {
+                "status": "responded",
+                "elapsed": elapsed,
+                "num_found": num_found,
+            }
+            # The slower nodes only get a grace period after the first answer
+            deadline = min(
+                deadline,
+                time.monotonic() + settings.ESGF_FEDERATED_SEARCH_GRACE_PERIOD,
+            )
+
+    for future in pending:
+        # Only frees queued fetches, running ones end on their own timeouts
+        future.cancel()
+        nodes[futures[future]] = {"status": "timed_out"}
+
+    # Nodes are merged in the configured order so results are deterministic
+    answered = [results[url] for url in node_urls if url in results]
+    return {
+        "response": {
+            "numFound": sum(
+                node["num_found"]
+                for node in nodes.values()
+                if node["status"] == "responded"
+            ),
+            "docs": merge_docs(
+                interleave_docs(
+                    [r["response"].get("docs", []) for r in answered]
+                )
+            )[:limit],
+        },
+        "facet_counts": {
+            "facet_fields": merge_facet_fields(
+                [
+                    r.get("facet_counts", {}).get("facet_fields", {})
+                    for r in answered
+                ]
+            )
+        },
+        "nodes": {url: nodes[url] for url in node_urls},
+    }
@@ -0,0 +1,65 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from metagrid.api_proxy.node_status import (
+    get_current_states,
+    poll,
+    prune_history,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Polls the status of the ESGF data nodes on a fixed interval, "
+        "storing the latest snapshot and recording status changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=settings.ESGF_NODE_STATUS_POLL_INTERVAL,
+            help="Seconds between polls",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Poll a single time and exit",
+        )
+
+    def handle(self, *args, **options):
+        # The last recorded states are kept between polls, so each poll
+        # only writes to the database when a node changes status
+        states = None
+
+        while True:
+            started_at = time.monotonic()
+            # Drops the connection if it broke, e.g. when the database
+            # restarted, so that the poll reconnects instead of failing
+            close_old_connections()
+
+            try:
+                if states is None:
+                    states = get_current_states()
+                snapshot = poll(states)
+                pruned = prune_history()
+            except Exception:
+                logger.exception("Failed to poll the node status")
+            else:
+                online = sum(node["is_online"] for node in snapshot["nodes"])
+                self.stdout.write(
+                    f"Polled {len(snapshot['nodes'])} nodes, {online} online, "
+                    f"pruned {pruned} transitions"
+                )
+
+            if options["once"]:
+                break
+            time.sleep(
+                max(0, options["interval"] - (time.monotonic() - started_at))
+            )
@@ -0,0 +1,35 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeStatusTransition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node', models.CharField(max_length=255)),
+                ('source', models.CharField(max_length=255)),
+                ('is_online', models.BooleanField()),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ('node', 'changed_at'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='nodestatustransition',
+            index=models.Index(fields=['node', '-changed_at'], name='node_status_node_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nodestatustransition',
+            index=models.Index(fields=['changed_at'], name='node_status_changed_idx'),
+        ),
+    ]
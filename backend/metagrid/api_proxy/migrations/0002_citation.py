@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_proxy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Citation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2048, unique=True)),
+                ('doi', models.CharField(db_index=True, max_length=255)),
+                ('data', models.JSONField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_proxy', '0002_citation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeStatusSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw', models.JSONField()),
+                ('polled_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import models
+
+
+class NodeStatusTransition(models.Model):
+    """
+    A change of a data node's status between online and offline.
+
+    Only changes are stored, rather than every poll, so a week of history
+    takes a handful of rows per node.
+    """
+
+    node = models.CharField(max_length=255)
+    source = models.CharField(max_length=255)
+    is_online = models.BooleanField()
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ("node", "changed_at")
+        indexes = [
+            models.Index(
+                fields=["node", "-changed_at"],
+                name="node_status_node_changed_idx",
+            ),
+            models.Index(
+                fields=["changed_at"], name="node_status_changed_idx"
+            ),
+        ]
+
+    def __str__(self):
+        status = "online" if self.is_online else "offline"
+        return f"{self.node} {status} at {self.changed_at}"
+
+
+class NodeStatusSnapshot(models.Model):
+    """
+    The latest results of the node status API, stored by the node status
+    poller in a single row that every web worker reads.
+    """
+
+    raw = models.JSONField()
+    polled_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Node status polled at {self.polled_at}"
+
+
+class Citation(models.Model):
+    """A processed citation of a dataset, keyed by its citation URL."""
+
+    url = models.URLField(max_length=2048, unique=True)
+    doi = models.CharField(max_length=255, db_index=True)
+    data = models.JSONField()
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.doi
@@ -0,0 +1,247 @@
+"""
+Status of the ESGF data nodes, polled from the node status API.
+
+A single poller (the 'poll_node_status' management command) fetches the
+status of every node on a fixed interval and stores the latest snapshot in
+the database, where every web worker reads it instead of each polling the
+status service. Workers keep the snapshot in their cache for up to
+SNAPSHOT_CACHE_TTL seconds, so it is read from the database at most once
+per period.
+
+Only the changes of a node between online and offline are stored in the
+database, which keeps a compact history that the availability of the nodes
+over the past days is computed from.
+https://github.com/ESGF/esgf-utils/blob/master/node_status/query_prom.py
+"""
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from metagrid.api_proxy.models import NodeStatusSnapshot, NodeStatusTransition
+from metagrid.api_proxy.upstream import async_fetch, fetch
+
+SNAPSHOT_CACHE_KEY = "node_status:snapshot"
+
+# Seconds that a worker caches the stored snapshot for
+SNAPSHOT_CACHE_TTL = 30
+
+# Fields of the transitions that the availability is computed from
+FIELDS = ("node", "source", "is_online", "changed_at")
+
+
+def fetch_raw_node_status() -> Dict[str, Any]:
+    """Fetches the Prometheus query results of the node status API."""
+    response = fetch(settings.ESGF_NODE_STATUS_URL)
+
+    try:
+        response.raise_for_status()
+        return response.json()
+    finally:
+        response.close()
+
+
+def parse_node_status(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Parses the results of the node status API, sorted by node name.
+
+    Every result holds the instance and target of a node in 'metric', and
+    its probe result as an [epoch timestamp, "0" or "1"] pair in 'value'.
+    """
+    nodes = []
+
+    for result in raw["data"]["result"]:
+        epoch_timestamp, is_online = result["value"]
+        nodes.append(
+            {
+                "name": result["metric"]["instance"],
+                "source": result["metric"]["target"],
+                "timestamp": datetime.fromtimestamp(
+                    float(epoch_timestamp), tz=dt_timezone.utc
+                ),
+                "is_online": bool(int(float(is_online))),
+            }
+        )
+
+    return sorted(nodes, key=lambda node: node["name"])
+
+
+def make_snapshot(raw: Dict[str, Any], polled_at: datetime) -> Dict[str, Any]:
+    return {
+        "polled_at": polled_at,
+        "raw": raw,
+        "nodes": parse_node_status(raw),
+    }
+
+
+def get_snapshot() -> Optional[Dict[str, Any]]:
+    """Returns the latest snapshot of the node status, if one was polled.
+
+    Snapshots that are older than a few missed polls are not returned,
+    rather than served as if they were current.
+    """
+    snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        stored = NodeStatusSnapshot.objects.filter(
+            polled_at__gte=timezone.now()
+            - timedelta(seconds=settings.ESGF_NODE_STATUS_POLL_INTERVAL * 5)
+        ).first()
+        if stored is None:
+            return None
+
+        snapshot = make_snapshot(stored.raw, stored.polled_at)
+        cache.set(SNAPSHOT_CACHE_KEY, snapshot, SNAPSHOT_CACHE_TTL)
+    return snapshot
+
+
+def refresh_snapshot() -> Dict[str, Any]:
+    """Fetches the node status and stores it as the latest snapshot."""
+    return store_snapshot(fetch_raw_node_status())
+
+
+async def async_refresh_snapshot() -> Dict[str, Any]:
+    """Fetches the node status asynchronously and stores it."""
+    response = await async_fetch(settings.ESGF_NODE_STATUS_URL)
+    response.raise_for_status()
+    return await sync_to_async(store_snapshot)(response.json())
+
+
+def store_snapshot(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Stores the results of the node status API as the latest snapshot."""
+    snapshot = make_snapshot(raw, timezone.now())
+
+    NodeStatusSnapshot.objects.update_or_create(
+        pk=1, defaults={"raw": raw, "polled_at": snapshot["polled_at"]}
+    )
+    cache.set(SNAPSHOT_CACHE_KEY, snapshot, SNAPSHOT_CACHE_TTL)
+    return snapshot
+
+
+def get_latest_transitions(before: Optional[datetime] = None):
+    """Returns the latest transition of each node, optionally before a time."""
+    transitions = NodeStatusTransition.objects.all()
+    if before is not None:
+        transitions = transitions.filter(changed_at__lt=before)
+
+    return transitions.order_by("node", "-changed_at").distinct("node")
+
+
+def get_current_states() -> Dict[str, bool]:
+    """Returns whether each node was last recorded as online."""
+    return dict(get_latest_transitions().values_list("node", "is_online"))
+
+
+def record_transitions(
+    nodes: List[Dict[str, Any]], states: Dict[str, bool]
+) -> List[NodeStatusTransition]:
+    """Records the nodes whose status changed since it was last recorded.
+
+    :param nodes: The parsed status of the nodes
+    :param states: Whether each node was last recorded as online, which is
+        updated in place
+    """
+    transitions = [
+        NodeStatusTransition(
+            node=node["name"],
+            source=node["source"],
+            is_online=node["is_online"],
+            changed_at=node["timestamp"],
+        )
+        for node in nodes
+        if states.get(node["name"]) != node["is_online"]
+    ]
+    NodeStatusTransition.objects.bulk_create(transitions)
+
+    for transition in transitions:
+        states[transition.node] = transition.is_online
+    return transitions
+
+
+def prune_history() -> int:
+    """Deletes the transitions older than the retained history.
+
+    The latest transition of each node is always kept, since it holds the
+    node's current status.
+    """
+    cutoff = timezone.now() - timedelta(
+        days=settings.ESGF_NODE_STATUS_HISTORY_DAYS
+    )
+    deleted, _ = (
+        NodeStatusTransition.objects.filter(changed_at__lt=cutoff)
+        .exclude(id__in=get_latest_transitions().values("id"))
+        .delete()
+    )
+    return deleted
+
+
+def poll(states: Optional[Dict[str, bool]] = None) -> Dict[str, Any]:
+    """Polls the node status, updating the snapshot and the history.
+
+    :param states: Whether each node was last recorded as online, which a
+        long-running poller keeps between polls instead of querying it
+    """
+    if states is None:
+        states = get_current_states()
+
+    snapshot = refresh_snapshot()
+    record_transitions(snapshot["nodes"], states)
+    return snapshot
+
+
+def get_availability(days: int) -> List[Dict[str, Any]]:
+    """Returns the availability of each node over the past days.
+
+    'availability' is the fraction of the period that the node was online,
+    counted from the time its status was first recorded if that is later.
+    """
+    now = timezone.now()
+    start = now - timedelta(days=days)
+
+    transitions = {}  # type: Dict[str, List[Dict[str, Any]]]
+    # The last transition before the period gives the status at its start
+    for transition in get_latest_transitions(before=start).values(*FIELDS):
+        transitions[transition["node"]] = [transition]
+    for transition in (
+        NodeStatusTransition.objects.filter(changed_at__gte=start)
+        .order_by("changed_at")
+        .values(*FIELDS)
+    ):
+        transitions.setdefault(transition["node"], []).append(transition)
+
+    history = []
+    for node, node_transitions in sorted(transitions.items()):
+        first_recorded = max(node_transitions[0]["changed_at"], start)
+        online = timedelta()
+
+        for transition, next_transition in zip(
+            node_transitions, [*node_transitions[1:], None]
+        ):
+            if not transition["is_online"]:
+                continue
+            until = next_transition["changed_at"] if next_transition else now
+            online += until - max(transition["changed_at"], start)
+
+        recorded = now - first_recorded
+        history.append(
+            {
+                "name": node,
+                "source": node_transitions[-1]["source"],
+                "is_online": node_transitions[-1]["is_online"],
+                "availability": round(online / recorded, 4)
+                if recorded
+                else None,
+                "transitions": [
+                    {
+                        "is_online": transition["is_online"],
+                        "changed_at": transition["changed_at"],
+                    }
+                    for transition in node_transitions
+                    if transition["changed_at"] >= start
+                ],
+            }
+        )
+
+    return history
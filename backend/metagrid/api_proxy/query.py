@@ -0,0 +1,95 @@
+"""
+Canonicalization of ESGF Search API query strings.
+
+The frontend builds equivalent searches in different ways (facet parameters
+in a different order, 'query=*', trailing '&', comma separated values
+instead of repeated parameters), so queries are reduced to a canonical form
+before they are used as cache keys or sent upstream.
+https://esgf.github.io/esg-search/ESGF_Search_RESTful_API.html
+"""
+from typing import Dict, List, Optional
+from urllib.parse import quote_plus, unquote_plus
+
+# Keyword parameters of the search API, which take a single value that may
+# legitimately contain commas (e.g. 'bbox'), be order sensitive (e.g. 'sort')
+# or be free text ('query'), so they are kept as they are. All other
+# parameters are facet constraints or lists of facet names ('facets',
+# 'fields'), where comma separated values can be reordered.
+KEYWORD_PARAMS = frozenset(
+    (
+        "bbox",
+        "distrib",
+        "end",
+        "format",
+        "from",
+        "lat",
+        "latest",
+        "limit",
+        "lon",
+        "max_version",
+        "min_version",
+        "offset",
+        "polygon",
+        "query",
+        "radius",
+        "replica",
+        "shards",
+        "sort",
+        "start",
+        "to",
+        "type",
+    )
+)
+
+# Values that constrain nothing and are dropped from the query
+WILDCARD_VALUES = {"query": "*"}
+
+
+def parse_query(query_string: str) -> Dict[str, List[str]]:
+    """Parses a query string into sorted, de-duplicated values per param.
+
+    Values are split on literal commas only, so an encoded comma ('%2C')
+    stays part of a facet value.
+    """
+    params = {}  # type: Dict[str, List[str]]
+
+    for field in query_string.split("&"):
+        raw_key, _, raw_value = field.partition("=")
+        key = unquote_plus(raw_key).strip()
+        if not key:
+            continue
+
+        if key in KEYWORD_PARAMS:
+            # The last value wins, like Django's QueryDict
+            value = unquote_plus(raw_value).strip()
+            params[key] = [value] if value != WILDCARD_VALUES.get(key) else []
+            continue
+
+        values = params.setdefault(key, [])
+        for item in raw_value.split(","):
+            item = unquote_plus(item).strip()
+            if item and item not in values:
+                values.append(item)
+
+    return {
+        key: values if key in KEYWORD_PARAMS else sorted(values)
+        for key, values in sorted(params.items())
+        if any(values)
+    }
+
+
+def encode_query(params: Dict[str, List[str]]) -> str:
+    """Encodes parsed params, joining the values of facets with commas."""
+    fields = []
+    for key, values in params.items():
+        if key in KEYWORD_PARAMS:
+            value = quote_plus(values[0], safe=",*")
+        else:
+            value = ",".join(quote_plus(item, safe="*") for item in values)
+        fields.append(f"{quote_plus(key, safe='*')}={value}")
+    return "&".join(fields)
+
+
+def canonicalize_query(query_string: Optional[str]) -> str:
+    """Returns the canonical form of an ESGF Search API query string."""
+    return encode_query(parse_query(query_string or ""))
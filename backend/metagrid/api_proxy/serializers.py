@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+
+class CitationsSerializer(serializers.Serializer):
+    """Citation URLs of datasets, whose citations are fetched in a batch."""
+
+    citation_urls = serializers.ListField(
+        child=serializers.URLField(max_length=2048),
+        allow_empty=False,
+        max_length=100,
+    )
@@ -0,0 +1,433 @@
+import asyncio
+import json
+import time
+from unittest import mock
+from urllib.parse import urlencode
+
+import httpx
+import pytest
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.test import AsyncRequestFactory, override_settings
+from django.urls import path, reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from config.urls import proxy_path
+from metagrid.api_proxy import async_views, citations, upstream
+from metagrid.api_proxy.models import Citation
+from metagrid.api_proxy.tests.test_citations import CITATION_URL, make_citation
+from metagrid.api_proxy.tests.test_node_status import make_raw_node_status
+from metagrid.api_proxy.views import SearchProxyView
+from metagrid.core.asgi import AsyncStreamingHttpResponse
+
+pytestmark = pytest.mark.django_db
+
+urlpatterns = [
+    path(
+        "api/v1/proxy/search/",
+        async_views.search_proxy,
+        name="proxy-search",
+    )
+]
+
+
+def make_async_response(
+    url, body=b"", status_code=200, headers=None
+) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        content=body,
+        headers=headers,
+        request=httpx.Request("GET", url),
+    )
+
+
+def patch_upstream(test_case) -> mock.AsyncMock:
+    """Patches the upstream requests of the async client.
+
+    Returns a mock that is called with the URL of each request, and returns
+    its response.
+    """
+    mock_get = mock.AsyncMock()
+
+    async def send(request, **kwargs):
+        return await mock_get(str(request.url))
+
+    patcher = mock.patch.object(httpx.AsyncClient, "send", side_effect=send)
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return mock_get
+
+
+async def read_content(response) -> bytes:
+    """Returns the content of a response, reading it if it is streamed."""
+    if isinstance(response, AsyncStreamingHttpResponse):
+        return b"".join(
+            [part async for part in response.async_streaming_content]
+        )
+    return response.content
+
+
+def mock_citation_service(url, **kwargs):
+    doi = url.rsplit("=", 1)[1]
+    return make_async_response(url, json.dumps(make_citation(doi)).encode())
+
+
+@override_settings(
+    ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/",
+    ESGF_WGET_URL="https://esgf-node.llnl.gov/esg-search/wget",
+    ESGF_NODE_STATUS_URL="https://aims4.llnl.gov/prometheus/api/v1/query",
+    ESGF_PROXY_ALLOWED_HOSTS=["cera-www.dkrz.de"],
+)
+class TestAsyncViews(APITestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.mock_get = patch_upstream(self)
+        self.addCleanup(cache.clear)
+        self.addCleanup(caches["esgf_search"].clear)
+
+    async def test_search_sends_canonical_query_and_caches_result(self):
+        self.mock_get.return_value = make_async_response(
+            "https://esgf-node.llnl.gov/esg-search/search/",
+            b'{"response": {"numFound": 0}}',
+            headers={"Content-Type": "application/json"},
+        )
+        request = self.factory.get(
+            "/api/v1/proxy/search/?source_id=b,a&project=CMIP6&query=*&"
+        )
+
+        response = await async_views.search_proxy(request)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Cache"] == "MISS"
+        assert response["Content-Type"] == "application/json"
+        assert isinstance(response, AsyncStreamingHttpResponse)
+        assert await read_content(response) == (
+            b'{"response": {"numFound": 0}}'
+        )
+        assert self.mock_get.call_args[0][0] == (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+            "?project=CMIP6&source_id=a,b"
+        )
+
+        response = await async_views.search_proxy(request)
+        assert response["X-Cache"] == "HIT"
+        assert response.content == b'{"response": {"numFound": 0}}'
+        assert self.mock_get.call_count == 1
+
+    async def test_search_does_not_cache_large_results(self):
+        self.mock_get.return_value = make_async_response(
+            "https://esgf-node.llnl.gov/esg-search/search/", b"x" * 11
+        )
+        request = self.factory.get("/api/v1/proxy/search/?project=CMIP6")
+
+        with self.settings(ESGF_SEARCH_CACHE_MAX_BYTES=10):
+            response = await async_views.search_proxy(request)
+            assert await read_content(response) == b"x" * 11
+            response = await async_views.search_proxy(request)
+
+        assert response["X-Cache"] == "MISS"
+        assert self.mock_get.call_count == 2
+
+    async def test_search_closes_upstream_response_after_streaming(self):
+        upstream_response = make_async_response(
+            "https://esgf-node.llnl.gov/esg-search/search/", b"{}"
+        )
+        self.mock_get.return_value = upstream_response
+
+        with mock.patch.object(upstream_response, "aclose") as aclose:
+            response = await async_views.search_proxy(
+                self.factory.get("/api/v1/proxy/search/")
+            )
+            aclose.assert_not_awaited()
+
+            await read_content(response)
+            aclose.assert_awaited_once()
+
+    async def test_search_does_not_cache_errors(self):
+        self.mock_get.return_value = make_async_response(
+            "https://esgf-node.llnl.gov/esg-search/search/",
+            b"error",
+            status_code=500,
+        )
+        request = self.factory.get("/api/v1/proxy/search/?project=CMIP6")
+
+        await read_content(await async_views.search_proxy(request))
+        response = await async_views.search_proxy(request)
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert self.mock_get.call_count == 2
+
+    async def test_search_reports_upstream_errors(self):
+        request = self.factory.get("/api/v1/proxy/search/")
+        upstream_request = httpx.Request(
+            "GET", "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+
+        self.mock_get.side_effect = httpx.ReadTimeout(
+            "timed out", request=upstream_request
+        )
+        response = await async_views.search_proxy(request)
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        assert json.loads(response.content) == {
+            "detail": "The upstream ESGF service did not respond in time."
+        }
+
+        self.mock_get.side_effect = httpx.ConnectError(
+            "refused", request=upstream_request
+        )
+        response = await async_views.search_proxy(request)
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+
+    async def test_search_rejects_other_methods(self):
+        request = self.factory.post("/api/v1/proxy/search/")
+
+        response = await async_views.search_proxy(request)
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    async def test_wget_passes_through_script(self):
+        self.mock_get.return_value = make_async_response(
+            "https://esgf-node.llnl.gov/esg-search/wget",
+            b"#!/bin/bash",
+            headers={
+                "Content-Type": "text/x-sh",
+                "Content-Disposition": "attachment; filename=wget.sh",
+            },
+        )
+        request = self.factory.get("/api/v1/proxy/wget/?dataset_id=a")
+
+        response = await async_views.wget_proxy(request)
+
+        assert await read_content(response) == b"#!/bin/bash"
+        assert response["Content-Disposition"] == (
+            "attachment; filename=wget.sh"
+        )
+        assert self.mock_get.call_args[0][0] == (
+            "https://esgf-node.llnl.gov/esg-search/wget?dataset_id=a"
+        )
+
+    async def test_node_status_fetches_status_once(self):
+        raw = make_raw_node_status({"b.gov": False, "a.gov": True})
+        self.mock_get.return_value = make_async_response(
+            "https://aims4.llnl.gov/prometheus/api/v1/query",
+            json.dumps(raw).encode(),
+        )
+        request = self.factory.get("/api/v1/status/nodes/")
+
+        response = await async_views.node_status(request)
+        assert response.status_code == status.HTTP_200_OK
+        nodes = json.loads(response.content)["nodes"]
+        assert [node["name"] for node in nodes] == ["a.gov", "b.gov"]
+
+        response = await async_views.node_status_proxy(
+            self.factory.get("/api/v1/proxy/status/")
+        )
+        assert json.loads(response.content) == raw
+        assert self.mock_get.call_count == 1
+
+    async def test_node_status_reports_invalid_status(self):
+        self.mock_get.return_value = make_async_response(
+            "https://aims4.llnl.gov/prometheus/api/v1/query", b"{}"
+        )
+
+        response = await async_views.node_status(
+            self.factory.get("/api/v1/status/nodes/")
+        )
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+
+    async def test_citations_fetches_and_stores_citations(self):
+        self.mock_get.side_effect = mock_citation_service
+        urls = [CITATION_URL.format(i) for i in range(3)]
+        request = self.factory.post(
+            "/api/v1/proxy/citations/",
+            {"citation_urls": [*urls, "https://example.com/citation"]},
+            content_type="application/json",
+        )
+
+        response = await async_views.citations_proxy(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = json.loads(response.content)
+        assert set(data["citations"]) == set(urls)
+        assert data["citations"][urls[0]]["creatorsList"] == "Bob; Tom"
+        assert list(data["errors"]) == ["https://example.com/citation"]
+        stored = await sync_to_async(
+            Citation.objects.filter(url__in=urls).count
+        )()
+        assert stored == 3
+
+    async def test_citations_bounds_concurrent_fetches(self):
+        in_flight = max_in_flight = 0
+
+        async def slow_citation_service(url, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return mock_citation_service(url)
+
+        self.mock_get.side_effect = slow_citation_service
+        urls = [CITATION_URL.format(i) for i in range(20)]
+        request = self.factory.post(
+            "/api/v1/proxy/citations/",
+            {"citation_urls": urls},
+            content_type="application/json",
+        )
+
+        response = await async_views.citations_proxy(request)
+
+        assert len(json.loads(response.content)["citations"]) == 20
+        assert max_in_flight == citations.MAX_CONCURRENT_FETCHES
+
+    async def test_citation_proxies_citation_url(self):
+        self.mock_get.return_value = make_async_response(
+            CITATION_URL.format(0), b"{}"
+        )
+
+        response = await async_views.citation_proxy(
+            self.factory.get(
+                "/api/v1/proxy/citation/?"
+                + urlencode({"citurl": CITATION_URL.format(0)})
+            )
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert self.mock_get.call_args[0][0] == CITATION_URL.format(0)
+
+        response = await async_views.citation_proxy(
+            self.factory.get(
+                "/api/v1/proxy/citation/?citurl=https://example.com/"
+            )
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        response = await async_views.citation_proxy(
+            self.factory.get("/api/v1/proxy/citation/")
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "citurl" in json.loads(response.content)
+
+    async def test_citations_validates_urls(self):
+        request = self.factory.post(
+            "/api/v1/proxy/citations/",
+            {"citation_urls": "not a list"},
+            content_type="application/json",
+        )
+
+        response = await async_views.citations_proxy(request)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "citation_urls" in json.loads(response.content)
+
+    async def test_holds_many_upstream_requests_at_once(self):
+        async def slow_upstream(url, **kwargs):
+            await asyncio.sleep(0.2)
+            return make_async_response(url, b"{}")
+
+        self.mock_get.side_effect = slow_upstream
+        started_at = time.perf_counter()
+
+        responses = await asyncio.gather(
+            *(
+                async_views.search_proxy(
+                    self.factory.get(f"/api/v1/proxy/search/?offset={i}")
+                )
+                for i in range(300)
+            )
+        )
+
+        assert all(response.status_code == 200 for response in responses)
+        # Sequential requests would take a minute
+        assert time.perf_counter() - started_at < 5
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/",
+)
+class TestAsyncViewsThroughHandler(APITestCase):
+    def setUp(self):
+        self.mock_get = patch_upstream(self)
+        self.addCleanup(caches["esgf_search"].clear)
+
+    async def test_serves_search_with_atomic_requests(self):
+        self.mock_get.return_value = make_async_response(
+            "https://esgf-node.llnl.gov/esg-search/search/", b"{}"
+        )
+
+        response = await self.async_client.get(
+            reverse("proxy-search"), {"project": "CMIP6"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Cache"] == "MISS"
+
+
+class TestAsyncUpstream:
+    def test_reuses_client_per_event_loop(self):
+        async def get_client():
+            return upstream.get_async_client()
+
+        async def get_clients():
+            return upstream.get_async_client(), await get_client()
+
+        first, second = asyncio.run(get_clients())
+        other = asyncio.run(get_client())
+
+        assert first is second
+        assert first is not other
+
+    def test_rejects_host_not_allowed(self):
+        with pytest.raises(upstream.UpstreamHostNotAllowed):
+            asyncio.run(upstream.async_fetch("https://example.com/search/"))
+
+    @override_settings(
+        ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/"
+    )
+    def test_checks_redirects_against_allow_list(self):
+        url = "https://esgf-node.llnl.gov/esg-search/search/"
+
+        with mock.patch.object(
+            httpx.AsyncClient,
+            "send",
+            side_effect=[
+                make_async_response(
+                    url, status_code=302, headers={"Location": "/moved/"}
+                ),
+                make_async_response(
+                    url,
+                    status_code=302,
+                    headers={"Location": "https://example.com/"},
+                ),
+            ],
+        ) as mock_send:
+            with pytest.raises(upstream.UpstreamHostNotAllowed):
+                asyncio.run(upstream.async_fetch(url))
+
+        request = mock_send.call_args_list[1][0][0]
+        assert str(request.url) == "https://esgf-node.llnl.gov/moved/"
+        assert mock_send.call_args_list[1][1] == {
+            "stream": True,
+            "allow_redirects": False,
+        }
+
+
+class TestProxyPath:
+    def test_routes_to_async_view_if_enabled(self, settings):
+        settings.ESGF_PROXY_ASYNC = True
+
+        pattern = proxy_path(
+            "search/", SearchProxyView.as_view(), name="proxy-search"
+        )
+
+        assert pattern.callback is async_views.search_proxy
+
+    def test_routes_to_view_otherwise(self, settings):
+        settings.ESGF_PROXY_ASYNC = False
+        view = SearchProxyView.as_view()
+
+        pattern = proxy_path("search/", view, name="proxy-search")
+
+        assert pattern.callback is view
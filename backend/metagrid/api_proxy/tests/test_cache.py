@@ -0,0 +1,47 @@
+import pytest
+
+from metagrid.api_proxy import cache
+
+
+class TestSearchCache:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_SEARCH_CACHE_TTL = 300
+        settings.ESGF_SEARCH_CACHE_PROJECT_TTLS = {"CMIP6": 3600, "CMIP3": 0}
+        settings.ESGF_SEARCH_CACHE_MAX_BYTES = 10
+
+    def test_get_cache_ttl_uses_project_ttl(self):
+        assert cache.get_cache_ttl("project=CMIP6") == 3600
+
+    def test_get_cache_ttl_falls_back_to_default_ttl(self):
+        assert cache.get_cache_ttl("project=CMIP5") == 300
+        assert cache.get_cache_ttl("project=CMIP5,CMIP6") == 300
+        assert cache.get_cache_ttl("") == 300
+
+    def test_cache_stream_caches_fully_streamed_result(self):
+        chunks = list(
+            cache.cache_stream("project=CMIP6", "text/plain", [b"foo", b"bar"])
+        )
+
+        assert chunks == [b"foo", b"bar"]
+        assert cache.get_cached_result("project=CMIP6") == (
+            "text/plain",
+            b"foobar",
+        )
+
+    def test_cache_stream_skips_partially_streamed_result(self):
+        stream = cache.cache_stream("project=CMIP6", None, [b"foo", b"bar"])
+        next(stream)
+        stream.close()
+
+        assert cache.get_cached_result("project=CMIP6") is None
+
+    def test_cache_stream_skips_large_result(self):
+        list(cache.cache_stream("project=CMIP6", None, [b"x" * 11]))
+
+        assert cache.get_cached_result("project=CMIP6") is None
+
+    def test_set_cached_result_skips_project_with_zero_ttl(self):
+        cache.set_cached_result("project=CMIP3", (None, b""))
+
+        assert cache.get_cached_result("project=CMIP3") is None
@@ -0,0 +1,142 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+import requests
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from metagrid.api_proxy.citations import get_citations, process_citation
+from metagrid.api_proxy.models import Citation
+from metagrid.api_proxy.tests.utils import make_response
+
+pytestmark = pytest.mark.django_db
+
+CITATION_URL = "https://cera-www.dkrz.de/WDCC/ui/cerasearch/cmip6?input={}"
+
+
+def make_citation(doi):
+    return {
+        "identifier": {"id": doi, "identifierType": "DOI"},
+        "creators": [{"creatorName": "Bob"}, {"creatorName": "Tom"}],
+        "titles": "Title",
+        "publisher": "Publisher",
+        "publicationYear": 2020,
+    }
+
+
+def mock_citation_service(url, **kwargs):
+    doi = url.rsplit("=", 1)[1]
+    return make_response(json.dumps(make_citation(doi)).encode())
+
+
+def test_process_citation():
+    citation = process_citation(make_citation("10.22033/ESGF/CMIP6.1"))
+
+    assert citation["identifierDOI"] == "http://doi.org/10.22033/ESGF/CMIP6.1"
+    assert citation["creatorsList"] == "Bob; Tom"
+    assert citation["titles"] == "Title"
+
+
+class TestGetCitations:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_PROXY_ALLOWED_HOSTS = ["cera-www.dkrz.de"]
+        settings.ESGF_CITATION_TTL = 3600
+        patcher = mock.patch.object(
+            requests.Session, "get", side_effect=mock_citation_service
+        )
+        self.mock_get = patcher.start()
+        yield
+        patcher.stop()
+
+    def test_fetches_and_stores_missing_citations(self):
+        urls = [CITATION_URL.format(i) for i in range(3)]
+
+        citations, errors = get_citations(urls)
+
+        assert list(citations) == urls
+        assert citations[urls[1]]["creatorsList"] == "Bob; Tom"
+        assert errors == {}
+        assert self.mock_get.call_count == 3
+        assert Citation.objects.get(url=urls[1]).doi == "1"
+
+    def test_serves_stored_citations(self):
+        urls = [CITATION_URL.format(i) for i in range(3)]
+        get_citations(urls[:2])
+        self.mock_get.reset_mock()
+
+        citations, _ = get_citations(urls)
+
+        assert len(citations) == 3
+        assert self.mock_get.call_count == 1
+        assert self.mock_get.call_args[0][0] == urls[2]
+
+    def test_refreshes_expired_citations(self):
+        url = CITATION_URL.format(1)
+        get_citations([url])
+        Citation.objects.update(
+            fetched_at=timezone.now() - timedelta(hours=2), data={}
+        )
+
+        citations, _ = get_citations([url])
+
+        assert citations[url]["identifier"]["id"] == "1"
+        assert Citation.objects.get().data == citations[url]
+        assert Citation.objects.count() == 1
+
+    def test_serves_expired_citations_when_fetch_fails(self):
+        url = CITATION_URL.format(1)
+        get_citations([url])
+        Citation.objects.update(fetched_at=timezone.now() - timedelta(hours=2))
+        self.mock_get.side_effect = requests.ConnectionError()
+
+        citations, errors = get_citations([url])
+
+        assert citations[url]["identifier"]["id"] == "1"
+        assert errors == {}
+
+    def test_reports_errors(self):
+        self.mock_get.side_effect = requests.ConnectionError()
+        urls = [CITATION_URL.format(1), "https://example.com/citation"]
+
+        citations, errors = get_citations(urls)
+
+        assert citations == {}
+        assert "unavailable" in errors[urls[0]]
+        assert "allow-list" in errors[urls[1]]
+
+
+@override_settings(ESGF_PROXY_ALLOWED_HOSTS=["cera-www.dkrz.de"])
+class TestCitationsView(APITestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            requests.Session, "get", side_effect=mock_citation_service
+        )
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_citations(self):
+        urls = [CITATION_URL.format(1), CITATION_URL.format(1)]
+
+        response = self.client.post(
+            reverse("proxy-citations"), {"citation_urls": urls}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.json()["citations"]) == [urls[0]]
+        assert response.json()["errors"] == {}
+        assert self.mock_get.call_count == 1
+
+    def test_validates_urls(self):
+        for citation_urls in ([], ["not a url"], ["https://a.gov/"] * 101):
+            response = self.client.post(
+                reverse("proxy-citations"),
+                {"citation_urls": citation_urls},
+                format="json",
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
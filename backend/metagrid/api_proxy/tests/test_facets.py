@@ -0,0 +1,85 @@
+import json
+from unittest import mock
+
+import pytest
+import requests
+
+from metagrid.api_proxy.facets import (
+    fetch_facet_counts,
+    get_facet_counts,
+    get_facet_counts_query,
+)
+from metagrid.api_proxy.tests.utils import make_response
+
+SEARCH_RESULTS = {
+    "response": {"numFound": 2, "docs": []},
+    "facet_counts": {"facet_fields": {"source_id": ["foo", 2]}},
+}
+
+
+class TestGetFacetCountsQuery:
+    def test_adds_filters_to_facets_url(self):
+        query = get_facet_counts_query(
+            "project=CMIP6&limit=0&facets=source_id",
+            [("source_id", "foo"), ("source_id", "bar")],
+        )
+
+        assert (
+            query == "facets=source_id&limit=0&project=CMIP6&source_id=bar,foo"
+        )
+
+    def test_ignores_reserved_params(self):
+        query = get_facet_counts_query(
+            "project=CMIP6&limit=0", [("limit", "10"), ("facets", "*")]
+        )
+
+        assert query == "limit=0&project=CMIP6"
+
+    def test_ignores_params_of_facets_url(self):
+        query = get_facet_counts_query(
+            "project=CMIP6&limit=0",
+            [("project", "CMIP5"), ("expand", "x"), ("omit", "y")],
+        )
+
+        assert query == "limit=0&project=CMIP6"
+
+
+class TestFetchFacetCounts:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_SEARCH_URL = (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+
+    def test_returns_facet_counts(self):
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            mock_get.return_value = make_response(
+                json.dumps(SEARCH_RESULTS).encode()
+            )
+            facet_counts = fetch_facet_counts("project=CMIP6")
+
+        assert mock_get.call_args[0][0] == (
+            "https://esgf-node.llnl.gov/esg-search/search/?project=CMIP6"
+        )
+        assert facet_counts == {
+            "num_found": 2,
+            "facet_fields": {"source_id": ["foo", 2]},
+        }
+
+    def test_raises_exception_on_error_response(self):
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            mock_get.return_value = make_response(status_code=500)
+
+            with pytest.raises(requests.HTTPError):
+                fetch_facet_counts("project=CMIP6")
+
+    def test_get_facet_counts_caches_result(self):
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            mock_get.return_value = make_response(
+                json.dumps(SEARCH_RESULTS).encode()
+            )
+            get_facet_counts("project=CMIP6")
+            facet_counts = get_facet_counts("project=CMIP6")
+
+        mock_get.assert_called_once()
+        assert facet_counts["num_found"] == 2
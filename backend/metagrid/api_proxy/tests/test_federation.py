@@ -0,0 +1,263 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+import requests
+
+from metagrid.api_proxy import federation
+from metagrid.api_proxy.tests.utils import make_response
+
+LLNL = "https://esgf-node.llnl.gov/esg-search/search/"
+DKRZ = "https://esgf-data.dkrz.de/esg-search/search/"
+CEDA = "https://esgf-index1.ceda.ac.uk/esg-search/search/"
+
+
+def make_results(docs, facet_fields=None):
+    return {
+        "response": {"numFound": len(docs), "docs": docs},
+        "facet_counts": {"facet_fields": facet_fields or {}},
+    }
+
+
+class TestGetNodeQuery:
+    def test_disables_distributed_search_on_nodes(self):
+        query = federation.get_node_query("distrib=true&project=CMIP6")
+
+        assert query == (
+            "distrib=false&format=application%2Fsolr%2Bjson&project=CMIP6"
+        )
+
+
+class TestMergeDocs:
+    def test_collapses_replicas_into_original(self):
+        docs = federation.merge_docs(
+            [
+                {"instance_id": "a", "data_node": "dkrz", "replica": True},
+                {"instance_id": "b", "data_node": "llnl", "replica": False},
+                {"instance_id": "a", "data_node": "llnl", "replica": False},
+                {"instance_id": "a", "data_node": "ceda", "replica": True},
+            ]
+        )
+
+        assert docs == [
+            {
+                "instance_id": "a",
+                "data_node": "llnl",
+                "replica": False,
+                "data_nodes": ["dkrz", "llnl", "ceda"],
+            },
+            {
+                "instance_id": "b",
+                "data_node": "llnl",
+                "replica": False,
+                "data_nodes": ["llnl"],
+            },
+        ]
+
+
+class TestMergeFacetFields:
+    def test_sums_counts_of_nodes(self):
+        facet_fields = federation.merge_facet_fields(
+            [
+                {"source_id": ["foo", 1, "bar", 2]},
+                {"source_id": ["foo", 3], "variable_id": ["tas", 1]},
+            ]
+        )
+
+        assert facet_fields == {
+            "source_id": ["foo", 4, "bar", 2],
+            "variable_id": ["tas", 1],
+        }
+
+
+class TestFederatedSearch:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_FEDERATED_INDEX_NODES = [LLNL, DKRZ, CEDA]
+        settings.ESGF_FEDERATED_SEARCH_DEADLINE = 2
+        settings.ESGF_FEDERATED_SEARCH_GRACE_PERIOD = 0.1
+
+        self.responses = {}
+        patcher = mock.patch.object(
+            requests.Session, "get", side_effect=self.get
+        )
+        self.mock_get = patcher.start()
+        yield
+        patcher.stop()
+
+    def get(self, url, **kwargs):
+        response = self.responses[url.split("?")[0]]
+        if isinstance(response, Exception):
+            raise response
+        if callable(response):
+            return response()
+        return make_response(json.dumps(response).encode())
+
+    def test_merges_results_of_nodes(self):
+        self.responses = {
+            LLNL: make_results(
+                [{"instance_id": "a", "replica": False}],
+                {"source_id": ["foo", 1]},
+            ),
+            DKRZ: make_results(
+                [
+                    {"instance_id": "a", "replica": True},
+                    {"instance_id": "b", "replica": False},
+                ],
+                {"source_id": ["foo", 2]},
+            ),
+            CEDA: make_results([]),
+        }
+
+        results = federation.federated_search("project=CMIP6")
+
+        assert [doc["instance_id"] for doc in results["response"]["docs"]] == [
+            "a",
+            "b",
+        ]
+        assert results["response"]["docs"][0]["replica"] is False
+        assert results["response"]["numFound"] == 3
+        assert results["facet_counts"]["facet_fields"] == {
+            "source_id": ["foo", 3]
+        }
+        assert {
+            url: node["status"] for url, node in results["nodes"].items()
+        } == {LLNL: "responded", DKRZ: "responded", CEDA: "responded"}
+
+        for call in self.mock_get.call_args_list:
+            assert "distrib=false" in call[0][0]
+
+    def test_reports_failed_nodes(self):
+        self.responses = {
+            LLNL: make_results([{"instance_id": "a"}]),
+            DKRZ: requests.ConnectionError("Connection refused"),
+            CEDA: lambda: make_response(status_code=500),
+        }
+
+        results = federation.federated_search("project=CMIP6")
+
+        assert results["response"]["numFound"] == 1
+        assert results["nodes"][LLNL]["status"] == "responded"
+        assert results["nodes"][DKRZ] == {
+            "status": "failed",
+            "elapsed": mock.ANY,
+            "error": "Connection refused",
+        }
+        assert results["nodes"][CEDA]["status"] == "failed"
+
+    def test_returns_limit_of_merged_datasets(self):
+        self.responses = {
+            url: make_results([{"instance_id": f"{url}{i}"} for i in range(2)])
+            for url in (LLNL, DKRZ, CEDA)
+        }
+
+        results = federation.federated_search("limit=2&offset=0")
+
+        assert [doc["instance_id"] for doc in results["response"]["docs"]] == [
+            f"{LLNL}0",
+            f"{DKRZ}0",
+        ]
+        for call in self.mock_get.call_args_list:
+            assert "limit=2" in call[0][0]
+            assert "offset" not in call[0][0]
+
+    def test_interleaves_full_pages_of_nodes(self, settings):
+        settings.ESGF_FEDERATED_INDEX_NODES = [LLNL, DKRZ]
+        self.responses = {
+            LLNL: make_results(
+                [{"instance_id": f"llnl{i}"} for i in range(4)]
+            ),
+            DKRZ: make_results(
+                [{"instance_id": "llnl1", "replica": True}]
+                + [{"instance_id": f"dkrz{i}"} for i in range(1, 4)]
+            ),
+        }
+
+        results = federation.federated_search("limit=4")
+
+        assert [doc["instance_id"] for doc in results["response"]["docs"]] == [
+            "llnl0",
+            "llnl1",
+            "dkrz1",
+            "llnl2",
+        ]
+
+    def test_returns_empty_page_without_nodes(self, settings):
+        settings.ESGF_FEDERATED_INDEX_NODES = []
+
+        results = federation.federated_search("project=CMIP6")
+
+        assert results == {
+            "response": {"numFound": 0, "docs": []},
+            "facet_counts": {"facet_fields": {}},
+            "nodes": {},
+        }
+
+    def test_cancels_queued_fetches_after_deadline(self, settings):
+        settings.ESGF_FEDERATED_SEARCH_DEADLINE = 0.1
+        self.responses = {url: make_results([]) for url in (LLNL, DKRZ, CEDA)}
+
+        # Keeps every worker of the pool busy past the deadline
+        busy = [
+            federation._executor.submit(time.sleep, 0.3)
+            for _ in range(federation.MAX_CONCURRENT_FETCHES)
+        ]
+        results = federation.federated_search("project=CMIP6")
+        for future in busy:
+            future.result()
+
+        assert self.mock_get.call_count == 0
+        assert all(
+            node == {"status": "timed_out"}
+            for node in results["nodes"].values()
+        )
+
+    @pytest.mark.parametrize("query", ["offset=10", "limit=-1", "limit=many"])
+    def test_rejects_paging(self, query):
+        with pytest.raises(federation.InvalidFederatedQuery):
+            federation.federated_search(query)
+
+    def test_concurrent_searches_do_not_queue(self):
+        def slow_response():
+            time.sleep(0.5)
+            return make_response(json.dumps(make_results([])).encode())
+
+        self.responses = {
+            LLNL: slow_response,
+            DKRZ: slow_response,
+            CEDA: slow_response,
+        }
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            searches = [
+                executor.submit(federation.federated_search, "project=CMIP6")
+                for _ in range(10)
+            ]
+            results = [search.result() for search in searches]
+
+        assert all(
+            node["status"] == "responded"
+            for result in results
+            for node in result["nodes"].values()
+        )
+
+    def test_does_not_wait_for_slow_nodes(self):
+        def slow_response():
+            time.sleep(1)
+            return make_response(json.dumps(make_results([])).encode())
+
+        self.responses = {
+            LLNL: make_results([{"instance_id": "a"}]),
+            DKRZ: slow_response,
+            CEDA: slow_response,
+        }
+
+        started_at = time.monotonic()
+        results = federation.federated_search("project=CMIP6")
+
+        assert time.monotonic() - started_at < 1
+        assert results["response"]["numFound"] == 1
+        assert results["nodes"][DKRZ] == {"status": "timed_out"}
+        assert results["nodes"][CEDA] == {"status": "timed_out"}
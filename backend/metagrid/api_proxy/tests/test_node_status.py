@@ -0,0 +1,269 @@
+import json
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from unittest import mock
+
+import pytest
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from metagrid.api_proxy import node_status
+from metagrid.api_proxy.models import NodeStatusSnapshot, NodeStatusTransition
+from metagrid.api_proxy.tests.utils import make_response
+
+pytestmark = pytest.mark.django_db
+
+
+def make_raw_node_status(nodes, timestamp=1600000000):
+    return {
+        "status": "success",
+        "data": {
+            "resultType": "vector",
+            "result": [
+                {
+                    "metric": {
+                        "instance": name,
+                        "target": f"https://{name}/thredds",
+                    },
+                    "value": [timestamp, "1" if is_online else "0"],
+                }
+                for name, is_online in nodes.items()
+            ],
+        },
+    }
+
+
+def make_transition(node, is_online, changed_at):
+    return NodeStatusTransition.objects.create(
+        node=node,
+        source=f"https://{node}/thredds",
+        is_online=is_online,
+        changed_at=changed_at,
+    )
+
+
+class TestParseNodeStatus:
+    def test_parses_and_sorts_nodes(self):
+        raw = make_raw_node_status({"b.gov": False, "a.gov": True})
+
+        assert node_status.parse_node_status(raw) == [
+            {
+                "name": "a.gov",
+                "source": "https://a.gov/thredds",
+                "timestamp": datetime(
+                    2020, 9, 13, 12, 26, 40, tzinfo=dt_timezone.utc
+                ),
+                "is_online": True,
+            },
+            {
+                "name": "b.gov",
+                "source": "https://b.gov/thredds",
+                "timestamp": datetime(
+                    2020, 9, 13, 12, 26, 40, tzinfo=dt_timezone.utc
+                ),
+                "is_online": False,
+            },
+        ]
+
+
+class TestPoll:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        cache.delete(node_status.SNAPSHOT_CACHE_KEY)
+        patcher = mock.patch.object(node_status, "fetch_raw_node_status")
+        self.mock_fetch = patcher.start()
+        yield
+        patcher.stop()
+
+    def poll(self, nodes, timestamp, states=None):
+        self.mock_fetch.return_value = make_raw_node_status(nodes, timestamp)
+        return node_status.poll(states)
+
+    def test_caches_snapshot(self):
+        snapshot = self.poll({"a.gov": True}, 1600000000)
+
+        assert node_status.get_snapshot() == snapshot
+        assert snapshot["nodes"][0]["name"] == "a.gov"
+        assert snapshot["raw"] == self.mock_fetch.return_value
+
+    def test_shares_snapshot_through_database(self):
+        snapshot = self.poll({"a.gov": True}, 1600000000)
+        # As seen by a worker that does not share the poller's cache
+        cache.delete(node_status.SNAPSHOT_CACHE_KEY)
+
+        assert node_status.get_snapshot() == snapshot
+
+    def test_drops_outdated_snapshot(self, settings):
+        self.poll({"a.gov": True}, 1600000000)
+        cache.delete(node_status.SNAPSHOT_CACHE_KEY)
+        NodeStatusSnapshot.objects.update(
+            polled_at=timezone.now()
+            - timedelta(seconds=settings.ESGF_NODE_STATUS_POLL_INTERVAL * 6)
+        )
+
+        assert node_status.get_snapshot() is None
+
+    def test_records_only_transitions(self):
+        states = {}  # type: ignore
+        self.poll({"a.gov": True, "b.gov": True}, 1600000000, states)
+        self.poll({"a.gov": True, "b.gov": True}, 1600000060, states)
+        self.poll({"a.gov": False, "b.gov": True}, 1600000120, states)
+        self.poll({"a.gov": False, "b.gov": True}, 1600000180, states)
+
+        assert list(
+            NodeStatusTransition.objects.values_list("node", "is_online")
+        ) == [("a.gov", True), ("a.gov", False), ("b.gov", True)]
+        assert states == {"a.gov": False, "b.gov": True}
+
+    def test_resumes_from_recorded_states(self):
+        self.poll({"a.gov": True}, 1600000000)
+        self.poll({"a.gov": True}, 1600000060)
+
+        assert NodeStatusTransition.objects.count() == 1
+        assert node_status.get_current_states() == {"a.gov": True}
+
+
+class TestPruneHistory:
+    def test_keeps_latest_transition_of_each_node(self, settings):
+        settings.ESGF_NODE_STATUS_HISTORY_DAYS = 30
+        now = timezone.now()
+        make_transition("a.gov", True, now - timedelta(days=40))
+        make_transition("a.gov", False, now - timedelta(days=35))
+        make_transition("b.gov", True, now - timedelta(days=40))
+        make_transition("b.gov", False, now - timedelta(days=1))
+
+        assert node_status.prune_history() == 2
+        assert list(
+            NodeStatusTransition.objects.values_list("node", "is_online")
+        ) == [("a.gov", False), ("b.gov", False)]
+
+
+class TestGetAvailability:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.now = timezone.now()
+        patcher = mock.patch.object(timezone, "now", return_value=self.now)
+        patcher.start()
+        yield
+        patcher.stop()
+
+    def test_computes_fraction_online(self):
+        # Online at the start of the period, then offline for a day
+        make_transition("a.gov", True, self.now - timedelta(days=10))
+        make_transition("a.gov", False, self.now - timedelta(days=3))
+        make_transition("a.gov", True, self.now - timedelta(days=2))
+        # Only recorded for the last day, during which it was offline half
+        make_transition("b.gov", False, self.now - timedelta(days=1))
+        make_transition("b.gov", True, self.now - timedelta(hours=12))
+
+        history = node_status.get_availability(7)
+
+        assert [node["name"] for node in history] == ["a.gov", "b.gov"]
+        assert history[0]["availability"] == round(6 / 7, 4)
+        assert history[0]["is_online"] is True
+        assert [t["is_online"] for t in history[0]["transitions"]] == [
+            False,
+            True,
+        ]
+        assert history[1]["availability"] == 0.5
+        assert len(history[1]["transitions"]) == 2
+
+
+class TestPollNodeStatusCommand:
+    @pytest.fixture(autouse=True)
+    def close_old_connections(self):
+        # Closing the connection would end the transaction of the test
+        with mock.patch(
+            "metagrid.api_proxy.management.commands.poll_node_status."
+            "close_old_connections"
+        ) as close_old_connections:
+            self.close_old_connections = close_old_connections
+            yield
+
+    def test_polls_once(self, capsys):
+        with mock.patch.object(
+            node_status,
+            "fetch_raw_node_status",
+            return_value=make_raw_node_status({"a.gov": True}),
+        ):
+            call_command("poll_node_status", "--once")
+
+        assert "Polled 1 nodes, 1 online" in capsys.readouterr().out
+        assert NodeStatusTransition.objects.count() == 1
+        assert NodeStatusSnapshot.objects.get().raw == make_raw_node_status(
+            {"a.gov": True}
+        )
+        self.close_old_connections.assert_called_once_with()
+
+    def test_survives_failed_polls(self):
+        with mock.patch.object(
+            node_status,
+            "fetch_raw_node_status",
+            side_effect=requests.ConnectionError(),
+        ):
+            call_command("poll_node_status", "--once")
+
+        assert NodeStatusTransition.objects.count() == 0
+        assert not NodeStatusSnapshot.objects.exists()
+
+
+class TestNodeStatusViews(APITestCase):
+    def setUp(self):
+        cache.delete(node_status.SNAPSHOT_CACHE_KEY)
+        patcher = mock.patch.object(requests.Session, "get")
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.raw = make_raw_node_status({"a.gov": True})
+
+    def test_status_is_fetched_once_without_poller(self):
+        self.mock_get.return_value = make_response(
+            json.dumps(self.raw).encode()
+        )
+
+        response = self.client.get(reverse("node-status"))
+        self.client.get(reverse("node-status"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["nodes"][0]["name"] == "a.gov"
+        assert response.json()["nodes"][0]["is_online"] is True
+        assert self.mock_get.call_count == 1
+
+    def test_status_upstream_unavailable(self):
+        self.mock_get.side_effect = requests.ConnectionError()
+
+        response = self.client.get(reverse("node-status"))
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+
+    def test_proxy_serves_snapshot(self):
+        with mock.patch.object(
+            node_status, "fetch_raw_node_status", return_value=self.raw
+        ):
+            node_status.poll()
+
+        response = self.client.get(reverse("proxy-status"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == self.raw
+        self.mock_get.assert_not_called()
+
+    def test_history(self):
+        make_transition("a.gov", True, timezone.now() - timedelta(days=1))
+
+        response = self.client.get(reverse("node-status-history"), {"days": 1})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["days"] == 1
+        assert response.json()["nodes"][0]["availability"] == 1
+
+    def test_history_validates_days(self):
+        for days in ("0", "abc", "10000"):
+            response = self.client.get(
+                reverse("node-status-history"), {"days": days}
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,72 @@
+from metagrid.api_proxy.query import canonicalize_query, parse_query
+
+
+class TestParseQuery:
+    def test_splits_and_sorts_list_values(self):
+        params = parse_query("facets=source_id, activity_id&source_id=b,a,a")
+
+        assert params == {
+            "facets": ["activity_id", "source_id"],
+            "source_id": ["a", "b"],
+        }
+
+    def test_keeps_free_text_as_it_is(self):
+        params = parse_query("query=surface,%20air&query=ocean, air")
+
+        assert params == {"query": ["ocean, air"]}
+
+    def test_keeps_encoded_commas_in_facet_values(self):
+        params = parse_query("variable_long_name=b%2C%20c,a")
+
+        assert params == {"variable_long_name": ["a", "b, c"]}
+
+    def test_keeps_last_value_of_scalar_params(self):
+        params = parse_query("limit=0&limit=10&bbox=[-10,-10,10,10]")
+
+        assert params == {"bbox": ["[-10,-10,10,10]"], "limit": ["10"]}
+
+    def test_drops_wildcard_and_empty_values(self):
+        assert parse_query("query=*&project=&&=foo") == {}
+
+
+class TestCanonicalizeQuery:
+    def test_equivalent_queries_have_same_canonical_form(self):
+        queries = [
+            "offset=0&limit=10&project=CMIP6&query=*&source_id=b,a&",
+            "source_id=a&source_id=b&limit=10&offset=0&project=CMIP6",
+            "project=CMIP6&source_id=a,b,a&offset=0&limit=10&query=",
+        ]
+
+        canonical_queries = {canonicalize_query(query) for query in queries}
+        assert canonical_queries == {
+            "limit=10&offset=0&project=CMIP6&source_id=a,b"
+        }
+
+    def test_encodes_special_characters(self):
+        canonical_query = canonicalize_query(
+            "project%21=CMIP6&format=application%2Fsolr%2Bjson"
+        )
+
+        assert canonical_query == (
+            "format=application%2Fsolr%2Bjson&project%21=CMIP6"
+        )
+
+    def test_distinguishes_different_queries(self):
+        assert canonicalize_query("query=surface,air") != canonicalize_query(
+            "query=air,surface"
+        )
+        assert canonicalize_query("source_id=a%2Cb") != canonicalize_query(
+            "source_id=a,b"
+        )
+
+    def test_keeps_free_text_and_encoded_commas(self):
+        canonical_query = canonicalize_query(
+            "query=surface,%20air&variable_long_name=b%2C%20c,a"
+        )
+
+        assert canonical_query == (
+            "query=surface,+air&variable_long_name=a,b%2C+c"
+        )
+
+    def test_handles_missing_query_string(self):
+        assert canonicalize_query(None) == ""
@@ -0,0 +1,137 @@
+from unittest import mock
+
+import pytest
+import requests
+from django.test import override_settings
+
+from metagrid.api_proxy import upstream
+from metagrid.api_proxy.tests.utils import make_response
+
+
+class TestGetAllowedHosts:
+    def test_includes_service_and_extra_hosts(self):
+        with override_settings(
+            ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/",
+            ESGF_PROXY_ALLOWED_HOSTS=["Cera-WWW.dkrz.de"],
+        ):
+            hosts = upstream.get_allowed_hosts()
+
+        assert "esgf-node.llnl.gov" in hosts
+        assert "cera-www.dkrz.de" in hosts
+
+
+class TestGetOrigin:
+    def test_returns_origin_of_allowed_url(self):
+        with override_settings(
+            ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/"
+        ):
+            origin = upstream.get_origin(
+                "https://esgf-node.llnl.gov:443/esg-search/search/?limit=0"
+            )
+
+        assert origin == "https://esgf-node.llnl.gov:443"
+
+    def test_raises_exception_for_host_not_allowed(self):
+        with pytest.raises(upstream.UpstreamHostNotAllowed):
+            upstream.get_origin("https://example.com/search/")
+
+    def test_raises_exception_for_unsupported_scheme(self):
+        with override_settings(
+            ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/"
+        ):
+            with pytest.raises(upstream.UpstreamHostNotAllowed):
+                upstream.get_origin("file://esgf-node.llnl.gov/etc/passwd")
+
+
+class TestGetSession:
+    def test_reuses_session_per_origin(self):
+        with override_settings(
+            ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/",
+            ESGF_WGET_URL="https://esgf-node.llnl.gov/esg-search/wget",
+        ):
+            search_session = upstream.get_session(
+                "https://esgf-node.llnl.gov/esg-search/search/"
+            )
+            wget_session = upstream.get_session(
+                "https://esgf-node.llnl.gov/esg-search/wget"
+            )
+
+        assert search_session is wget_session
+
+
+class TestFetch:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_SEARCH_URL = (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+        settings.ESGF_PROXY_ALLOWED_HOSTS = ["cera-www.dkrz.de"]
+
+    def test_follows_redirects_to_allowed_hosts(self):
+        with mock.patch.object(
+            requests.Session,
+            "get",
+            side_effect=[
+                make_response(
+                    status_code=302,
+                    headers={"Location": "https://cera-www.dkrz.de/a"},
+                ),
+                make_response(status_code=301, headers={"Location": "/b?x=1"}),
+                make_response(b"ok"),
+            ],
+        ) as mock_get:
+            response = upstream.fetch(
+                "https://esgf-node.llnl.gov/esg-search/search/",
+                params={"project": "CMIP6"},
+            )
+
+        assert response.raw.read() == b"ok"
+        assert [call[0][0] for call in mock_get.call_args_list] == [
+            "https://esgf-node.llnl.gov/esg-search/search/",
+            "https://cera-www.dkrz.de/a",
+            "https://cera-www.dkrz.de/b?x=1",
+        ]
+        assert mock_get.call_args_list[0][1]["params"] == {"project": "CMIP6"}
+        assert "params" not in mock_get.call_args_list[1][1]
+        assert all(
+            call[1]["allow_redirects"] is False
+            for call in mock_get.call_args_list
+        )
+
+    def test_rejects_redirects_to_other_hosts(self):
+        with mock.patch.object(
+            requests.Session,
+            "get",
+            return_value=make_response(
+                status_code=302,
+                headers={"Location": "http://169.254.169.254/latest/"},
+            ),
+        ) as mock_get:
+            with pytest.raises(upstream.UpstreamHostNotAllowed):
+                upstream.fetch("https://esgf-node.llnl.gov/esg-search/search/")
+
+        assert mock_get.call_count == 1
+
+    def test_limits_redirects(self):
+        with mock.patch.object(
+            requests.Session,
+            "get",
+            side_effect=lambda url, **kwargs: make_response(
+                status_code=302, headers={"Location": url}
+            ),
+        ) as mock_get:
+            with pytest.raises(requests.TooManyRedirects):
+                upstream.fetch("https://esgf-node.llnl.gov/esg-search/search/")
+
+        assert mock_get.call_count == upstream.MAX_REDIRECTS + 1
+
+
+class TestIterResponse:
+    def test_streams_body_and_closes_response(self):
+        response = make_response(b"x" * (upstream.CHUNK_SIZE + 1))
+
+        with mock.patch.object(requests.Response, "close") as close:
+            chunks = list(upstream.iter_response(response))
+
+        assert len(chunks) == 2
+        close.assert_called_once()
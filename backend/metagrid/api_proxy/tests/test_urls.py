@@ -0,0 +1,35 @@
+from django.urls import reverse
+
+
+def test_search():
+    assert reverse("proxy-search") == "/api/v1/proxy/search/"
+
+
+def test_citation():
+    assert reverse("proxy-citation") == "/api/v1/proxy/citation/"
+
+
+def test_wget():
+    assert reverse("proxy-wget") == "/api/v1/proxy/wget/"
+
+
+def test_status():
+    assert reverse("proxy-status") == "/api/v1/proxy/status/"
+
+
+def test_search_federated():
+    assert reverse("proxy-search-federated") == (
+        "/api/v1/proxy/search/federated/"
+    )
+
+
+def test_node_status():
+    assert reverse("node-status") == "/api/v1/status/nodes/"
+
+
+def test_node_status_history():
+    assert reverse("node-status-history") == "/api/v1/status/nodes/history/"
+
+
+def test_citations():
+    assert reverse("proxy-citations") == "/api/v1/proxy/citations/"
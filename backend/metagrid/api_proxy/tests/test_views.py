@@ -0,0 +1,208 @@
+from unittest import mock
+
+import pytest
+import requests
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from metagrid.api_proxy.tests.utils import make_response
+
+pytestmark = pytest.mark.django_db
+
+
+@override_settings(
+    ESGF_SEARCH_URL="https://esgf-node.llnl.gov/esg-search/search/",
+    ESGF_WGET_URL="https://esgf-node.llnl.gov/esg-search/wget",
+    ESGF_NODE_STATUS_URL="https://aims4.llnl.gov/prometheus/api/v1/query",
+    ESGF_PROXY_ALLOWED_HOSTS=["cera-www.dkrz.de"],
+)
+class TestProxyViews(APITestCase):
+    def setUp(self):
+        patcher = mock.patch.object(requests.Session, "get")
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_search_streams_upstream_response(self):
+        self.mock_get.return_value = make_response(
+            b'{"response": {"numFound": 0}}',
+            headers={"Content-Type": "application/json"},
+        )
+
+        response = self.client.get(
+            reverse("proxy-search"), {"project": "CMIP6", "limit": 0}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/json"
+        assert b"".join(response.streaming_content) == (
+            b'{"response": {"numFound": 0}}'
+        )
+
+        url = self.mock_get.call_args[0][0]
+        assert url.startswith("https://esgf-node.llnl.gov/esg-search/search/?")
+        assert "project=CMIP6" in url
+
+    def test_search_sends_canonical_query_upstream(self):
+        self.mock_get.return_value = make_response(b"{}")
+
+        self.client.get(
+            f"{reverse('proxy-search')}?source_id=b,a&project=CMIP6&query=*&"
+        )
+
+        url = self.mock_get.call_args[0][0]
+        assert url == (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+            "?project=CMIP6&source_id=a,b"
+        )
+
+    def test_search_serves_equivalent_queries_from_cache(self):
+        self.mock_get.return_value = make_response(
+            b"{}", headers={"Content-Type": "application/json"}
+        )
+
+        response = self.client.get(
+            f"{reverse('proxy-search')}?source_id=b,a&project=CMIP6"
+        )
+        assert response["X-Cache"] == "MISS"
+        # The result is cached once it is fully streamed to the client
+        b"".join(response.streaming_content)
+
+        response = self.client.get(
+            f"{reverse('proxy-search')}?project=CMIP6&source_id=a&source_id=b"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Cache"] == "HIT"
+        assert response["Content-Type"] == "application/json"
+        assert response.content == b"{}"
+        self.mock_get.assert_called_once()
+
+    def test_search_does_not_cache_error_responses(self):
+        self.mock_get.side_effect = [
+            make_response(b"", status_code=500),
+            make_response(b"", status_code=500),
+        ]
+
+        for _ in range(2):
+            response = self.client.get(reverse("proxy-search"))
+            b"".join(response.streaming_content)
+
+        assert self.mock_get.call_count == 2
+
+    def test_search_passes_through_upstream_status_code(self):
+        self.mock_get.return_value = make_response(status_code=400)
+
+        response = self.client.get(reverse("proxy-search"))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_search_returns_bad_gateway_when_upstream_is_down(self):
+        self.mock_get.side_effect = requests.ConnectionError()
+
+        response = self.client.get(reverse("proxy-search"))
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+
+    def test_search_returns_gateway_timeout_when_upstream_is_slow(self):
+        self.mock_get.side_effect = requests.Timeout()
+
+        response = self.client.get(reverse("proxy-search"))
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+    def test_citation_fetches_allowed_url(self):
+        citation_url = "http://cera-www.dkrz.de/WDCC/meta/CMIP6/foo.json"
+        self.mock_get.return_value = make_response(b"{}")
+
+        response = self.client.get(
+            reverse("proxy-citation"), {"citurl": citation_url}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert self.mock_get.call_args[0][0] == citation_url
+
+    def test_citation_rejects_url_not_allowed(self):
+        response = self.client.get(
+            reverse("proxy-citation"), {"citurl": "https://example.com/"}
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        self.mock_get.assert_not_called()
+
+    def test_citation_requires_url(self):
+        response = self.client.get(reverse("proxy-citation"))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_wget_passes_through_content_disposition(self):
+        self.mock_get.return_value = make_response(
+            b"#!/bin/bash",
+            headers={
+                "Content-Type": "text/x-sh",
+                "Content-Disposition": "attachment; filename=wget.sh",
+            },
+        )
+
+        response = self.client.get(
+            reverse("proxy-wget"), {"dataset_id": "foo|bar"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Disposition"] == (
+            "attachment; filename=wget.sh"
+        )
+
+    def test_status_ignores_client_query_string(self):
+        self.mock_get.return_value = make_response(b"{}")
+
+        response = self.client.get(reverse("proxy-status"), {"foo": "bar"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert self.mock_get.call_args[0][0] == (
+            "https://aims4.llnl.gov/prometheus/api/v1/query"
+        )
+
+
+@override_settings(
+    ESGF_FEDERATED_INDEX_NODES=[
+        "https://esgf-node.llnl.gov/esg-search/search/",
+        "https://esgf-data.dkrz.de/esg-search/search/",
+    ],
+)
+class TestFederatedSearchView(APITestCase):
+    def setUp(self):
+        patcher = mock.patch.object(requests.Session, "get")
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_merged_results(self):
+        self.mock_get.side_effect = lambda *args, **kwargs: make_response(
+            b'{"response": {"numFound": 1, "docs": [{"instance_id": "a"}]}}'
+        )
+
+        response = self.client.get(
+            reverse("proxy-search-federated"), {"project": "CMIP6"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["response"]["numFound"] == 2
+        assert len(response.json()["response"]["docs"]) == 1
+        assert len(response.json()["nodes"]) == 2
+
+    def test_rejects_offset(self):
+        response = self.client.get(
+            reverse("proxy-search-federated"), {"offset": 10}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "offset" in response.json()
+        self.mock_get.assert_not_called()
+
+    def test_returns_bad_gateway_when_no_node_answers(self):
+        self.mock_get.side_effect = requests.ConnectionError()
+
+        response = self.client.get(reverse("proxy-search-federated"))
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+        assert all(
+            node["status"] == "failed"
+            for node in response.json()["nodes"].values()
+        )
@@ -0,0 +1,17 @@
+import io
+from typing import Dict, Optional
+
+import requests
+
+
+def make_response(
+    body: bytes = b"",
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> requests.Response:
+    """Builds an upstream response whose body can be streamed."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(body)
+    response.headers.update(headers or {})
+    return response
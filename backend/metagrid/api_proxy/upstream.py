@@ -0,0 +1,210 @@
+"""
+Pooled HTTP sessions for the upstream ESGF services.
+
+Every upstream host gets its own ``requests.Session`` so keep-alive
+connections, and the TLS sessions behind them, are reused across requests
+instead of paying for a new handshake on every call.
+
+The async views (see metagrid.api_proxy.async_views) share an
+``httpx.AsyncClient`` per event loop instead, which holds many requests in
+flight at once without a thread for each.
+
+Redirects are followed by hand, so that every hop is checked against the
+allow-list, rather than letting an allowed host redirect the proxy anywhere.
+"""
+import asyncio
+import threading
+import weakref
+from typing import AsyncIterator, Dict, FrozenSet, Iterator, MutableMapping
+from urllib.parse import urljoin, urlparse
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Size of the chunks read from upstream responses while streaming them
+CHUNK_SIZE = 64 * 1024
+
+# Redirects that are followed per request
+MAX_REDIRECTS = 5
+
+_sessions = {}  # type: Dict[str, requests.Session]
+_sessions_lock = threading.Lock()
+
+_async_clients = (
+    weakref.WeakKeyDictionary()
+)  # type: MutableMapping[asyncio.AbstractEventLoop, httpx.AsyncClient]
+
+
+class UpstreamHostNotAllowed(Exception):
+    """Raised when a URL points to a host outside of the proxy allow-list."""
+
+
+def get_allowed_hosts() -> FrozenSet[str]:
+    """Returns the hosts that the proxy is allowed to contact."""
+    service_urls = (
+        settings.ESGF_SEARCH_URL,
+        settings.ESGF_WGET_URL,
+        settings.ESGF_NODE_STATUS_URL,
+        *settings.ESGF_FEDERATED_INDEX_NODES,
+    )
+    hosts = {urlparse(url).hostname for url in service_urls}
+    hosts.update(settings.ESGF_PROXY_ALLOWED_HOSTS)
+
+    return frozenset(host.lower() for host in hosts if host)
+
+
+def get_origin(url: str) -> str:
+    """Validates a URL against the allow-list and returns its origin.
+
+    The origin (scheme, host and port) identifies the connection pool that
+    requests to the URL are sent through.
+    """
+    parsed_url = urlparse(url)
+
+    if parsed_url.scheme not in ("http", "https"):
+        raise UpstreamHostNotAllowed(f"Unsupported URL scheme: {url}")
+    if (parsed_url.hostname or "").lower() not in get_allowed_hosts():
+        raise UpstreamHostNotAllowed(
+            f"Host is not in the proxy allow-list: {parsed_url.hostname}"
+        )
+
+    return f"{parsed_url.scheme}://{parsed_url.netloc.lower()}"
+
+
+def get_session(url: str) -> requests.Session:
+    """Returns the pooled session for the upstream host of a URL."""
+    origin = get_origin(url)
+
+    with _sessions_lock:
+        session = _sessions.get(origin)
+
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.ESGF_PROXY_POOL_MAXSIZE,
+            )
+            session = requests.Session()
+            session.mount(origin, adapter)
+            _sessions[origin] = session
+
+    return session
+
+
+def fetch(url: str, **kwargs) -> requests.Response:
+    """Sends a streamed GET request through the pooled session of a URL.
+
+    The body is not read, so the caller must either consume it with
+    ``iter_response`` or close the response.
+
+    :raises UpstreamHostNotAllowed: If the URL, or a URL that it redirects
+        to, is not allowed
+    """
+    kwargs.setdefault("timeout", settings.ESGF_PROXY_TIMEOUT)
+
+    for _ in range(MAX_REDIRECTS + 1):
+        response = get_session(url).get(
+            url, stream=True, allow_redirects=False, **kwargs
+        )
+        if not response.is_redirect:
+            return response
+
+        response.close()
+        # The redirect holds the whole query, which is not sent again
+        kwargs.pop("params", None)
+        url = urljoin(url, response.headers["Location"])
+
+    raise requests.TooManyRedirects(
+        f"Exceeded {MAX_REDIRECTS} redirects", response=response
+    )
+
+
+def iter_response(response: requests.Response) -> Iterator[bytes]:
+    """Yields the body of a response and releases its connection afterwards.
+
+    Releasing the connection returns it to the session's pool, which only
+    happens once the body has been read or the response is closed.
+    """
+    try:
+        yield from response.iter_content(CHUNK_SIZE)
+    finally:
+        response.close()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the pooled async client of the running event loop.
+
+    Clients are bound to the event loop that they are created in, which is
+    one per ASGI worker.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.ESGF_PROXY_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ESGF_PROXY_POOL_MAXSIZE,
+            ),
+            timeout=settings.ESGF_PROXY_TIMEOUT,
+        )
+        _async_clients[loop] = client
+
+    return client
+
+
+async def async_open(url: str, **kwargs) -> httpx.Response:
+    """Sends a streamed GET request through the pooled async client.
+
+    The body is not read, so the caller must either consume it with
+    ``aiter_response`` or close the response.
+
+    :raises UpstreamHostNotAllowed: If the URL, or a URL that it redirects
+        to, is not allowed
+    """
+    client = get_async_client()
+
+    for _ in range(MAX_REDIRECTS + 1):
+        get_origin(url)
+        response = await client.send(
+            client.build_request("GET", url, **kwargs),
+            stream=True,
+            allow_redirects=False,
+        )
+        if not response.is_redirect:
+            return response
+
+        await response.aclose()
+        kwargs.pop("params", None)
+        url = urljoin(url, response.headers["Location"])
+
+    raise httpx.TooManyRedirects(
+        f"Exceeded {MAX_REDIRECTS} redirects", request=response.request
+    )
+
+
+async def async_fetch(url: str, **kwargs) -> httpx.Response:
+    """Sends a GET request through the pooled async client.
+
+    Unlike ``async_open``, the body is read before returning, which releases
+    the connection back to the pool.
+
+    :raises UpstreamHostNotAllowed: If the URL, or a URL that it redirects
+        to, is not allowed
+    """
+    response = await async_open(url, **kwargs)
+    try:
+        await response.aread()
+    finally:
+        await response.aclose()
+    return response
+
+
+async def aiter_response(response: httpx.Response) -> AsyncIterator[bytes]:
+    """Yields the body of a response and releases its connection afterwards."""
+    try:
+        async for chunk in response.aiter_bytes():
+            yield chunk
+    finally:
+        await response.aclose()
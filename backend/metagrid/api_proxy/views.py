@@ -0,0 +1,285 @@
+from typing import Optional
+
+import requests
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from rest_framework import exceptions, status
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from metagrid.api_proxy.cache import cache_stream, get_cached_result
+from metagrid.api_proxy.citations import get_citations
+from metagrid.api_proxy.exceptions import UpstreamTimeout, UpstreamUnavailable
+from metagrid.api_proxy.federation import (
+    InvalidFederatedQuery,
+    federated_search,
+)
+from metagrid.api_proxy.node_status import (
+    get_availability,
+    get_snapshot,
+    refresh_snapshot,
+)
+from metagrid.api_proxy.query import canonicalize_query
+from metagrid.api_proxy.serializers import CitationsSerializer
+from metagrid.api_proxy.upstream import (
+    UpstreamHostNotAllowed,
+    fetch,
+    iter_response,
+)
+
+# Upstream response headers that are passed through to the client
+PASSTHROUGH_HEADERS = ("Content-Disposition",)
+
+
+class PassthroughContentNegotiation(BaseContentNegotiation):
+    """
+    Skips content negotiation since the upstream service decides the
+    content type of the response.
+    https://www.django-rest-framework.org/api-guide/content-negotiation/#example
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class ProxyView(APIView):
+    """
+    Base view that streams the response of an upstream ESGF service back to
+    the client through a pooled connection.
+    """
+
+    authentication_classes = []  # type: ignore
+    permission_classes = [AllowAny]
+    content_negotiation_class = PassthroughContentNegotiation
+
+    def get_upstream_url(self, request) -> str:
+        raise NotImplementedError(".get_upstream_url() must be implemented")
+
+    def get_query_string(self, request) -> Optional[str]:
+        """Returns the query string forwarded to the upstream service."""
+        return request.META.get("QUERY_STRING")
+
+    def get(self, request, *args, **kwargs):
+        url = self.get_upstream_url(request)
+        query_string = self.get_query_string(request)
+        if query_string:
+            separator = "&" if "?" in url else "?"
+            url = f"{url}{separator}{query_string}"
+
+        try:
+            upstream_response = fetch(url)
+        except UpstreamHostNotAllowed as e:
+            raise exceptions.PermissionDenied(str(e))
+        except requests.Timeout:
+            raise UpstreamTimeout()
+        except requests.RequestException:
+            raise UpstreamUnavailable()
+
+        response = StreamingHttpResponse(
+            iter_response(upstream_response),
+            status=upstream_response.status_code,
+            content_type=upstream_response.headers.get("Content-Type"),
+        )
+        for header in PASSTHROUGH_HEADERS:
+            if header in upstream_response.headers:
+                response[header] = upstream_response.headers[header]
+
+        return response
+
+
+class SearchProxyView(ProxyView):
+    """
+    Proxies the ESGF Search API.
+    https://esgf.github.io/esg-search/ESGF_Search_RESTful_API.html
+
+    Queries are canonicalized so that equivalent searches share a single
+    cached result.
+    """
+
+    def get_upstream_url(self, request) -> str:
+        return settings.ESGF_SEARCH_URL
+
+    def get_query_string(self, request) -> Optional[str]:
+        return canonicalize_query(request.META.get("QUERY_STRING"))
+
+    def get(self, request, *args, **kwargs):
+        canonical_query = canonicalize_query(request.META.get("QUERY_STRING"))
+
+        cached_result = get_cached_result(canonical_query)
+        if cached_result is not None:
+            content_type, body = cached_result
+            response = HttpResponse(
+                body, content_type=content_type
+            )  # type: HttpResponseBase
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        response["X-Cache"] = "MISS"
+        if isinstance(response, StreamingHttpResponse) and (
+            response.status_code == status.HTTP_200_OK
+        ):
+            response.streaming_content = cache_stream(
+                canonical_query,
+                response.get("Content-Type"),
+                response.streaming_content,
+            )
+        return response
+
+
+class FederatedSearchView(APIView):
+    """
+    Searches multiple ESGF index nodes concurrently and merges their results,
+    reporting which nodes answered in 'nodes'. Only the first 'limit'
+    datasets are returned, so 'offset' is rejected.
+
+    Responds with 502 if none of the nodes answered.
+    """
+
+    authentication_classes = []  # type: ignore
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            results = federated_search(
+                canonicalize_query(request.META.get("QUERY_STRING"))
+            )
+        except InvalidFederatedQuery as e:
+            raise exceptions.ValidationError({e.param: str(e)})
+        answered = any(
+            node["status"] == "responded" for node in results["nodes"].values()
+        )
+
+        return Response(
+            results,
+            status=status.HTTP_200_OK
+            if answered
+            else status.HTTP_502_BAD_GATEWAY,
+        )
+
+
+class CitationProxyView(ProxyView):
+    """
+    Proxies the citation URL of a dataset, which is passed in the 'citurl'
+    query parameter.
+    """
+
+    def get_upstream_url(self, request) -> str:
+        citation_url = request.query_params.get("citurl")
+        if not citation_url:
+            raise exceptions.ValidationError(
+                {"citurl": "This query parameter is required."}
+            )
+        return citation_url
+
+    def get_query_string(self, request) -> Optional[str]:
+        return None
+
+
+class CitationsView(APIView):
+    """
+    Returns the processed citations at a batch of citation URLs, which are
+    stored once fetched. URLs whose citation could not be fetched are
+    reported in 'errors'.
+    """
+
+    authentication_classes = []  # type: ignore
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = CitationsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        citations, errors = get_citations(
+            list(dict.fromkeys(serializer.validated_data["citation_urls"]))
+        )
+        return Response({"citations": citations, "errors": errors})
+
+
+class WgetProxyView(ProxyView):
+    """
+    Proxies the ESGF wget API.
+    https://github.com/ESGF/esgf-wget
+    """
+
+    def get_upstream_url(self, request) -> str:
+        return settings.ESGF_WGET_URL
+
+
+class NodeStatusProxyView(ProxyView):
+    """
+    Proxies the ESGF node status API.
+    https://github.com/ESGF/esgf-utils/blob/master/node_status/query_prom.py
+
+    The raw results of the latest poll are served when the node status
+    poller is running, so clients do not each query the status service.
+    """
+
+    def get_upstream_url(self, request) -> str:
+        return settings.ESGF_NODE_STATUS_URL
+
+    def get_query_string(self, request) -> Optional[str]:
+        return None
+
+    def get(self, request, *args, **kwargs):
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            return Response(snapshot["raw"])
+        return super().get(request, *args, **kwargs)
+
+
+class NodeStatusView(APIView):
+    """
+    Returns the status of the ESGF data nodes from their latest poll.
+
+    The status is fetched once if it has not been polled yet, e.g. when the
+    'poll_node_status' command is not running.
+    """
+
+    authentication_classes = []  # type: ignore
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        snapshot = get_snapshot()
+        if snapshot is None:
+            try:
+                snapshot = refresh_snapshot()
+            except requests.Timeout:
+                raise UpstreamTimeout()
+            except (requests.RequestException, ValueError, KeyError):
+                raise UpstreamUnavailable()
+
+        return Response(
+            {"polled_at": snapshot["polled_at"], "nodes": snapshot["nodes"]}
+        )
+
+
+class NodeStatusHistoryView(APIView):
+    """
+    Returns the availability of the ESGF data nodes and their changes of
+    status over the past 'days', which default to 7.
+    """
+
+    authentication_classes = []  # type: ignore
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            days = 0
+        if not 0 < days <= settings.ESGF_NODE_STATUS_HISTORY_DAYS:
+            raise exceptions.ValidationError(
+                {
+                    "days": "Must be an integer from 1 to "
+                    f"{settings.ESGF_NODE_STATUS_HISTORY_DAYS}."
+                }
+            )
+
+        return Response({"days": days, "nodes": get_availability(days)})
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from metagrid.cart.models import Cart, Search
+from metagrid.cart.models import Cart, CartItem, Search
 
 
 @admin.register(Cart)
@@ -8,6 +8,12 @@ class CartAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    list_display = ("dataset_id", "cart", "data_node", "size", "added")
+    raw_id_fields = ("cart",)
+
+
 @admin.register(Search)
 class SearchAdmin(admin.ModelAdmin):
     pass
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0011_auto_20201222_2112'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset_id', models.CharField(max_length=1024)),
+                ('data_node', models.CharField(blank=True, max_length=255)),
+                ('size', models.BigIntegerField(blank=True, null=True)),
+                ('number_of_files', models.IntegerField(blank=True, null=True)),
+                ('project', models.CharField(blank=True, max_length=255)),
+                ('added', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(default=dict)),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='cart.cart')),
+            ],
+            options={
+                'verbose_name': 'Cart Item',
+                'verbose_name_plural': 'Cart Items',
+                'ordering': ('added', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'added', 'id'], name='cart_item_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'size'], name='cart_item_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'data_node'], name='cart_item_data_node_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'dataset_id'), name='unique_cart_dataset'),
+        ),
+    ]
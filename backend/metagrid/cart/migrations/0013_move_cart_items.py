@@ -0,0 +1,101 @@
+# Moves the JSON items of carts into CartItem rows, in batches of carts so
+# that large installations are not loaded into memory at once.
+
+from django.db import migrations
+
+CART_BATCH_SIZE = 100
+ITEM_BATCH_SIZE = 1000
+
+# Limits of the CartItem columns, which legacy items are not checked against
+MAX_DATASET_ID_LENGTH = 1024
+MAX_CHAR_LENGTH = 255
+MAX_SIZE = 2 ** 63 - 1
+MAX_NUMBER_OF_FILES = 2 ** 31 - 1
+
+
+def get_text(value):
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    if not isinstance(value, str):
+        return ""
+    return value[:MAX_CHAR_LENGTH]
+
+
+def get_integer(value, max_value):
+    """Coerces a legacy count to an integer, or None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            return None
+    if isinstance(value, int) and 0 <= value <= max_value:
+        return value
+    return None
+
+
+def is_movable(item):
+    """Items without a dataset id that fits its column cannot be keyed."""
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("id"), str)
+        and 0 < len(item["id"]) <= MAX_DATASET_ID_LENGTH
+    )
+
+
+def move_items_to_rows(apps, schema_editor):
+    Cart = apps.get_model("cart", "Cart")
+    CartItem = apps.get_model("cart", "CartItem")
+
+    carts = Cart.objects.exclude(items=[]).order_by("id")
+    for cart in carts.iterator(chunk_size=CART_BATCH_SIZE):
+        # Items that cannot be keyed are dropped, and malformed fields are
+        # left empty, so that one bad legacy item does not abort the deploy
+        cart_items = [
+            CartItem(
+                cart_id=cart.id,
+                dataset_id=item["id"],
+                data_node=get_text(item.get("data_node")),
+                size=get_integer(item.get("size"), MAX_SIZE),
+                number_of_files=get_integer(
+                    item.get("number_of_files"), MAX_NUMBER_OF_FILES
+                ),
+                project=get_text(item.get("project")),
+                data=item,
+            )
+            for item in cart.items
+            if is_movable(item)
+        ]
+        CartItem.objects.bulk_create(
+            cart_items, batch_size=ITEM_BATCH_SIZE, ignore_conflicts=True
+        )
+
+
+def move_rows_to_items(apps, schema_editor):
+    Cart = apps.get_model("cart", "Cart")
+    CartItem = apps.get_model("cart", "CartItem")
+
+    cart_ids = CartItem.objects.values_list("cart_id", flat=True).distinct()
+    for cart in Cart.objects.filter(id__in=cart_ids).iterator(
+        chunk_size=CART_BATCH_SIZE
+    ):
+        cart.items = list(
+            CartItem.objects.filter(cart_id=cart.id)
+            .order_by("added", "id")
+            .values_list("data", flat=True)
+        )
+        cart.save(update_fields=["items"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0012_cartitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_items_to_rows, move_rows_to_items),
+    ]
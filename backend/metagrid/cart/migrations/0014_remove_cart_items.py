@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0013_move_cart_items'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='cart',
+            name='items',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0014_remove_cart_items'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='search',
+            index=models.Index(fields=['user', 'id'], name='search_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='search',
+            index=models.Index(fields=['user', 'uuid'], name='search_user_uuid_idx'),
+        ),
+    ]
@@ -1,15 +1,51 @@
 import uuid
+from typing import Any, Dict, List, Optional
 
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.db import models, transaction
 from django.db.models import JSONField as JSONBField
+from django.db.models.functions import Coalesce
+
+
+class CartManager(models.Manager):
+    """Define a model manager for Cart model with delta updates of items.
+
+    Items are identified by their dataset 'id', so adding an item that is
+    already in the cart does nothing.
+    """
+
+    def add_items(self, user, items: List[Dict[str, Any]]) -> Optional[int]:
+        """Add items to a user's cart and return the new number of items.
+
+        Items already in the cart, and repeated items, are skipped.
+        """
+        cart_id = self.filter(user=user).values_list("id", flat=True).first()
+        if cart_id is None:
+            return None
+
+        CartItem.objects.bulk_create(
+            [CartItem.from_search_result(cart_id, item) for item in items],
+            batch_size=CartItem.BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return CartItem.objects.filter(cart_id=cart_id).count()
+
+    def remove_items(self, user, ids: List[str]) -> Optional[int]:
+        """Remove items from a user's cart and return the new number of items."""
+        cart_id = self.filter(user=user).values_list("id", flat=True).first()
+        if cart_id is None:
+            return None
+
+        CartItem.objects.filter(cart_id=cart_id, dataset_id__in=ids).delete()
+        return CartItem.objects.filter(cart_id=cart_id).count()
 
 
 class Cart(models.Model):
     """Model definition for Cart."""
 
     user = models.OneToOneField("users.User", on_delete=models.CASCADE)
-    items = JSONBField(default=list)
+
+    objects = CartManager()
 
     class Meta:
         """Meta definition for Cart."""
@@ -19,7 +55,135 @@ class Cart(models.Model):
 
     def __str__(self):
         """Unicode representation of Cart."""
-        return str(self.items)
+        return f"Cart of user {self.user_id}"
+
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        """The search results of the datasets in the cart, in added order."""
+        return list(self.cart_items.values_list("data", flat=True))
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Aggregate the items in the cart, in total and per group.
+
+        Totals are computed by Postgres, so the items are not loaded.
+        """
+        totals = {
+            "dataset_count": models.Count("id"),
+            "file_count": Coalesce(models.Sum("number_of_files"), 0),
+            "total_size": Coalesce(models.Sum("size"), 0),
+        }
+        summary = self.cart_items.aggregate(**totals)
+
+        for group in ("data_node", "project"):
+            summary[f"by_{group}"] = list(
+                self.cart_items.order_by()
+                .values(group)
+                .annotate(**totals)
+                .order_by("-dataset_count", group)
+            )
+
+        return summary
+
+    @transaction.atomic
+    def set_items(self, items: List[Dict[str, Any]]):
+        """Replace the items in the cart, keeping the ones already in it."""
+        ids = [item["id"] for item in items]
+        self.cart_items.exclude(dataset_id__in=ids).delete()
+
+        # Kept items are updated in place so that they keep their added date
+        kept_items = {
+            cart_item.dataset_id: cart_item
+            for cart_item in self.cart_items.filter(dataset_id__in=ids)
+        }
+        updated_items = []
+        new_items = []
+        for item in items:
+            cart_item = CartItem.from_search_result(self.pk, item)
+            kept_item = kept_items.get(cart_item.dataset_id)
+            if kept_item is None:
+                new_items.append(cart_item)
+            else:
+                cart_item.pk = kept_item.pk
+                updated_items.append(cart_item)
+
+        CartItem.objects.bulk_update(
+            updated_items,
+            CartItem.SEARCH_RESULT_FIELDS,
+            batch_size=CartItem.BATCH_SIZE,
+        )
+        CartItem.objects.bulk_create(
+            new_items, batch_size=CartItem.BATCH_SIZE, ignore_conflicts=True
+        )
+
+
+class CartItem(models.Model):
+    """Model definition for CartItem, a dataset in a cart."""
+
+    # Number of items inserted or updated per query
+    BATCH_SIZE = 1000
+
+    # Fields that are derived from the search result of the dataset
+    SEARCH_RESULT_FIELDS = [
+        "data_node",
+        "size",
+        "number_of_files",
+        "project",
+        "data",
+    ]
+
+    cart = models.ForeignKey(
+        Cart, related_name="cart_items", on_delete=models.CASCADE
+    )
+    dataset_id = models.CharField(max_length=1024)
+    data_node = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(blank=True, null=True)
+    number_of_files = models.IntegerField(blank=True, null=True)
+    project = models.CharField(max_length=255, blank=True)
+    added = models.DateTimeField(auto_now_add=True)
+    # The search result of the dataset, as returned by the ESGF Search API
+    data = JSONBField(default=dict)
+
+    class Meta:
+        """Meta definition for CartItem."""
+
+        verbose_name = "Cart Item"
+        verbose_name_plural = "Cart Items"
+        ordering = ("added", "id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "dataset_id"], name="unique_cart_dataset"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["cart", "added", "id"], name="cart_item_added_idx"
+            ),
+            models.Index(fields=["cart", "size"], name="cart_item_size_idx"),
+            models.Index(
+                fields=["cart", "data_node"], name="cart_item_data_node_idx"
+            ),
+        ]
+
+    def __str__(self):
+        """Unicode representation of CartItem."""
+        return self.dataset_id
+
+    @classmethod
+    def from_search_result(cls, cart_id: int, result: Dict[str, Any]):
+        """Create an unsaved item from the search result of a dataset."""
+        project = result.get("project") or ""
+        if isinstance(project, list):
+            project = project[0] if project else ""
+
+        return cls(
+            cart_id=cart_id,
+            dataset_id=result["id"],
+            data_node=result.get("data_node") or "",
+            size=result.get("size"),
+            number_of_files=result.get("number_of_files"),
+            project=project,
+            data=result,
+        )
 
 
 class Search(models.Model):
@@ -69,6 +233,13 @@ class Search(models.Model):
 
         verbose_name = "Search"
         verbose_name_plural = "Searches"
+        indexes = [
+            # Covers the listing of a user's searches, which is paginated
+            # with a cursor over the id
+            models.Index(fields=["user", "id"], name="search_user_id_idx"),
+            # Covers the lookup of a user's search by its uuid
+            models.Index(fields=["user", "uuid"], name="search_user_uuid_idx"),
+        ]
 
     def __str__(self):
         """Unicode representation of Search."""
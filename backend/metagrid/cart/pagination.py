@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CartItemPagination(PageNumberPagination):
+    """Pages the items of a cart, whose page size the client may choose."""
+
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class SearchPagination(CursorPagination):
+    """Pages the searches of a user with a cursor over their id.
+
+    Unlike page numbers, a cursor needs neither a COUNT(*) nor an OFFSET
+    scan, so every page is a range scan of the (user, id) index.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
@@ -1,19 +1,97 @@
 from rest_framework import serializers
 
-from metagrid.cart.models import Cart, Search
-from metagrid.projects.serializers import ProjectSerializer
+from metagrid.cart.models import Cart, CartItem, Search
+from metagrid.core.serializers import DynamicFieldsMixin
+from metagrid.projects.serializers import (
+    CompactProjectSerializer,
+    ProjectSerializer,
+)
 
+# Largest values of the integer fields that are copied from cart items
+CART_ITEM_INTEGER_FIELDS = {
+    "size": 2 ** 63 - 1,
+    "number_of_files": 2 ** 31 - 1,
+}
 
-class CartSerializer(serializers.ModelSerializer):
+
+def validate_cart_items(value):
+    """Check that every item has the dataset 'id' that it is keyed by, and
+    that the fields copied into integer columns hold integers that fit."""
+    for item in value:
+        if not isinstance(item.get("id"), str) or not item["id"]:
+            raise serializers.ValidationError(
+                "Every item must have a dataset 'id'."
+            )
+
+        for field, max_value in CART_ITEM_INTEGER_FIELDS.items():
+            number = item.get(field)
+            if number is None:
+                continue
+            if (
+                not isinstance(number, int)
+                or isinstance(number, bool)
+                or not 0 <= number <= max_value
+            ):
+                raise serializers.ValidationError(
+                    f"The '{field}' of every item must be a non-negative "
+                    "integer."
+                )
+
+
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     lookup_field = "user"
     read_only_fields = ("user",)
 
+    items = serializers.ListField(
+        child=serializers.DictField(), validators=[validate_cart_items]
+    )
+
     class Meta:
         model = Cart
         fields = ("user", "items")
 
+    def update(self, instance, validated_data):
+        items = validated_data.pop("items", None)
+        instance = super().update(instance, validated_data)
+        if items is not None:
+            instance.set_items(items)
+        return instance
+
+
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CartItem
+        fields = (
+            "dataset_id",
+            "data_node",
+            "size",
+            "number_of_files",
+            "project",
+            "added",
+            "data",
+        )
+
+
+class CartItemsAddSerializer(serializers.Serializer):
+    """Items to add to a cart, which are search results of datasets."""
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        validators=[validate_cart_items],
+    )
+
+
+class CartItemsRemoveSerializer(serializers.Serializer):
+    """Dataset ids of the items to remove from a cart."""
+
+    ids = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False
+    )
+
 
-class SearchSerializer(serializers.ModelSerializer):
+class SearchSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Only the pk and name of the project if 'compact=project' is passed
     project = ProjectSerializer(read_only=True)
 
     # To avoid creating a new foreign key object, create this field to
@@ -36,3 +114,4 @@ class SearchSerializer(serializers.ModelSerializer):
             "text_inputs",
             "url",
         )
+        compact_fields = {"project": CompactProjectSerializer}
@@ -22,7 +22,17 @@ class CartFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = "cart.Cart"
 
-    items = factory.Dict({"title": "dataset"}, dict_factory=JSONFactory)
+
+class CartItemFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = "cart.CartItem"
+
+    dataset_id = factory.Sequence(lambda n: f"dataset{n}|esgf-node.llnl.gov")
+    data_node = "esgf-node.llnl.gov"
+    size = factory.Sequence(lambda n: n * 1024)
+    number_of_files = 1
+    project = "CMIP6"
+    data = factory.LazyAttribute(lambda item: {"id": item.dataset_id})
 
 
 class SearchFactory(factory.django.DjangoModelFactory):
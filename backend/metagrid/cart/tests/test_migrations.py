@@ -0,0 +1,52 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = [("cart", "0012_cartitem"), ("users", "0005_auto_20201102_1902")]
+AFTER = [("cart", "0013_move_cart_items")]
+
+
+@pytest.fixture
+def executor(db):
+    # PostgreSQL runs the migrations in the test's transaction, so they are
+    # rolled back with it
+    executor = MigrationExecutor(connection)
+    executor.migrate(BEFORE)
+    return executor
+
+
+def test_move_cart_items_skips_malformed_legacy_data(executor):
+    apps = executor.loader.project_state(BEFORE).apps
+    User = apps.get_model("users", "User")
+    Cart = apps.get_model("cart", "Cart")
+
+    cart = Cart.objects.create(
+        user=User.objects.create(email="legacy@example.com"),
+        items=[
+            {"id": "good", "size": 10, "number_of_files": "2"},
+            {"id": "bad-size", "size": "large", "number_of_files": 1.5},
+            {"id": "too-big", "size": 2 ** 63, "number_of_files": -1},
+            {"id": "x" * 1025, "size": 1},
+            {"id": "project", "project": {"name": "CMIP6"}, "data_node": []},
+            {"title": "no id"},
+            "not an item",
+        ],
+    )
+
+    executor.loader.build_graph()
+    executor.migrate(AFTER)
+
+    apps = executor.loader.project_state(AFTER).apps
+    CartItem = apps.get_model("cart", "CartItem")
+    rows = {
+        item.dataset_id: item
+        for item in CartItem.objects.filter(cart_id=cart.id)
+    }
+
+    assert set(rows) == {"good", "bad-size", "too-big", "project"}
+    assert (rows["good"].size, rows["good"].number_of_files) == (10, 2)
+    assert rows["bad-size"].size is None
+    assert rows["bad-size"].number_of_files is None
+    assert rows["too-big"].size is None
+    assert rows["too-big"].number_of_files is None
+    assert (rows["project"].project, rows["project"].data_node) == ("", "")
@@ -1,16 +1,154 @@
 from typing import TYPE_CHECKING
 
-from metagrid.cart.tests.factories import CartFactory, SearchFactory
+import pytest
+
+from metagrid.cart.models import Cart, CartItem
+from metagrid.cart.tests.factories import (
+    CartFactory,
+    CartItemFactory,
+    SearchFactory,
+)
+from metagrid.users.tests.factories import UserFactory
 
 if TYPE_CHECKING:
-    from metagrid.cart.models import Cart, Search
+    from metagrid.cart.models import Search
 
 
 class TestCart:
     def test__str__(self):
-        items = [{"title": "dataset"}]
-        cart = CartFactory.build(items=items)  # type: Cart
-        assert cart.__str__() == str(items)
+        cart = CartFactory.build(user_id=1)  # type: Cart
+        assert cart.__str__() == "Cart of user 1"
+
+
+@pytest.mark.django_db
+class TestCartManager:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.user = UserFactory()
+        Cart.objects.add_items(self.user, [{"id": "foo"}, {"id": "bar"}])
+
+    def get_ids(self):
+        cart = Cart.objects.get(user=self.user)
+        return [item["id"] for item in cart.items]
+
+    def test_add_items_skips_duplicates(self):
+        count = Cart.objects.add_items(
+            self.user,
+            [{"id": "baz"}, {"id": "foo"}, {"id": "qux"}, {"id": "baz"}],
+        )
+
+        assert count == 4
+        assert self.get_ids() == ["foo", "bar", "baz", "qux"]
+
+    def test_add_items_to_empty_cart(self):
+        Cart.objects.remove_items(self.user, ["foo", "bar"])
+
+        count = Cart.objects.add_items(self.user, [{"id": "foo"}])
+
+        assert count == 1
+        assert self.get_ids() == ["foo"]
+
+    def test_remove_items(self):
+        count = Cart.objects.remove_items(self.user, ["foo", "baz"])
+
+        assert count == 1
+        assert self.get_ids() == ["bar"]
+
+    def test_remove_all_items(self):
+        count = Cart.objects.remove_items(self.user, ["foo", "bar"])
+
+        assert count == 0
+        assert self.get_ids() == []
+
+    def test_returns_none_without_cart(self):
+        Cart.objects.filter(user=self.user).delete()
+
+        assert Cart.objects.remove_items(self.user, ["foo"]) is None
+
+    def test_set_items_keeps_added_date_of_kept_items(self):
+        cart = Cart.objects.get(user=self.user)
+        added = cart.cart_items.get(dataset_id="bar").added
+
+        cart.set_items([{"id": "baz"}, {"id": "bar", "size": 1}])
+
+        assert self.get_ids() == ["bar", "baz"]
+        kept_item = cart.cart_items.get(dataset_id="bar")
+        assert kept_item.added == added
+        assert kept_item.size == 1
+
+    def test_get_summary(self):
+        cart = Cart.objects.get(user=self.user)
+        cart.cart_items.all().delete()
+        CartItemFactory(cart=cart, size=1, number_of_files=1, data_node="a")
+        CartItemFactory(cart=cart, size=2, number_of_files=3, data_node="a")
+        CartItemFactory(
+            cart=cart, size=None, number_of_files=None, data_node="b"
+        )
+
+        summary = cart.get_summary()
+
+        assert summary["dataset_count"] == 3
+        assert summary["file_count"] == 4
+        assert summary["total_size"] == 3
+        assert summary["by_data_node"] == [
+            {
+                "data_node": "a",
+                "dataset_count": 2,
+                "file_count": 4,
+                "total_size": 3,
+            },
+            {
+                "data_node": "b",
+                "dataset_count": 1,
+                "file_count": 0,
+                "total_size": 0,
+            },
+        ]
+        assert summary["by_project"] == [
+            {
+                "project": "CMIP6",
+                "dataset_count": 3,
+                "file_count": 4,
+                "total_size": 3,
+            }
+        ]
+
+    def test_get_summary_of_empty_cart(self):
+        cart = Cart.objects.get(user=self.user)
+        cart.cart_items.all().delete()
+
+        assert cart.get_summary() == {
+            "dataset_count": 0,
+            "file_count": 0,
+            "total_size": 0,
+            "by_data_node": [],
+            "by_project": [],
+        }
+
+
+class TestCartItem:
+    def test__str__(self):
+        cart_item = CartItemFactory.build(dataset_id="foo")
+        assert cart_item.__str__() == "foo"
+
+    def test_from_search_result(self):
+        result = {
+            "id": "foo|esgf-node.llnl.gov",
+            "data_node": "esgf-node.llnl.gov",
+            "size": 1024,
+            "number_of_files": 2,
+            "project": ["CMIP6"],
+        }
+
+        cart_item = CartItem.from_search_result(1, result)
+
+        assert cart_item.cart_id == 1
+        assert cart_item.dataset_id == "foo|esgf-node.llnl.gov"
+        assert cart_item.data_node == "esgf-node.llnl.gov"
+        assert cart_item.size == 1024
+        assert cart_item.number_of_files == 2
+        assert cart_item.project == "CMIP6"
+        assert cart_item.data == result
 
 
 class TestSearch:
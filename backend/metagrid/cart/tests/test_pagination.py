@@ -0,0 +1,102 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from metagrid.cart.models import Search
+from metagrid.projects.tests.factories import ProjectFactory
+from metagrid.users.models import User
+from metagrid.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+NUM_USERS = 200
+NUM_SEARCHES = 200_000
+
+
+@pytest.mark.slow
+class TestSearchPaginationAtScale(APITestCase):
+    """
+    Checks that listing and looking up saved searches stays on the indexes
+    with hundreds of thousands of searches in the table.
+
+    Filling the table takes tens of seconds, so these tests only run when
+    selected with ``pytest -m slow``.
+    """
+
+    def setUp(self):
+        # Reloaded so that its pk is a UUID, like the pk of Search.user
+        self.user = User.objects.get(pk=UserFactory().pk)
+        self.client.force_authenticate(user=self.user)
+        project = ProjectFactory()
+
+        User.objects.bulk_create(
+            [User(email=f"user{i}@example.com") for i in range(NUM_USERS - 1)]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH users AS (
+                    SELECT id, row_number() OVER (ORDER BY id) AS n
+                    FROM users_user
+                )
+                INSERT INTO cart_search (
+                    uuid, user_id, project_id, result_type, filename_vars,
+                    active_facets, text_inputs, url
+                )
+                SELECT
+                    md5(i::text)::uuid, users.id, %s, 'all', '{}', '{}',
+                    '{}', 'https://esgf-node.llnl.gov'
+                FROM generate_series(1, %s) AS i
+                JOIN users ON users.n = i %% %s + 1
+                """,
+                [project.pk, NUM_SEARCHES, NUM_USERS],
+            )
+            cursor.execute("ANALYZE cart_search")
+
+    def get_search_queries(self, path, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        assert response.status_code == status.HTTP_200_OK
+
+        return response, [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "cart_search"' in query["sql"]
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def test_list_pages_with_index_range_scans(self):
+        list_url = reverse("search-list")
+        response, queries = self.get_search_queries(list_url)
+        next_url = response.data["next"]
+        assert next_url is not None
+        assert "count" not in response.data
+
+        _, next_queries = self.get_search_queries(next_url)
+
+        for sql in queries + next_queries:
+            assert "COUNT(" not in sql
+            assert "OFFSET" not in sql
+
+            plan = self.explain(sql)
+            assert "search_user_id_idx" in plan
+            assert "Seq Scan on cart_search" not in plan
+            assert "Sort" not in plan
+
+    def test_detail_uses_uuid_index(self):
+        search = Search.objects.filter(user=self.user).first()
+        detail_url = reverse("search-detail", kwargs={"uuid": search.uuid})
+
+        _, queries = self.get_search_queries(detail_url)
+
+        for sql in queries:
+            plan = self.explain(sql)
+            assert "search_user_uuid_idx" in plan
+            assert "Seq Scan on cart_search" not in plan
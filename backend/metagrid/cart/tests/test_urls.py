@@ -0,0 +1,31 @@
+from django.urls import reverse
+
+
+def test_cart_wget():
+    assert reverse("cart-wget", kwargs={"user": 1}) == (
+        "/api/v1/carts/datasets/1/wget/"
+    )
+
+
+def test_cart_add_items():
+    assert reverse("cart-add-items", kwargs={"user": 1}) == (
+        "/api/v1/carts/datasets/1/items/add/"
+    )
+
+
+def test_cart_remove_items():
+    assert reverse("cart-remove-items", kwargs={"user": 1}) == (
+        "/api/v1/carts/datasets/1/items/remove/"
+    )
+
+
+def test_cart_list_items():
+    assert reverse("cart-list-items", kwargs={"user": 1}) == (
+        "/api/v1/carts/datasets/1/items/"
+    )
+
+
+def test_cart_summary():
+    assert reverse("cart-summary", kwargs={"user": 1}) == (
+        "/api/v1/carts/datasets/1/summary/"
+    )
@@ -1,16 +1,29 @@
+import json
+from unittest import mock
+
 import pytest
+import requests
+from asgiref.sync import sync_to_async
+from django.db import connection
 from django.forms.models import model_to_dict
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from metagrid.cart.models import Cart, Search
-from metagrid.cart.tests.factories import SearchFactory
+from metagrid.api_proxy.tests.utils import make_response
+from metagrid.cart.models import Cart, CartItem, Search
+from metagrid.cart.tests.factories import CartItemFactory, SearchFactory
 from metagrid.projects.tests.factories import ProjectFactory
 from metagrid.users.tests.factories import UserFactory, raw_password
 
 pytestmark = pytest.mark.django_db
 
+FILE_DOC = {
+    "title": "foo.nc",
+    "url": ["https://host/foo.nc|application/netcdf|HTTPServer"],
+}
+
 
 class TestCartDetail(APITestCase):
     """
@@ -34,8 +47,10 @@ class TestCartDetail(APITestCase):
         assert response.status_code == status.HTTP_200_OK
 
         # Add access token to authorization header
-        access_token = response.data["access_token"]
-        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+        self.access_token = response.data["access_token"]
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.access_token}"
+        )
 
         # URL for cart detail
         self.url = reverse("cart-detail", kwargs={"user": self.user.pk})
@@ -46,7 +61,7 @@ class TestCartDetail(APITestCase):
 
     def test_patch_request_updates_user_cart(self):
         # Add item to the user's cart
-        payload = {"items": [{"title": "dataset"}]}
+        payload = {"items": [{"id": "dataset"}]}
         response = self.client.patch(
             self.url,
             payload,
@@ -57,6 +72,174 @@ class TestCartDetail(APITestCase):
         user_cart = Cart.objects.get(user=self.user)
         assert user_cart.items == payload.get("items")
 
+    def test_patch_request_requires_dataset_ids(self):
+        response = self.client.patch(
+            self.url, {"items": [{"title": "dataset"}]}, format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_items_returns_page_of_items(self):
+        cart = Cart.objects.get(user=self.user)
+        CartItemFactory.create_batch(3, cart=cart)
+
+        response = self.client.get(
+            reverse("cart-list-items", kwargs={"user": self.user.pk}),
+            {"page_size": 2},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 3
+        assert len(response.data["results"]) == 2
+        assert response.data["next"] is not None
+
+    def test_list_items_omits_fields(self):
+        CartItemFactory(cart=Cart.objects.get(user=self.user))
+
+        response = self.client.get(
+            reverse("cart-list-items", kwargs={"user": self.user.pk}),
+            {"omit": "data"},
+        )
+
+        assert "data" not in response.data["results"][0]
+        assert "dataset_id" in response.data["results"][0]
+
+    def test_list_items_sorts_items(self):
+        cart = Cart.objects.get(user=self.user)
+        for size in (2, 3, 1):
+            CartItemFactory(cart=cart, size=size)
+
+        response = self.client.get(
+            reverse("cart-list-items", kwargs={"user": self.user.pk}),
+            {"ordering": "-size"},
+        )
+
+        sizes = [item["size"] for item in response.data["results"]]
+        assert sizes == [3, 2, 1]
+
+    def test_summary_aggregates_items(self):
+        cart = Cart.objects.get(user=self.user)
+        for _ in range(2):
+            CartItemFactory(cart=cart, size=5, number_of_files=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("cart-summary", kwargs={"user": self.user.pk})
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["dataset_count"] == 2
+        assert response.data["file_count"] == 4
+        assert response.data["total_size"] == 10
+        # The items are aggregated in Postgres, never selected
+        assert not [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "cart_cartitem"."id"')
+        ]
+
+    def test_list_items_rejects_unknown_ordering(self):
+        response = self.client.get(
+            reverse("cart-list-items", kwargs={"user": self.user.pk}),
+            {"ordering": "data"},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_add_items_returns_new_count(self):
+        response = self.client.post(
+            reverse("cart-add-items", kwargs={"user": self.user.pk}),
+            {"items": [{"id": "foo"}, {"id": "foo"}, {"id": "bar"}]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"count": 2}
+
+    def test_add_items_requires_dataset_ids(self):
+        response = self.client.post(
+            reverse("cart-add-items", kwargs={"user": self.user.pk}),
+            {"items": [{"title": "dataset"}]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_add_items_requires_integer_counts(self):
+        invalid_items = [
+            {"id": "dataset", "size": "large"},
+            {"id": "dataset", "size": 1.5},
+            {"id": "dataset", "size": -1},
+            {"id": "dataset", "size": 2 ** 63},
+            {"id": "dataset", "number_of_files": True},
+            {"id": "dataset", "number_of_files": 2 ** 31},
+        ]
+
+        for item in invalid_items:
+            response = self.client.post(
+                reverse("cart-add-items", kwargs={"user": self.user.pk}),
+                {"items": [item]},
+                format="json",
+            )
+
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not CartItem.objects.filter(cart__user=self.user).exists()
+
+    def test_remove_items_returns_new_count(self):
+        Cart.objects.add_items(self.user, [{"id": "foo"}, {"id": "bar"}])
+
+        response = self.client.post(
+            reverse("cart-remove-items", kwargs={"user": self.user.pk}),
+            {"ids": ["foo"]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"count": 1}
+        assert Cart.objects.get(user=self.user).items == [{"id": "bar"}]
+
+    def test_wget_streams_script_of_selected_datasets(self):
+        Cart.objects.add_items(self.user, [{"id": "foo"}, {"id": "bar"}])
+
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            mock_get.return_value = make_response(
+                json.dumps(
+                    {"response": {"numFound": 1, "docs": [FILE_DOC]}}
+                ).encode()
+            )
+            response = self.client.get(
+                reverse("cart-wget", kwargs={"user": self.user.pk}),
+                {"dataset_id": "foo", "filename_vars": "tas,Amon"},
+            )
+            script = b"".join(response.streaming_content).decode()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "text/x-sh"
+        assert response["Content-Disposition"].startswith("attachment;")
+        assert "foo.nc https://host/foo.nc" in script
+
+        params = mock_get.call_args[1]["params"]
+        assert ("dataset_id", "foo") in params
+        assert ("dataset_id", "bar") not in params
+        assert ("query", "tas,Amon") in params
+
+    async def test_wget_generates_script_in_full_under_asgi(self):
+        await sync_to_async(Cart.objects.add_items)(self.user, [{"id": "foo"}])
+
+        with mock.patch.object(requests.Session, "get") as mock_get:
+            mock_get.return_value = make_response(
+                json.dumps(
+                    {"response": {"numFound": 1, "docs": [FILE_DOC]}}
+                ).encode()
+            )
+            with self.settings(ESGF_PROXY_ASYNC=True):
+                response = await self.async_client.get(
+                    reverse("cart-wget", kwargs={"user": self.user.pk}),
+                    authorization=f"Bearer {self.access_token}",
+                )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not response.streaming
+        assert b"foo.nc https://host/foo.nc" in response.content
+
 
 class TestSearchViewSet(APITestCase):
     """
@@ -100,6 +283,41 @@ class TestSearchViewSet(APITestCase):
         response = self.client.get(self.detail_url)
         assert response.status_code == status.HTTP_200_OK
 
+    def test_get_request_returns_full_project(self):
+        response = self.client.get(self.detail_url)
+
+        assert response.data["project"]["full_name"] == (
+            self.search_obj.project.full_name
+        )
+        assert "facets_by_group" in response.data["project"]
+        assert "facets_url" in response.data["project"]
+
+    def test_get_request_compacts_project(self):
+        response = self.client.get(self.detail_url, {"compact": "project"})
+
+        project = self.search_obj.project
+        assert response.data["project"] == {
+            "pk": project.pk,
+            "name": project.name,
+        }
+
+    def test_list_request_makes_fixed_number_of_queries(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.list_url)
+            assert response.status_code == status.HTTP_200_OK
+            return len(queries)
+
+        projects = ProjectFactory.create_batch(5)
+        # Warms up the project catalogue
+        count_queries()
+        num_queries = count_queries()
+
+        for project in projects:
+            SearchFactory(user=self.user, project=project)
+
+        assert count_queries() == num_queries
+
     def test_post_request_creates_object(self):
         project = ProjectFactory()
         payload = model_to_dict(
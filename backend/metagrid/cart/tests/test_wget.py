@@ -0,0 +1,133 @@
+import json
+import shlex
+from unittest import mock
+
+import pytest
+import requests
+
+from metagrid.api_proxy.tests.utils import make_response
+from metagrid.cart import wget
+
+FILE_DOC = {
+    "title": "tas_Amon.nc",
+    "url": [
+        "https://host/thredds/dodsC/tas_Amon.nc.html|application/opendap|OPENDAP",
+        "https://host/thredds/fileServer/tas_Amon.nc|application/netcdf|HTTPServer",
+    ],
+    "checksum": ["abc"],
+    "checksum_type": ["SHA256"],
+}
+
+
+def make_results(docs, num_found):
+    return make_response(
+        json.dumps(
+            {"response": {"numFound": num_found, "docs": docs}}
+        ).encode()
+    )
+
+
+class TestGetFileLine:
+    def test_lists_http_url_and_checksum(self):
+        line = wget.get_file_line(FILE_DOC)
+
+        assert shlex.split(line) == [
+            "tas_Amon.nc",
+            "https://host/thredds/fileServer/tas_Amon.nc",
+            "SHA256",
+            "abc",
+        ]
+
+    def test_quotes_fields(self):
+        line = wget.get_file_line({**FILE_DOC, "title": "it's.nc"})
+
+        assert shlex.split(line)[0] == "it's.nc"
+
+    def test_skips_files_without_http_url(self):
+        assert wget.get_file_line({**FILE_DOC, "url": []}) is None
+
+    @pytest.mark.parametrize(
+        "title, name",
+        [
+            ("../../.bashrc", ".bashrc"),
+            ("/etc/cron.d/job", "job"),
+            ("..\\..\\tas.nc", "tas.nc"),
+        ],
+    )
+    def test_strips_directories_from_titles(self, title, name):
+        line = wget.get_file_line({**FILE_DOC, "title": title})
+
+        assert shlex.split(line)[0] == name
+
+    @pytest.mark.parametrize("title", ["..", "data/..", "dir/", None])
+    def test_skips_files_without_name(self, title):
+        assert wget.get_file_line({**FILE_DOC, "title": title}) is None
+
+
+class TestIterDatasetFiles:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_SEARCH_URL = (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+        settings.ESGF_WGET_PAGE_SIZE = 2
+
+        patcher = mock.patch.object(requests.Session, "get")
+        self.mock_get = patcher.start()
+        yield
+        patcher.stop()
+
+    def test_pages_through_files_lazily(self):
+        self.mock_get.side_effect = [
+            make_results([FILE_DOC, FILE_DOC], 3),
+            make_results([FILE_DOC], 3),
+        ]
+
+        files = wget.iter_dataset_files(["a", "b"], ["tas", "Amon"])
+        next(files)
+        assert self.mock_get.call_count == 1
+
+        assert len(list(files)) == 2
+        assert self.mock_get.call_count == 2
+        params = self.mock_get.call_args[1]["params"]
+        assert ("dataset_id", "a") in params
+        assert ("dataset_id", "b") in params
+        assert ("query", "tas,Amon") in params
+        assert ("offset", 2) in params
+
+    def test_batches_datasets(self):
+        self.mock_get.side_effect = lambda *args, **kwargs: make_results([], 0)
+        dataset_ids = [str(i) for i in range(wget.DATASET_BATCH_SIZE + 1)]
+
+        assert list(wget.iter_dataset_files(dataset_ids)) == []
+        assert self.mock_get.call_count == 2
+
+
+class TestGenerateWgetScript:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.ESGF_SEARCH_URL = (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+
+        patcher = mock.patch.object(requests.Session, "get")
+        self.mock_get = patcher.start()
+        yield
+        patcher.stop()
+
+    def test_lists_files_between_header_and_footer(self):
+        self.mock_get.return_value = make_results([FILE_DOC], 1)
+
+        script = "".join(wget.generate_wget_script("wget.sh", ["a"]))
+
+        assert script.startswith("#!/bin/bash")
+        assert wget.get_file_line(FILE_DOC) in script
+        assert script.endswith("exit $failed\n")
+
+    def test_exits_with_error_when_listing_fails(self):
+        self.mock_get.side_effect = requests.ConnectionError("refused")
+
+        script = "".join(wget.generate_wget_script("wget.sh", ["a"]))
+
+        assert 'incomplete:" refused >&2' in script
+        assert script.endswith("exit 1\n")
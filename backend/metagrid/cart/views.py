@@ -1,7 +1,21 @@
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.utils import timezone
+from rest_framework import exceptions, mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-from metagrid.cart.models import Cart, Search
-from metagrid.cart.serializers import CartSerializer, SearchSerializer
+from metagrid.cart.models import Cart, CartItem, Search
+from metagrid.cart.pagination import CartItemPagination, SearchPagination
+from metagrid.cart.serializers import (
+    CartItemsAddSerializer,
+    CartItemSerializer,
+    CartItemsRemoveSerializer,
+    CartSerializer,
+    SearchSerializer,
+)
+from metagrid.cart.wget import generate_wget_script
 from metagrid.users.permissions import IsOwner
 
 
@@ -15,17 +29,149 @@ class CartViewSet(
 
     def get_queryset(self):
         user = self.request.user
-        queryset = self.queryset.filter(user=user).prefetch_related()
+        queryset = self.queryset.filter(user=user)
         return queryset
 
+    # Fields that the items of a cart can be sorted by
+    ITEM_ORDERING_FIELDS = ("added", "data_node", "size")
+
+    @action(
+        detail=True,
+        url_path="items",
+        serializer_class=CartItemSerializer,
+        pagination_class=CartItemPagination,
+    )
+    def list_items(self, request, user=None):
+        """Lists the items of the cart a page at a time.
+
+        Items are sorted by 'ordering', which is one of the
+        ITEM_ORDERING_FIELDS prefixed with '-' for descending order.
+        """
+        cart = self.get_object()
+
+        ordering = request.query_params.get("ordering", "added")
+        if ordering.lstrip("-") not in self.ITEM_ORDERING_FIELDS:
+            raise exceptions.ValidationError(
+                {
+                    "ordering": "Must be one of: "
+                    + ", ".join(self.ITEM_ORDERING_FIELDS)
+                }
+            )
+        # Ties are broken by id so that pages do not overlap
+        tiebreaker = "-id" if ordering.startswith("-") else "id"
+        queryset = CartItem.objects.filter(cart=cart).order_by(
+            ordering, tiebreaker
+        )
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="items/add",
+        serializer_class=CartItemsAddSerializer,
+    )
+    def add_items(self, request, user=None):
+        """Adds items to the cart and returns the new number of items.
+
+        Items are deduplicated by their dataset 'id'.
+        """
+        cart = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        count = Cart.objects.add_items(
+            cart.user, serializer.validated_data["items"]
+        )
+        return Response({"count": count})
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="items/remove",
+        serializer_class=CartItemsRemoveSerializer,
+    )
+    def remove_items(self, request, user=None):
+        """Removes items from the cart and returns the new number of items."""
+        cart = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        count = Cart.objects.remove_items(
+            cart.user, serializer.validated_data["ids"]
+        )
+        return Response({"count": count})
+
+    @action(detail=True)
+    def summary(self, request, user=None):
+        """Returns the number of datasets and files and the total size of the
+        cart, in total and grouped by data node and by project.
+        """
+        cart = self.get_object()
+        return Response(cart.get_summary())
+
+    @action(detail=True)
+    def wget(self, request, user=None):
+        """Streams a wget script that downloads the files of the cart.
+
+        The script can be limited to some of the datasets in the cart with
+        'dataset_id' and to the files matching 'filename_vars', which both
+        accept repeated or comma separated values.
+
+        Django's ASGI handler iterates streamed responses on the event loop
+        of the worker, where the blocking searches that list the files would
+        stall every other request. Deployments served through config.asgi
+        (ESGF_PROXY_ASYNC) get the script generated in full by the view
+        instead, which runs on a worker thread. That holds the script in
+        memory, about 200 bytes per file, which a cart of even 100,000 files
+        keeps to some tens of megabytes for the duration of the request.
+        """
+        cart = self.get_object()
+
+        cart_items = CartItem.objects.filter(cart=cart)
+        selected_ids = self._get_list_param(request, "dataset_id")
+        if selected_ids:
+            cart_items = cart_items.filter(dataset_id__in=selected_ids)
+        dataset_ids = list(cart_items.values_list("dataset_id", flat=True))
+
+        timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
+        filename = f"wget-{timestamp}.sh"
+        script = generate_wget_script(
+            filename,
+            dataset_ids,
+            self._get_list_param(request, "filename_vars"),
+        )
+        if settings.ESGF_PROXY_ASYNC:
+            response = HttpResponse(
+                script, content_type="text/x-sh"
+            )  # type: HttpResponseBase
+        else:
+            response = StreamingHttpResponse(script, content_type="text/x-sh")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @staticmethod
+    def _get_list_param(request, key):
+        return [
+            value.strip()
+            for values in request.query_params.getlist(key)
+            for value in values.split(",")
+            if value.strip()
+        ]
+
 
 class SearchViewSet(viewsets.ModelViewSet):
     queryset = Search.objects.all().order_by("id")
     serializer_class = SearchSerializer
     permission_classes = [IsOwner]
+    pagination_class = SearchPagination
     lookup_field = "uuid"
 
     def get_queryset(self):
         user = self.request.user
-        queryset = self.queryset.filter(user=user).prefetch_related()
+        # The facets of the projects come from the project catalogue, so
+        # only the projects themselves need to be joined
+        queryset = self.queryset.filter(user=user).select_related("project")
         return queryset
@@ -0,0 +1,191 @@
+"""
+Generation of wget scripts that download the files of a user's cart.
+
+The files are listed by paging through the file-level results of the ESGF
+Search API while the script is streamed to the client, so memory use stays
+flat regardless of the number of datasets in the cart.
+https://esgf.github.io/esg-search/ESGF_Search_RESTful_API.html
+"""
+import os
+import shlex
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from django.conf import settings
+
+from metagrid.api_proxy.upstream import fetch
+
+# Number of datasets whose files are searched for in a single query, which
+# keeps the URLs of the queries short
+DATASET_BATCH_SIZE = 50
+
+# Fields of the file-level search results that the script needs
+FILE_FIELDS = ("checksum", "checksum_type", "dataset_id", "title", "url")
+
+# Terminates the heredoc that lists the files in the script
+FILE_LIST_DELIMITER = "EOF--dataset.file.url.chksum_type.chksum"
+
+SCRIPT_HEADER = """#!/bin/bash
+##############################################################################
+# ESGF wget script generated by MetaGrid
+#
+# Usage: bash {filename} [-s]
+#   -s  skip the checksum verification of the downloaded files
+##############################################################################
+
+verify_checksums=1
+if [ "$1" == "-s" ]; then
+    verify_checksums=0
+fi
+
+download_files="$(cat <<'{delimiter}'
+"""
+
+SCRIPT_FOOTER = """{delimiter}
+)"
+
+failed=0
+while read -r line; do
+    [ -z "$line" ] && continue
+    eval "set -- $line"
+    file="$1"; url="$2"; checksum_type="$3"; checksum="$4"
+
+    echo "Downloading $file"
+    if ! wget -c -O "$file" "$url"; then
+        echo "Failed to download $file" >&2
+        failed=1
+        continue
+    fi
+
+    if [ "$verify_checksums" -eq 1 ] && [ -n "$checksum" ]; then
+        tool="$(echo "$checksum_type" | tr '[:upper:]' '[:lower:]')sum"
+        if [ "$($tool "$file" | cut -d ' ' -f 1)" != "$checksum" ]; then
+            echo "Checksum of $file does not match" >&2
+            failed=1
+        fi
+    fi
+done <<< "$download_files"
+
+exit $failed
+"""
+
+# Ends the script early when listing the files failed midway, since the
+# response has already been sent and its status cannot be changed
+SCRIPT_ERROR_FOOTER = """{delimiter}
+)"
+
+echo "The file list of this script is incomplete:" {error} >&2
+echo "Please generate the script again." >&2
+exit 1
+"""
+
+
+def get_http_url(doc: Dict[str, Any]) -> Optional[str]:
+    """Returns the HTTP download URL of a file-level search result.
+
+    URLs are listed as 'url|mime type|service', e.g.
+    'http://host/file.nc|application/netcdf|HTTPServer'.
+    """
+    for url in doc.get("url", []):
+        parts = url.split("|")
+        if len(parts) == 3 and parts[2] == "HTTPServer":
+            return parts[0]
+    return None
+
+
+def get_file_name(doc: Dict[str, Any]) -> Optional[str]:
+    """Returns the name that a file is downloaded to.
+
+    Titles come from the index nodes, so only their last path component is
+    used, and names that would refer to a directory are rejected, so that
+    files cannot be written outside of the directory the script runs in.
+    """
+    title = doc.get("title")
+    if not isinstance(title, str):
+        return None
+
+    name = os.path.basename(title.replace("\\", "/"))
+    if name in ("", ".", ".."):
+        return None
+    return name
+
+
+def get_file_line(doc: Dict[str, Any]) -> Optional[str]:
+    """Returns the line that lists a file in the script."""
+    url = get_http_url(doc)
+    name = get_file_name(doc)
+    if url is None or name is None:
+        return None
+
+    checksum_type = (doc.get("checksum_type") or [""])[0]
+    checksum = (doc.get("checksum") or [""])[0]
+    fields = (name, url, checksum_type, checksum)
+    return " ".join(shlex.quote(field) for field in fields) + "\n"
+
+
+def iter_dataset_files(
+    dataset_ids: List[str], filename_vars: Optional[List[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yields the file-level search results of datasets, page by page.
+
+    :param dataset_ids: The ids of the datasets
+    :param filename_vars: Free-text terms that the files must match, like
+        the 'query' parameter of the frontend's file searches
+    """
+    page_size = settings.ESGF_WGET_PAGE_SIZE
+
+    for start in range(0, len(dataset_ids), DATASET_BATCH_SIZE):
+        params = [
+            ("type", "File"),
+            ("format", "application/solr+json"),
+            ("fields", ",".join(FILE_FIELDS)),
+            ("limit", page_size),
+        ]
+        params.extend(
+            ("dataset_id", dataset_id)
+            for dataset_id in dataset_ids[start : start + DATASET_BATCH_SIZE]
+        )
+        if filename_vars:
+            params.append(("query", ",".join(filename_vars)))
+
+        offset = 0
+        while True:
+            response = fetch(
+                settings.ESGF_SEARCH_URL, params=[*params, ("offset", offset)]
+            )
+            try:
+                response.raise_for_status()
+                results = response.json()["response"]
+            finally:
+                response.close()
+
+            yield from results["docs"]
+
+            offset += page_size
+            if offset >= results["numFound"] or not results["docs"]:
+                break
+
+
+def generate_wget_script(
+    filename: str,
+    dataset_ids: List[str],
+    filename_vars: Optional[List[str]] = None,
+) -> Iterator[str]:
+    """Yields the wget script that downloads the files of datasets."""
+    yield SCRIPT_HEADER.format(
+        filename=filename, delimiter=FILE_LIST_DELIMITER
+    )
+
+    try:
+        for doc in iter_dataset_files(dataset_ids, filename_vars):
+            line = get_file_line(doc)
+            if line is not None:
+                yield line
+    except (requests.RequestException, ValueError, KeyError) as e:
+        error = str(e) or e.__class__.__name__
+        yield SCRIPT_ERROR_FOOTER.format(
+            delimiter=FILE_LIST_DELIMITER, error=shlex.quote(error)
+        )
+        return
+
+    yield SCRIPT_FOOTER.format(delimiter=FILE_LIST_DELIMITER)
@@ -0,0 +1,10 @@
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Prevents cached values from leaking between tests."""
+    for alias in settings.CACHES:
+        caches[alias].clear()
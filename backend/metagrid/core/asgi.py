@@ -0,0 +1,76 @@
+"""
+ASGI handler that streams responses whose content is an async iterator.
+
+Django's ASGI handler iterates streamed responses synchronously on the event
+loop, so an async view could only stream a body that it already holds.
+Responses of AsyncStreamingHttpResponse are sent chunk by chunk as their
+async iterator yields them instead, without blocking the event loop, so
+async views can pass upstream bodies through as they arrive.
+"""
+from typing import AsyncIterable, AsyncIterator
+
+import django
+from django.core.handlers import asgi
+from django.http import StreamingHttpResponse
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    A streamed response whose content is an async iterable of bytes.
+
+    The content is only sent when served through ``ASGIHandler``. Middleware
+    sees a streamed response with no sync content, and leaves it alone.
+    """
+
+    def __init__(
+        self, streaming_content: AsyncIterable[bytes], *args, **kwargs
+    ):
+        super().__init__((), *args, **kwargs)
+        self.async_streaming_content = streaming_content
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Django's ASGI handler, which also sends AsyncStreamingHttpResponse."""
+
+    async def send_response(self, response, send):
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            await super().send_response(response, send)
+            return
+
+        async def send_with_content(message):
+            # The stock handler sends the headers, and then the final empty
+            # body of the (empty) sync content, ahead of which the async
+            # content is sent
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body"
+            ):
+                await self.send_async_content(response, send)
+            await send(message)
+
+        await super().send_response(response, send_with_content)
+
+    async def send_async_content(self, response, send):
+        content = (
+            response.async_streaming_content
+        )  # type: AsyncIterator[bytes]
+        try:
+            async for part in content:
+                for chunk, _ in self.chunk_bytes(response.make_bytes(part)):
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": True,
+                        }
+                    )
+        finally:
+            # Releases the upstream connection if sending was cut short
+            aclose = getattr(content, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+def get_asgi_application() -> ASGIHandler:
+    """Returns the ASGI application, as django.core.asgi does."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
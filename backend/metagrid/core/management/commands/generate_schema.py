@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from metagrid.core.schema import write_schema_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the OpenAPI schema files of the REST API, which the docs "
+        "are served from."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-dir",
+            default=settings.OPENAPI_SCHEMA_DIR,
+            help="Directory to write the schema files to",
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        paths = write_schema_files(options["output_dir"])
+        elapsed = time.perf_counter() - started_at
+
+        for path in paths:
+            self.stdout.write(f"Wrote {path}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated the schema in {elapsed:.2f}s")
+        )
@@ -0,0 +1,200 @@
+"""
+Response compression with brotli or gzip.
+
+Compressing a large payload costs far more than hashing it, so the
+compressed bodies of public responses with an ETag, such as the project
+catalogue and the OpenAPI schema, are cached under their ETag in the
+"compression" cache. They are then compressed once per version instead of
+once per request. Other responses, which may be specific to a user, are
+compressed every time and never cached.
+
+The middleware of this module are async-capable, so that requests to the
+async views (see metagrid.api_proxy.async_views) are not funnelled through a
+single thread while they wait on upstream services.
+"""
+import asyncio
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+import brotli
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# Encodings in order of preference
+ENCODINGS = ("br", "gzip")
+
+# Content types that are worth compressing, in addition to text/* and the
+# +json and +xml structured syntaxes
+COMPRESSIBLE_CONTENT_TYPES = frozenset(
+    (
+        "application/javascript",
+        "application/json",
+        "application/msgpack",
+        "application/xml",
+        "image/svg+xml",
+    )
+)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into the quality of each encoding."""
+    qualities = {}  # type: Dict[str, float]
+
+    for item in header.split(","):
+        encoding, _, params = item.strip().partition(";")
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[encoding] = quality
+
+    return qualities
+
+
+def negotiate_encoding(header: str) -> Optional[str]:
+    """Returns the preferred encoding that the client accepts, if any."""
+    qualities = parse_accept_encoding(header)
+    default_quality = qualities.get("*", 0.0)
+
+    accepted = [
+        encoding
+        for encoding in ENCODINGS
+        if qualities.get(encoding, default_quality) > 0
+    ]
+    if not accepted:
+        return None
+
+    # Ties are broken by the order of preference, since max() is stable
+    return max(
+        accepted,
+        key=lambda encoding: qualities.get(encoding, default_quality),
+    )
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type.endswith(("+json", "+xml"))
+        or media_type in COMPRESSIBLE_CONTENT_TYPES
+    )
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    # mtime is fixed so that equal bodies compress to equal bytes
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def is_cacheable(response) -> bool:
+    """Returns whether a response is versioned and the same for everyone."""
+    cache_control = {
+        directive.strip().split("=")[0].lower()
+        for directive in response.get("Cache-Control", "").split(",")
+    }
+    return (
+        response.has_header("ETag")
+        and "public" in cache_control
+        and not cache_control & {"private", "no-store"}
+    )
+
+
+def get_cache_key(response, encoding: str) -> str:
+    version = f"{response['ETag']}:{response.get('Content-Type')}".encode()
+    return f"compressed:{encoding}:{hashlib.sha256(version).hexdigest()}"
+
+
+def get_compressed_content(response, encoding: str) -> bytes:
+    if not is_cacheable(response):
+        return compress(response.content, encoding)
+
+    cache = caches["compression"]
+    key = get_cache_key(response, encoding)
+    compressed_content = cache.get(key)
+    if compressed_content is None:
+        compressed_content = compress(response.content, encoding)
+        cache.set(key, compressed_content, settings.COMPRESSION_CACHE_TTL)
+    return compressed_content
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses responses with the best encoding the client accepts.
+
+    Streaming responses, responses that are already encoded, responses to
+    clients that accept neither encoding and bodies smaller than
+    COMPRESSION_MIN_SIZE bytes are left as they are.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not is_compressible(response.get("Content-Type", "")):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = negotiate_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if encoding is None:
+            return response
+
+        compressed_content = get_compressed_content(response, encoding)
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response["Content-Length"] = str(len(compressed_content))
+        response["Content-Encoding"] = encoding
+
+        # The body differs from the uncompressed one, so its ETag is only
+        # weakly equivalent, as Django's GZipMiddleware does
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    Serves static files with WhiteNoise, passing other requests on to async
+    views without blocking a thread, which WhiteNoise cannot do itself.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Lets Django call the middleware as a coroutine function
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
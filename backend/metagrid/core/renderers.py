@@ -0,0 +1,59 @@
+"""
+Renderers for the REST API that are faster than the stock JSONRenderer.
+https://www.django-rest-framework.org/api-guide/renderers/#custom-renderers
+"""
+import msgpack
+import orjson
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+# Converts the types that orjson and msgpack do not support natively (e.g.
+# Decimal, lazy translations and querysets) the same way DRF does
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(renderers.BaseRenderer):
+    """
+    Renders JSON with orjson, which is several times faster than the json
+    module for large payloads such as carts and saved searches.
+    https://github.com/ijl/orjson
+
+    Datetimes, dates and times are passed through to DRF's encoder, so they
+    are formatted as the stock JSONRenderer formats them (e.g. milliseconds
+    and a 'Z' suffix for UTC). Non-finite floats are the exception: they are
+    rendered as null, where the stock renderer rejects them.
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        accepted_media_type = accepted_media_type or ""
+        if "indent=" in accepted_media_type:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=_encoder.default, option=option)
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Renders MessagePack, which is smaller and faster to decode than JSON, for
+    bulk clients that ask for it with 'Accept: application/msgpack'.
+    https://msgpack.org
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
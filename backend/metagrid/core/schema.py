@@ -0,0 +1,110 @@
+"""
+OpenAPI schema of the REST API, generated once instead of per request.
+
+drf-yasg introspects every view and serializer to build the schema, which
+is too costly to do for every hit on the docs (e.g. from crawlers). The
+schema files are written at deploy time by the 'generate_schema' command
+into OPENAPI_SCHEMA_DIR, or generated on the first request of a process if
+they are missing. Either way, each process keeps them in memory along with
+their ETags, so the schema is served without any introspection.
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.utils.http import quote_etag
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+# https://drf-yasg.readthedocs.io/en/stable/readme.html#quickstart
+API_INFO = openapi.Info(
+    title="Snippets API",
+    default_version="v1",
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+# Codecs of the schema files by their format (extension)
+CODECS = {".json": OpenAPICodecJson, ".yaml": OpenAPICodecYaml}
+
+# (content, content type, ETag) of a schema file
+SchemaFile = Tuple[bytes, str, str]
+
+_schema_files = {}  # type: Dict[str, SchemaFile]
+_schema_files_lock = threading.Lock()
+
+
+def get_schema_path(directory: str, format: str) -> str:
+    return os.path.join(directory, f"swagger{format}")
+
+
+def generate_schema_files() -> Dict[str, bytes]:
+    """Generates the schema of all public endpoints in every format."""
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(public=True)
+    return {
+        format: codec(validators=[]).encode(schema)
+        for format, codec in CODECS.items()
+    }
+
+
+def write_schema_files(directory: str) -> List[str]:
+    """Generates the schema files into a directory.
+
+    :returns: The paths of the files written
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+
+    for format, content in generate_schema_files().items():
+        path = get_schema_path(directory, format)
+        with open(path, "wb") as file:
+            file.write(content)
+        paths.append(path)
+
+    return paths
+
+
+def load_schema_files() -> Dict[str, bytes]:
+    """Reads the schema files, generating them if any is missing."""
+    try:
+        contents = {}
+        for format in CODECS:
+            path = get_schema_path(settings.OPENAPI_SCHEMA_DIR, format)
+            with open(path, "rb") as file:
+                contents[format] = file.read()
+        return contents
+    except FileNotFoundError:
+        return generate_schema_files()
+
+
+def get_schema_file(format: str) -> SchemaFile:
+    """Returns a schema file, which is loaded once per process."""
+    with _schema_files_lock:
+        if not _schema_files:
+            for file_format, content in load_schema_files().items():
+                _schema_files[file_format] = (
+                    content,
+                    CODECS[file_format].media_type,
+                    quote_etag(hashlib.sha256(content).hexdigest()),
+                )
+
+    return _schema_files[format]
+
+
+def clear_schema_files():
+    """Drops the schema files that were loaded, e.g. after regenerating."""
+    with _schema_files_lock:
+        _schema_files.clear()
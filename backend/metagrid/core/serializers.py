@@ -0,0 +1,74 @@
+"""
+Serializer mixins shared by the apps.
+"""
+from typing import Set
+
+from rest_framework import permissions, serializers
+
+
+class DynamicFieldsMixin:
+    """
+    Lets clients choose the fields of a serializer with query parameters,
+    which all take comma separated or repeated values:
+
+    - 'fields': the fields to include, leaving out all others
+    - 'omit': the fields to leave out
+    - 'expand': the fields to expand, which are listed in
+      'Meta.expandable_fields' with the serializer that replaces their
+      default representation
+    - 'compact': the fields to shorten, which are listed in
+      'Meta.compact_fields' in the same way
+
+    Fields are pruned before the representation is computed, so the methods
+    of left out SerializerMethodFields never run. Only the top-level
+    serializer of a request reads the parameters, and 'fields' and 'omit'
+    only apply to safe methods so that writes are validated in full.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()  # type: ignore
+
+        request = self.context.get("request")  # type: ignore
+        if request is None or not self._is_root():
+            return fields
+
+        self._replace_fields(fields, request, "expand", "expandable_fields")
+        self._replace_fields(fields, request, "compact", "compact_fields")
+
+        if request.method not in permissions.SAFE_METHODS:
+            return fields
+
+        included = self._get_param_values(request, "fields")
+        omitted = self._get_param_values(request, "omit")
+        return {
+            field_name: field
+            for field_name, field in fields.items()
+            if (not included or field_name in included)
+            and field_name not in omitted
+        }
+
+    def _replace_fields(
+        self, fields, request, key: str, replacements_attr: str
+    ) -> None:
+        replacements = getattr(self.Meta, replacements_attr, {})  # type: ignore
+        for field_name in self._get_param_values(request, key):
+            if field_name in replacements and field_name in fields:
+                kwargs = {"read_only": True}
+                if fields[field_name].source:
+                    kwargs["source"] = fields[field_name].source
+                fields[field_name] = replacements[field_name](**kwargs)
+
+    def _is_root(self) -> bool:
+        parent = self.parent  # type: ignore
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    @staticmethod
+    def _get_param_values(request, key: str) -> Set[str]:
+        return {
+            value.strip()
+            for param in request.query_params.getlist(key)
+            for value in param.split(",")
+            if value.strip()
+        }
@@ -0,0 +1,108 @@
+"""
+Stale-while-revalidate caching for slow upstream calls.
+
+Once an entry expires, it keeps being served while a single background
+refresh replaces it, so clients never wait on the upstream service unless
+nothing is cached yet. Expiry times are jittered so entries cached at the
+same time do not all expire, and get refreshed, at once.
+"""
+import logging
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Seconds that a refresh may run before another one can be started
+REFRESH_LOCK_TIMEOUT = 60
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr")
+
+
+def _get_expiry(ttl: int, jitter: float) -> float:
+    return time.time() + ttl * random.uniform(1 - jitter, 1 + jitter)
+
+
+def _load(
+    cache_alias: str,
+    key: str,
+    loader: Callable[[], Any],
+    ttl: int,
+    stale_ttl: int,
+    jitter: float,
+) -> Any:
+    value = loader()
+    entry = {"value": value, "expires_at": _get_expiry(ttl, jitter)}
+    # Entries are kept past their expiry so they can be served stale
+    caches[cache_alias].set(key, entry, int(ttl * (1 + jitter)) + stale_ttl)
+    return value
+
+
+def _refresh(
+    cache_alias: str,
+    key: str,
+    loader: Callable[[], Any],
+    ttl: int,
+    stale_ttl: int,
+    jitter: float,
+):
+    try:
+        _load(cache_alias, key, loader, ttl, stale_ttl, jitter)
+    except Exception:
+        logger.exception(f"Failed to refresh the cached value of {key}")
+    finally:
+        caches[cache_alias].delete(f"{key}:refreshing")
+
+
+def get_or_refresh(
+    cache_alias: str,
+    key: str,
+    loader: Callable[[], Any],
+    ttl: int,
+    stale_ttl: int,
+    jitter: float = 0.1,
+) -> Any:
+    """Returns the cached value of a key, loading it if it is missing.
+
+    :param cache_alias: The alias of the cache to store the value in
+    :param key: The cache key
+    :param loader: Function that loads the value from the upstream service
+    :param ttl: Seconds before the value expires and gets refreshed
+    :param stale_ttl: Seconds that an expired value may still be served for
+    :param jitter: Fraction of the TTL that expiry times are randomized by
+    """
+    entry = caches[cache_alias].get(key)
+
+    if entry is None:
+        return _load(cache_alias, key, loader, ttl, stale_ttl, jitter)
+
+    if entry["expires_at"] <= time.time():
+        schedule_refresh(cache_alias, key, loader, ttl, stale_ttl, jitter)
+
+    return entry["value"]
+
+
+def schedule_refresh(
+    cache_alias: str,
+    key: str,
+    loader: Callable[[], Any],
+    ttl: int,
+    stale_ttl: int,
+    jitter: float,
+) -> Optional[Future]:
+    """Refreshes a key in the background unless a refresh is running.
+
+    The lock is taken with an atomic cache add, so it holds across worker
+    processes that share the cache.
+    """
+    if not caches[cache_alias].add(
+        f"{key}:refreshing", True, REFRESH_LOCK_TIMEOUT
+    ):
+        return None
+
+    return _executor.submit(
+        _refresh, cache_alias, key, loader, ttl, stale_ttl, jitter
+    )
@@ -0,0 +1,69 @@
+import asyncio
+
+from django.http import HttpResponse
+
+from metagrid.core.asgi import ASGIHandler, AsyncStreamingHttpResponse
+
+
+def send_response(response):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(ASGIHandler().send_response(response, send))
+    return messages
+
+
+class TestASGIHandler:
+    def test_streams_async_content(self):
+        async def content():
+            yield b"a"
+            yield "b"
+
+        messages = send_response(
+            AsyncStreamingHttpResponse(content(), content_type="text/plain")
+        )
+
+        assert messages[0]["type"] == "http.response.start"
+        assert messages[0]["status"] == 200
+        assert [
+            (message.get("body", b""), message.get("more_body", False))
+            for message in messages[1:]
+        ] == [(b"a", True), (b"b", True), (b"", False)]
+
+    def test_closes_async_content_if_sending_fails(self):
+        closed = False
+
+        async def content():
+            nonlocal closed
+            try:
+                yield b"a"
+                yield b"b"
+            finally:
+                closed = True
+
+        async def send(message):
+            if message.get("body"):
+                raise OSError("disconnected")
+
+        async def send_response():
+            await ASGIHandler().send_response(
+                AsyncStreamingHttpResponse(content()), send
+            )
+
+        try:
+            asyncio.run(send_response())
+        except OSError:
+            pass
+
+        assert closed
+
+    def test_sends_other_responses_as_django_does(self):
+        messages = send_response(HttpResponse(b"body"))
+
+        assert [message["type"] for message in messages] == [
+            "http.response.start",
+            "http.response.body",
+        ]
+        assert messages[1]["body"] == b"body"
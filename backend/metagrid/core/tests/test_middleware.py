@@ -0,0 +1,187 @@
+import asyncio
+import gzip
+from unittest import mock
+
+import brotli
+import pytest
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from metagrid.core import middleware
+from metagrid.core.middleware import (
+    AsyncWhiteNoiseMiddleware,
+    CompressionMiddleware,
+    negotiate_encoding,
+    parse_accept_encoding,
+)
+from metagrid.projects.tests.factories import ProjectFactory
+
+pytestmark = pytest.mark.django_db
+
+BODY = b'{"results": "' + b"x" * 4096 + b'"}'
+
+
+class TestNegotiateEncoding:
+    def test_parses_qualities(self):
+        assert parse_accept_encoding("gzip;q=0.5, br, *;q=0") == {
+            "gzip": 0.5,
+            "br": 1.0,
+            "*": 0.0,
+        }
+
+    @pytest.mark.parametrize(
+        "header, encoding",
+        [
+            ("gzip, deflate, br", "br"),
+            ("gzip, deflate", "gzip"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0, gzip;q=0", None),
+            ("*", "br"),
+            ("identity", None),
+            ("", None),
+        ],
+    )
+    def test_prefers_brotli(self, header, encoding):
+        assert negotiate_encoding(header) == encoding
+
+
+class TestCompressionMiddleware:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.COMPRESSION_MIN_SIZE = 1024
+        self.factory = RequestFactory()
+        yield
+        caches["compression"].clear()
+
+    def get_response(self, response, accept_encoding="gzip, br"):
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def make_response(self, body=BODY, **headers):
+        response = HttpResponse(body, content_type="application/json")
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def test_compresses_with_brotli(self):
+        response = self.get_response(self.make_response())
+
+        assert response["Content-Encoding"] == "br"
+        assert response["Vary"] == "Accept-Encoding"
+        assert brotli.decompress(response.content) == BODY
+        assert response["Content-Length"] == str(len(response.content))
+
+    def test_compresses_with_gzip(self):
+        response = self.get_response(self.make_response(), "gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == BODY
+
+    def test_skips_small_bodies(self):
+        response = self.get_response(self.make_response(b"{}"))
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_skips_incompressible_content_types(self):
+        response = self.get_response(
+            HttpResponse(BODY, content_type="image/png")
+        )
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_skips_streaming_responses(self):
+        response = self.get_response(StreamingHttpResponse([BODY]))
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_weakens_etag(self):
+        response = self.get_response(self.make_response(ETag='"abc"'))
+
+        assert response["ETag"] == 'W/"abc"'
+
+    def test_compresses_each_version_once(self):
+        def make_response(etag):
+            return self.make_response(
+                ETag=etag, **{"Cache-Control": "public, max-age=60"}
+            )
+
+        with mock.patch.object(
+            middleware, "compress", wraps=middleware.compress
+        ) as compress:
+            self.get_response(make_response('"abc"'))
+            response = self.get_response(make_response('"abc"'))
+            self.get_response(make_response('"abc"'), "gzip")
+            self.get_response(make_response('"def"'))
+
+        assert compress.call_count == 3
+        assert brotli.decompress(response.content) == BODY
+
+    @pytest.mark.parametrize(
+        "headers",
+        [
+            {},
+            {"ETag": '"abc"'},
+            {"ETag": '"abc"', "Cache-Control": "private, max-age=60"},
+            {"ETag": '"abc"', "Cache-Control": "public, no-store"},
+        ],
+    )
+    def test_does_not_cache_other_responses(self, headers):
+        with mock.patch.object(
+            middleware, "compress", wraps=middleware.compress
+        ) as compress:
+            self.get_response(self.make_response(**headers))
+            self.get_response(self.make_response(**headers))
+
+        assert compress.call_count == 2
+
+
+class TestCompressionOfApi(APITestCase):
+    def test_compresses_project_catalogue(self):
+        ProjectFactory.create_batch(20)
+
+        response = self.client.get(
+            reverse("project-list"), HTTP_ACCEPT_ENCODING="br"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Encoding"] == "br"
+        assert response["ETag"].startswith("W/")
+
+        # The weak ETag still revalidates the catalogue
+        response = self.client.get(
+            reverse("project-list"),
+            HTTP_ACCEPT_ENCODING="br",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+class TestAsyncMiddleware:
+    @pytest.fixture(autouse=True)
+    def setUp(self, settings):
+        settings.COMPRESSION_MIN_SIZE = 1024
+        self.factory = RequestFactory()
+
+    async def get_response(self, request):
+        return HttpResponse(BODY, content_type="application/json")
+
+    def test_compresses_async_responses(self):
+        compression = CompressionMiddleware(self.get_response)
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        assert asyncio.iscoroutinefunction(compression)
+        response = asyncio.run(compression(request))
+
+        assert gzip.decompress(response.content) == BODY
+
+    def test_passes_requests_to_async_views(self):
+        whitenoise = AsyncWhiteNoiseMiddleware(self.get_response)
+
+        assert asyncio.iscoroutinefunction(whitenoise)
+        response = asyncio.run(whitenoise(self.factory.get("/api/v1/")))
+
+        assert response.content == BODY
@@ -0,0 +1,17 @@
+import io
+
+import pytest
+from rest_framework.exceptions import ParseError
+
+from metagrid.core.parsers import ORJSONParser
+
+
+class TestORJSONParser:
+    def test_parses_json(self):
+        stream = io.BytesIO(b'{"items": [{"id": "foo"}]}')
+
+        assert ORJSONParser().parse(stream) == {"items": [{"id": "foo"}]}
+
+    def test_raises_parse_error_for_invalid_json(self):
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{"))
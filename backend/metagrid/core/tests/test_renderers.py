@@ -0,0 +1,99 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import msgpack
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from metagrid.core.renderers import MessagePackRenderer, ORJSONRenderer
+from metagrid.projects.tests.factories import ProjectFactory
+
+pytestmark = pytest.mark.django_db
+
+DATA = {
+    "uuid": uuid.UUID("6f7a1c5e-5ae4-4b9f-a8a6-2c2bb5c3a6d1"),
+    "decimal": decimal.Decimal("1.5"),
+    "date": datetime.date(2020, 1, 1),
+    "lazy": gettext_lazy("lazy"),
+    "error": ErrorDetail("error", code="invalid"),
+    1: "non-string key",
+}
+
+
+class TestORJSONRenderer:
+    def test_renders_drf_types(self):
+        rendered = ORJSONRenderer().render(DATA)
+
+        assert json.loads(rendered) == {
+            "uuid": "6f7a1c5e-5ae4-4b9f-a8a6-2c2bb5c3a6d1",
+            "decimal": 1.5,
+            "date": "2020-01-01",
+            "lazy": "lazy",
+            "error": "error",
+            "1": "non-string key",
+        }
+
+    def test_matches_stock_renderer(self):
+        data = {
+            "polled_at": datetime.datetime(
+                2020, 1, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+            ),
+            "naive": datetime.datetime(2020, 1, 1, 12, 30, 15, 123456),
+            "date": datetime.date(2020, 1, 1),
+            "time": datetime.time(12, 30, 15, 123456),
+            "uuid": DATA["uuid"],
+            "history": [{"at": datetime.datetime(2020, 1, 1), "n": 1.5}],
+        }
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_renders_none_as_empty_body(self):
+        assert ORJSONRenderer().render(None) == b""
+
+    def test_indents_when_requested(self):
+        rendered = ORJSONRenderer().render(
+            {"a": 1}, accepted_media_type="application/json; indent=4"
+        )
+
+        assert rendered == b'{\n  "a": 1\n}'
+
+
+class TestMessagePackRenderer:
+    def test_renders_drf_types(self):
+        rendered = MessagePackRenderer().render(
+            {"uuid": DATA["uuid"], "lazy": DATA["lazy"], "items": [1, "a"]}
+        )
+
+        assert msgpack.unpackb(rendered) == {
+            "uuid": "6f7a1c5e-5ae4-4b9f-a8a6-2c2bb5c3a6d1",
+            "lazy": "lazy",
+            "items": [1, "a"],
+        }
+
+
+class TestRendererNegotiation(APITestCase):
+    def setUp(self):
+        ProjectFactory(name="CMIP6")
+        self.url = reverse("project-list")
+
+    def test_renders_json_by_default(self):
+        response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/json"
+        assert response.json()["results"][0]["name"] == "CMIP6"
+
+    def test_renders_msgpack_when_accepted(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/msgpack")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/msgpack"
+        data = msgpack.unpackb(response.content)
+        assert data["results"][0]["name"] == "CMIP6"
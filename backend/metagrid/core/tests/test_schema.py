@@ -0,0 +1,92 @@
+import json
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from metagrid.core import schema
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def schema_dir(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = str(tmp_path)
+    schema.clear_schema_files()
+    yield tmp_path
+    schema.clear_schema_files()
+
+
+def test_generate_schema_files():
+    files = schema.generate_schema_files()
+
+    assert "/api/v1/projects/" in json.loads(files[".json"])["paths"]
+    assert files[".yaml"].startswith(b"swagger: '2.0'")
+
+
+def test_generate_schema_command(schema_dir):
+    call_command("generate_schema")
+
+    assert sorted(path.name for path in schema_dir.iterdir()) == [
+        "swagger.json",
+        "swagger.yaml",
+    ]
+
+
+class TestSchemaFileView:
+    def test_serves_generated_file_without_introspection(
+        self, client, schema_dir
+    ):
+        (schema_dir / "swagger.json").write_bytes(b'{"swagger": "2.0"}')
+        (schema_dir / "swagger.yaml").write_bytes(b"swagger: '2.0'\n")
+
+        with mock.patch.object(schema, "generate_schema_files") as generate:
+            response = client.get(
+                reverse("schema-json", kwargs={"format": ".json"})
+            )
+
+        assert not generate.called
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b'{"swagger": "2.0"}'
+        assert response["Content-Type"] == "application/json"
+        assert response["ETag"]
+        assert "public" in response["Cache-Control"]
+
+    def test_revalidates_with_etag(self, client):
+        url = reverse("schema-json", kwargs={"format": ".yaml"})
+        etag = client.get(url)["ETag"]
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+    def test_generates_missing_files_once_per_process(self, client):
+        with mock.patch.object(
+            schema,
+            "generate_schema_files",
+            wraps=schema.generate_schema_files,
+        ) as generate:
+            for format in (".json", ".yaml", ".json"):
+                response = client.get(
+                    reverse("schema-json", kwargs={"format": format})
+                )
+                assert response.status_code == status.HTTP_200_OK
+
+        assert generate.call_count == 1
+
+
+class TestDocs:
+    @pytest.mark.parametrize("name", ["schema-swagger-ui", "schema-redoc"])
+    def test_loads_generated_schema(self, client, name):
+        response = client.get(reverse(name))
+        spec_response = client.get(reverse(name), {"format": "openapi"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert reverse("schema-json", kwargs={"format": ".json"}) in (
+            response.content.decode()
+        )
+        # The docs do not generate the schema themselves
+        assert spec_response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,121 @@
+from unittest import mock
+from urllib.parse import urlencode
+
+import pytest
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from metagrid.core.serializers import DynamicFieldsMixin
+from metagrid.projects.models import Project
+from metagrid.projects.tests.factories import ProjectFactory
+
+
+class NameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ("name",)
+
+
+class DetailsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ("pk", "name")
+
+
+class PkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ("pk",)
+
+
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    summary = serializers.SerializerMethodField()
+    details = NameSerializer(source="*", read_only=True)
+
+    def get_summary(self, project):
+        return f"{project.name}: {project.description}"
+
+    class Meta:
+        model = Project
+        fields = ("pk", "name", "description", "summary", "details")
+        expandable_fields = {"details": DetailsSerializer}
+        compact_fields = {"details": PkSerializer}
+
+
+def make_request(method="get", **params):
+    path = f"/?{urlencode(params, doseq=True)}"
+    return Request(getattr(APIRequestFactory(), method)(path))
+
+
+class TestDynamicFieldsMixin:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.project = ProjectFactory.build(pk=1, name="CMIP6")
+
+    def serialize(self, request, **kwargs):
+        return ProjectSerializer(
+            self.project, context={"request": request}, **kwargs
+        ).data
+
+    def test_returns_all_fields_by_default(self):
+        data = self.serialize(make_request())
+
+        assert set(data) == {"pk", "name", "description", "summary", "details"}
+        assert data["details"] == {"name": "CMIP6"}
+
+    def test_includes_requested_fields(self):
+        data = self.serialize(make_request(fields="pk,name"))
+
+        assert set(data) == {"pk", "name"}
+
+    def test_omits_fields(self):
+        data = self.serialize(make_request(omit=["summary", "details"]))
+
+        assert set(data) == {"pk", "name", "description"}
+
+    def test_does_not_compute_pruned_fields(self):
+        with mock.patch.object(
+            ProjectSerializer, "get_summary"
+        ) as get_summary:
+            self.serialize(make_request(fields="pk"))
+
+        get_summary.assert_not_called()
+
+    def test_expands_expandable_fields(self):
+        data = self.serialize(make_request(expand="details"))
+
+        assert data["details"]["pk"] == 1
+        assert data["details"]["name"] == "CMIP6"
+
+    def test_ignores_fields_that_are_not_expandable(self):
+        data = self.serialize(make_request(expand="summary"))
+
+        assert data["summary"] == self.serialize(make_request())["summary"]
+
+    def test_compacts_compact_fields(self):
+        data = self.serialize(make_request(compact="details"))
+
+        assert data["details"] == {"pk": 1}
+
+    def test_applies_to_each_item_of_lists(self):
+        data = self.serialize(make_request(fields="name"), many=False)
+        many_data = ProjectSerializer(
+            [self.project, self.project],
+            many=True,
+            context={"request": make_request(fields="name")},
+        ).data
+
+        assert [dict(item) for item in many_data] == [data, data]
+
+    def test_does_not_prune_fields_of_writes(self):
+        serializer = ProjectSerializer(
+            context={"request": make_request("post", fields="pk")}
+        )
+
+        assert "name" in serializer.fields
+
+    def test_does_not_prune_fields_without_request(self):
+        data = ProjectSerializer(self.project).data
+
+        assert "summary" in data
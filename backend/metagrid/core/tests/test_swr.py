@@ -0,0 +1,70 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+
+from metagrid.core import swr
+
+CACHE_ALIAS = "esgf_search"
+
+
+class TestGetOrRefresh:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.loader = mock.Mock(return_value="fresh")
+        self.cache = caches[CACHE_ALIAS]
+
+    def get(self, **kwargs):
+        return swr.get_or_refresh(
+            CACHE_ALIAS, "key", self.loader, ttl=60, stale_ttl=600, **kwargs
+        )
+
+    def test_loads_missing_value(self):
+        assert self.get() == "fresh"
+        self.loader.assert_called_once()
+
+    def test_serves_cached_value_before_expiry(self):
+        self.get()
+        self.get()
+
+        self.loader.assert_called_once()
+
+    def test_serves_stale_value_and_refreshes_it_once(self):
+        self.cache.set("key", {"value": "stale", "expires_at": 0})
+
+        with mock.patch.object(swr._executor, "submit") as submit:
+            assert self.get() == "stale"
+            assert self.get() == "stale"
+
+        submit.assert_called_once()
+        self.loader.assert_not_called()
+
+    def test_refresh_replaces_stale_value(self):
+        self.cache.set("key", {"value": "stale", "expires_at": 0})
+
+        future = swr.schedule_refresh(
+            CACHE_ALIAS, "key", self.loader, ttl=60, stale_ttl=600, jitter=0
+        )
+        future.result()
+
+        assert self.get() == "fresh"
+        assert self.cache.get("key:refreshing") is None
+
+    def test_failed_refresh_keeps_stale_value(self):
+        self.cache.set("key", {"value": "stale", "expires_at": 0})
+        self.loader.side_effect = ValueError()
+
+        future = swr.schedule_refresh(
+            CACHE_ALIAS, "key", self.loader, ttl=60, stale_ttl=600, jitter=0
+        )
+        future.result()
+
+        assert self.cache.get("key")["value"] == "stale"
+        assert self.cache.get("key:refreshing") is None
+
+    def test_jitter_spreads_expiry(self):
+        with mock.patch.object(swr.time, "time", return_value=0):
+            expiries = {swr._get_expiry(100, 0.1) for _ in range(20)}
+
+        assert len(expiries) > 1
+        assert all(90 <= expiry <= 110 for expiry in expiries)
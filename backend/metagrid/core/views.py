@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from metagrid.core.schema import get_schema_file
+
+
+@require_safe
+def schema_file_view(request, format):
+    """Serves the pre-generated OpenAPI schema of the REST API."""
+    content, content_type, etag = get_schema_file(format)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE
+    )
+    return response
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class ProjectsConfig(AppConfig):
-    name = "projects"
+    name = "metagrid.projects"
+
+    def ready(self):
+        import metagrid.projects.signals  # noqa F401
@@ -0,0 +1,109 @@
+"""
+Precomputed catalogue of the projects and the values derived from their facets.
+
+A project's 'facets_url' and 'facets_by_group' require a query each, so they
+are computed for every project at once and cached until a project, facet or
+facet group changes (refer to signals.py). The catalogue is versioned with a
+hash of its contents, which is used as the ETag of the projects API.
+"""
+import hashlib
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from metagrid.projects.models import Project, ProjectFacet
+
+CATALOGUE_CACHE_KEY = "projects:catalogue"
+
+# {project pk: {"name": str, ..., "facets_by_group": {group: [facet]}}}
+Catalogue = Dict[int, Dict]
+
+
+def build_project_catalogue() -> Catalogue:
+    """Builds the catalogue with a fixed number of queries."""
+    facets = defaultdict(list)  # type: Dict[int, List]
+    for row in ProjectFacet.objects.order_by("pk").values_list(
+        "project_id", "group_id", "group__name", "facet__name", "cardinality"
+    ):
+        facets[row[0]].append(row[1:])
+
+    catalogue = {}  # type: Catalogue
+    for project in Project.objects.all():
+        project_facets = facets.get(project.pk, [])
+
+        # Groups are ordered by their pk and the sort is stable, so facets
+        # keep their order within a group
+        facets_by_group = defaultdict(list)  # type: Dict[str, List[str]]
+        for _, group_name, facet_name, _ in sorted(
+            project_facets, key=lambda facet: facet[0]
+        ):
+            facets_by_group[group_name].append(facet_name)
+
+        catalogue[project.pk] = {
+            "name": project.name,
+            "full_name": project.full_name,
+            "description": project.description,
+            "facets_url": project.generate_facets_url(
+                [facet_name for _, _, facet_name, _ in project_facets]
+            ),
+            "facets_by_group": dict(facets_by_group),
+            "facet_cardinalities": {
+                facet_name: cardinality
+                for _, _, facet_name, cardinality in project_facets
+                if cardinality is not None
+            },
+        }
+
+    return catalogue
+
+
+def get_catalogue_version(catalogue: Catalogue) -> str:
+    """Returns a hash that changes whenever the catalogue does."""
+    serialized_catalogue = json.dumps(sorted(catalogue.items()))
+    return hashlib.sha256(serialized_catalogue.encode()).hexdigest()
+
+
+def _get_cached_catalogue() -> Dict:
+    cached_catalogue = cache.get(CATALOGUE_CACHE_KEY)  # type: Optional[Dict]
+
+    if cached_catalogue is None:
+        catalogue = build_project_catalogue()
+        cached_catalogue = {
+            "version": get_catalogue_version(catalogue),
+            "projects": catalogue,
+        }
+        cache.set(
+            CATALOGUE_CACHE_KEY,
+            cached_catalogue,
+            settings.PROJECTS_CATALOGUE_CACHE_TTL,
+        )
+
+    return cached_catalogue
+
+
+def get_project_catalogue() -> Catalogue:
+    """Returns the cached catalogue, building it if it is missing."""
+    return _get_cached_catalogue()["projects"]
+
+
+def get_project_catalogue_version() -> str:
+    """Returns the version of the cached catalogue.
+
+    No queries are made while the catalogue is cached.
+    """
+    return _get_cached_catalogue()["version"]
+
+
+def invalidate_project_catalogue():
+    """Discards the cached catalogue so that it is rebuilt on next access.
+
+    It is discarded again once the current transaction commits, otherwise a
+    concurrent request could cache a catalogue built from the data that was
+    there before the commit.
+    """
+    cache.delete(CATALOGUE_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(CATALOGUE_CACHE_KEY))
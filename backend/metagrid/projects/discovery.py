@@ -0,0 +1,227 @@
+"""
+Discovery of the facets of a project from an ESGF index.
+
+The index is asked for the values of all facets of the project's datasets,
+from which the facets that have values are kept along with the number of
+values of each (their cardinality). The facets of a new project are then
+assigned to groups, preferring the group that other projects already use for
+a facet, and populated through the declarative catalogue sync. The facets of
+existing projects are curated through that sync, so only their
+cardinalities are updated.
+https://esgf.github.io/esg-search/ESGF_Search_RESTful_API.html
+"""
+import json
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from metagrid.api_proxy.upstream import fetch
+from metagrid.projects.catalogue import invalidate_project_catalogue
+from metagrid.projects.models import Project, ProjectFacet
+from metagrid.projects.sync import get_facets_by_group, sync_catalogue
+
+# Fields that the index reports as facets but that do not help narrow down
+# a search
+IGNORED_FACETS = frozenset(
+    (
+        "dataset_id_template_",
+        "directory_format_template_",
+        "index_node",
+        "instance_id",
+        "master_id",
+        "number_of_aggregations",
+        "number_of_files",
+        "type",
+        "version",
+    )
+)
+
+# Groups of facets whose group cannot be taken from other projects, matched
+# by the first pattern that the facet name contains
+GROUP_PATTERNS = (
+    ("resolution", "Resolutions"),
+    ("grid", "Resolutions"),
+    ("label", "Labels"),
+    ("variant", "Labels"),
+    ("ensemble", "Labels"),
+    ("variable", "Classifications"),
+    ("realm", "Classifications"),
+    ("frequency", "Classifications"),
+    ("table", "Classifications"),
+    ("cf_standard_name", "Classifications"),
+    ("_id", "Identifiers"),
+    ("experiment", "Identifiers"),
+    ("institut", "Identifiers"),
+    ("model", "Identifiers"),
+    ("source", "Identifiers"),
+)
+DEFAULT_GROUP = "General"
+
+
+def fetch_facet_counts(
+    project: Project, index_url: Optional[str] = None
+) -> Dict[str, List[Any]]:
+    """Fetches the values of all facets of a project's datasets.
+
+    :returns: The Solr facet counts, as {facet: [value, count, ...]}
+    """
+    params = {
+        **project.project_param,
+        "type": "Dataset",
+        "format": "application/solr+json",
+        "limit": 0,
+        "facets": "*",
+    }
+    response = fetch(index_url or settings.ESGF_SEARCH_URL, params=params)
+
+    try:
+        response.raise_for_status()
+        return response.json()["facet_counts"]["facet_fields"]
+    finally:
+        response.close()
+
+
+def load_facet_counts(path: str) -> Dict[str, List[Any]]:
+    """Loads the facet counts from a saved ESGF Search API response."""
+    with open(path) as file:
+        return json.load(file)["facet_counts"]["facet_fields"]
+
+
+def get_cardinalities(facet_counts: Dict[str, List[Any]]) -> Dict[str, int]:
+    """Returns the number of values of each facet that has values."""
+    return {
+        facet: len(values) // 2
+        for facet, values in facet_counts.items()
+        if values and facet not in IGNORED_FACETS
+    }
+
+
+def get_known_groups(project: Project) -> Dict[str, str]:
+    """Returns the group of each facet that projects already have.
+
+    Facets keep the group they have in the project, or otherwise get the
+    group that the other projects most often put them in.
+    """
+    counts = defaultdict(Counter)  # type: Dict[str, Counter]
+    own_groups = {}  # type: Dict[str, str]
+    rows = ProjectFacet.objects.values_list(
+        "project__name", "facet__name", "group__name"
+    )
+
+    for project_name, facet_name, group_name in rows:
+        counts[facet_name][group_name] += 1
+        if project_name == project.name:
+            own_groups[facet_name] = group_name
+
+    return {
+        **{
+            facet: group_counts.most_common(1)[0][0]
+            for facet, group_counts in counts.items()
+        },
+        **own_groups,
+    }
+
+
+def propose_groups(
+    cardinalities: Dict[str, int], known_groups: Dict[str, str]
+) -> Dict[str, List[str]]:
+    """Assigns facets to groups.
+
+    Facets are ordered by their cardinality within a group, so the facets
+    with the fewest values, which are the cheapest to load, come first.
+    """
+    facets_by_group = defaultdict(list)  # type: Dict[str, List[Tuple]]
+
+    for facet, cardinality in cardinalities.items():
+        group = known_groups.get(facet, "")
+        if not group:
+            group = next(
+                (name for pattern, name in GROUP_PATTERNS if pattern in facet),
+                DEFAULT_GROUP,
+            )
+        facets_by_group[group].append((cardinality, facet))
+
+    return {
+        group: [facet for _, facet in sorted(facets)]
+        for group, facets in sorted(facets_by_group.items())
+    }
+
+
+def discover_facets(
+    project: Project,
+    facet_counts: Dict[str, List[Any]],
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Populates the facets of a new project, and their cardinalities.
+
+    The facets of a project that already exists are left as they are, and
+    only their cardinalities are updated. The facets that the index has but
+    the project does not are reported in 'unlisted'.
+
+    :returns: The facets by group, the cardinality of each facet, the
+        unlisted facets and the changes made
+    """
+    cardinalities = get_cardinalities(facet_counts)
+    changes = defaultdict(
+        lambda: {"created": 0, "updated": 0, "deleted": 0}
+    )  # type: Dict[str, Dict[str, int]]
+
+    with transaction.atomic():
+        if project.pk is None:
+            facets_by_group = propose_groups(
+                cardinalities, get_known_groups(project)
+            )
+            spec = {
+                "version": 1,
+                "projects": [
+                    {
+                        "name": project.name,
+                        "full_name": project.full_name,
+                        "description": project.description,
+                        "facets": facets_by_group,
+                    }
+                ],
+            }
+            changes.update(sync_catalogue(spec))
+        else:
+            facets_by_group = get_facets_by_group().get(project.pk, {})
+
+        changes["project_facets"]["updated"] += update_cardinalities(
+            project, cardinalities
+        )
+        if dry_run:
+            transaction.set_rollback(True)
+
+    listed = {facet for facets in facets_by_group.values() for facet in facets}
+    return {
+        "facets_by_group": facets_by_group,
+        "cardinalities": cardinalities,
+        "unlisted": sorted(set(cardinalities) - listed),
+        "changes": dict(changes),
+    }
+
+
+def update_cardinalities(
+    project: Project, cardinalities: Dict[str, int]
+) -> int:
+    """Stores the cardinalities of the facets that a project has.
+
+    :returns: The number of facets whose cardinality changed
+    """
+    project_facets = [
+        project_facet
+        for project_facet in ProjectFacet.objects.filter(
+            project__name=project.name
+        ).select_related("facet")
+        if project_facet.cardinality
+        != cardinalities.get(project_facet.facet.name)
+    ]
+    for project_facet in project_facets:
+        project_facet.cardinality = cardinalities.get(project_facet.facet.name)
+
+    ProjectFacet.objects.bulk_update(project_facets, ["cardinality"])
+    if project_facets:
+        invalidate_project_catalogue()
+    return len(project_facets)
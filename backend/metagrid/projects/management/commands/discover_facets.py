@@ -0,0 +1,107 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from metagrid.api_proxy.upstream import UpstreamHostNotAllowed
+from metagrid.projects.discovery import (
+    discover_facets,
+    fetch_facet_counts,
+    get_cardinalities,
+    load_facet_counts,
+    update_cardinalities,
+)
+from metagrid.projects.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Discovers the facets of a project and their cardinalities from an "
+        "ESGF index. The facets of a new project are populated grouped, and "
+        "only the cardinalities of an existing project are updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("project", help="Name of the project")
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument(
+            "--index-url",
+            help="Search URL of the ESGF index, which defaults to "
+            "ESGF_SEARCH_URL",
+        )
+        source.add_argument(
+            "--from-file",
+            help="Path to a saved ESGF Search API response with facet counts",
+        )
+        parser.add_argument(
+            "--full-name", help="Full name of the project if it is new"
+        )
+        parser.add_argument(
+            "--description", help="Description of the project if it is new"
+        )
+        parser.add_argument(
+            "--cardinality-only",
+            action="store_true",
+            help="Only update the cardinalities of the project's facets, "
+            "failing if the project is new",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the proposed facets without populating them",
+        )
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(name=options["project"]).first()
+        if project is None:
+            if options["cardinality_only"]:
+                raise CommandError(f"Unknown project: {options['project']}")
+            project = Project(
+                name=options["project"],
+                full_name=options["full_name"],
+                description=options["description"],
+            )
+
+        try:
+            if options["from_file"]:
+                facet_counts = load_facet_counts(options["from_file"])
+            else:
+                facet_counts = fetch_facet_counts(
+                    project, options["index_url"]
+                )
+        # Requests' errors are OSErrors, so they are caught first
+        except (requests.RequestException, UpstreamHostNotAllowed) as e:
+            raise CommandError(f"Could not query the ESGF index: {e}")
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read the facet counts: {e}")
+
+        if options["cardinality_only"]:
+            updated = update_cardinalities(
+                project, get_cardinalities(facet_counts)
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Updated {updated} cardinalities")
+            )
+            return
+
+        result = discover_facets(
+            project, facet_counts, dry_run=options["dry_run"]
+        )
+        for group, facets in result["facets_by_group"].items():
+            self.stdout.write(f"{group}:")
+            for facet in facets:
+                cardinality = result["cardinalities"].get(facet, 0)
+                self.stdout.write(f"  {facet} ({cardinality} values)")
+        if result["unlisted"]:
+            self.stdout.write(
+                "Not in the catalogue: " + ", ".join(result["unlisted"])
+            )
+
+        changes = result["changes"]["project_facets"]
+        summary = "Proposed" if options["dry_run"] else "Populated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary} {sum(map(len, result['facets_by_group'].values()))} "
+                f"facets of {project.name} ({changes['created']} created, "
+                f"{changes['deleted']} deleted, {changes['updated']} "
+                "cardinalities updated)"
+            )
+        )
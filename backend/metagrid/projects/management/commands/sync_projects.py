@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from metagrid.projects.sync import (
+    InvalidSpec,
+    ProjectConflict,
+    dump_spec,
+    export_catalogue,
+    load_spec,
+    sync_catalogue,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Syncs the projects, facets and facet groups with a YAML or JSON "
+        "catalogue spec, writing only the differences."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the catalogue spec")
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help=(
+                "Delete the projects missing from the spec, with their saved "
+                "searches, and the facets and groups left unused"
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the changes without applying them",
+        )
+        parser.add_argument(
+            "--export",
+            action="store_true",
+            help="Write the catalogue in the database to the path instead",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+
+        if options["export"]:
+            dump_spec(export_catalogue(), path)
+            self.stdout.write(self.style.SUCCESS(f"Exported to {path}"))
+            return
+
+        started_at = time.monotonic()
+        try:
+            spec = load_spec(path)
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {e}")
+        except InvalidSpec as e:
+            raise CommandError(str(e))
+
+        try:
+            changes = sync_catalogue(
+                spec, prune=options["prune"], dry_run=options["dry_run"]
+            )
+        except ProjectConflict as e:
+            raise CommandError(str(e))
+        except IntegrityError as e:
+            raise CommandError(f"Could not sync the catalogue: {e}")
+        elapsed = time.monotonic() - started_at
+
+        for model, counts in changes.items():
+            self.stdout.write(
+                f"{model}: {counts['created']} created, "
+                f"{counts['updated']} updated, {counts['deleted']} deleted"
+            )
+        summary = "Dry run" if options["dry_run"] else "Synced"
+        self.stdout.write(
+            self.style.SUCCESS(f"{summary} in {elapsed * 1000:.0f} ms")
+        )
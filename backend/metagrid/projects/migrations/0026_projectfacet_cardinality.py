@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0025_remove_projectfacet_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfacet',
+            name='cardinality',
+            field=models.PositiveIntegerField(blank=True, help_text='The number of distinct values of the facet in the project, as last discovered from the ESGF index', null=True),
+        ),
+    ]
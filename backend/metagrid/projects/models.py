@@ -43,6 +43,13 @@ class Project(models.Model):
         """Generates a URL query string for the ESGF Search API."""
         facets = self.facets.order_by("id").values_list("facet__name", flat=True)  # type: ignore
 
+        return self.generate_facets_url(list(facets))
+
+    def generate_facets_url(self, facets: List[str]) -> Union[None, str]:
+        """Generates a URL query string for the given facet names.
+
+        This allows the facets of many projects to be fetched in bulk.
+        """
         if not facets:
             logger.warning(f"No facets found for project: {self.name}")
             return None
@@ -105,6 +112,12 @@ class ProjectFacet(models.Model):
         "projects.facetgroup",
         on_delete=models.CASCADE,
     )
+    cardinality = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The number of distinct values of the facet in the project, "
+        "as last discovered from the ESGF index",
+    )
 
     class Meta:
         """Meta definition for ProjectFacet."""
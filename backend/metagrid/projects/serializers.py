@@ -1,26 +1,47 @@
-from collections import defaultdict
-
 from rest_framework import serializers
 
+from metagrid.core.serializers import DynamicFieldsMixin
+
+from .catalogue import get_project_catalogue, invalidate_project_catalogue
 from .models import Project
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     facets_by_group = serializers.SerializerMethodField(read_only=True)
-    facets_url = serializers.ReadOnlyField()
+    facets_url = serializers.SerializerMethodField(read_only=True)
+    facet_cardinalities = serializers.SerializerMethodField(read_only=True)
+
+    def get_catalogue_entry(self, project):
+        """Returns the precomputed facet values of a project.
+
+        The catalogue is stored in the (root) serializer context so that it
+        is only fetched once when serializing a list of projects.
+        """
+        catalogue = self.context.get("project_catalogue")
+        if catalogue is None:
+            catalogue = get_project_catalogue()
+
+        # Rebuild the catalogue if it predates the project, which can happen
+        # when each worker process has its own cache
+        if project.pk is not None and project.pk not in catalogue:
+            invalidate_project_catalogue()
+            catalogue = get_project_catalogue()
+
+        self.context["project_catalogue"] = catalogue
+        return catalogue.get(project.pk, {})
 
     def get_facets_by_group(self, project):
-        facets_by_group = defaultdict(list)
-
-        for result in project.facets.values(
-            "group__name", "facet__name"
-        ).order_by(
-            "group__pk",
-        ):
-            facets_by_group[result["group__name"]].append(
-                result["facet__name"]
-            )
-        return facets_by_group
+        return self.get_catalogue_entry(project).get("facets_by_group", {})
+
+    def get_facets_url(self, project):
+        return self.get_catalogue_entry(project).get("facets_url")
+
+    def get_facet_cardinalities(self, project):
+        """Returns the number of values of the facets with a known number.
+
+        Clients can defer loading the values of facets with many of them.
+        """
+        return self.get_catalogue_entry(project).get("facet_cardinalities", {})
 
     class Meta:
         model = Project
@@ -31,4 +52,13 @@ class ProjectSerializer(serializers.ModelSerializer):
             "description",
             "facets_by_group",
             "facets_url",
+            "facet_cardinalities",
         )
+
+
+class CompactProjectSerializer(serializers.ModelSerializer):
+    """The pk and name of a project, for listings that reference projects."""
+
+    class Meta:
+        model = Project
+        fields = ("pk", "name")
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from metagrid.projects.catalogue import invalidate_project_catalogue
+from metagrid.projects.models import Facet, FacetGroup, Project, ProjectFacet
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ProjectFacet)
+@receiver(post_delete, sender=ProjectFacet)
+@receiver(post_save, sender=Facet)
+@receiver(post_delete, sender=Facet)
+@receiver(post_save, sender=FacetGroup)
+@receiver(post_delete, sender=FacetGroup)
+def invalidate_catalogue(sender, **kwargs):
+    """Invalidates the project catalogue when its source data changes."""
+    invalidate_project_catalogue()
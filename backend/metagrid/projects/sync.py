@@ -0,0 +1,420 @@
+"""
+Declarative sync of the project catalogue.
+
+The projects, facet groups and facets are described in a versioned YAML or
+JSON spec, e.g.:
+
+    version: 1
+    groups:
+      General: Facets that identify the data
+    facets:
+      activity_id: null
+    projects:
+      - name: CMIP6
+        full_name: Coupled Model Intercomparison Project Phase 6
+        description: ...
+        facets:
+          General: [activity_id, source_id]
+
+The spec is diffed against the database and only the differences are
+written, with bulk queries in a single transaction, so syncing the same
+spec again changes nothing. The facets of a project are ordered as listed,
+which is the order of their 'facets' in the ESGF Search API queries.
+"""
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from django.db import IntegrityError, transaction
+
+from metagrid.projects.catalogue import invalidate_project_catalogue
+from metagrid.projects.models import Facet, FacetGroup, Project, ProjectFacet
+
+SPEC_VERSION = 1
+
+# Fields of the projects that are synced besides their name and facets
+PROJECT_FIELDS = ("full_name", "description")
+
+
+class InvalidSpec(Exception):
+    """Raised when a catalogue spec is malformed."""
+
+
+class ProjectConflict(Exception):
+    """Raised when a project of the spec conflicts with another project."""
+
+    def __init__(self, name: str, error: IntegrityError):
+        super().__init__(f"Could not sync project {name}: {error}")
+        self.name = name
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """Loads a catalogue spec from a YAML or JSON file.
+
+    JSON is a subset of YAML, so both are read with the YAML loader.
+    """
+    with open(path) as file:
+        try:
+            spec = yaml.safe_load(file)
+        except yaml.YAMLError as e:
+            raise InvalidSpec(f"The spec is not valid YAML or JSON: {e}")
+
+    validate_spec(spec)
+    return spec
+
+
+def validate_spec(spec: Any):
+    if not isinstance(spec, dict):
+        raise InvalidSpec("The spec must be a mapping.")
+    if spec.get("version") != SPEC_VERSION:
+        raise InvalidSpec(
+            f"Unsupported spec version {spec.get('version')!r}, expected "
+            f"{SPEC_VERSION}."
+        )
+    for key in ("groups", "facets"):
+        if not isinstance(spec.get(key) or {}, dict):
+            raise InvalidSpec(f"'{key}' must be a mapping.")
+
+    projects = spec.get("projects", [])
+    if not isinstance(projects, list) or not all(
+        isinstance(project, dict) for project in projects
+    ):
+        raise InvalidSpec("'projects' must be a list of mappings.")
+
+    names = [project.get("name") for project in projects]
+    if not all(isinstance(name, str) and name for name in names):
+        raise InvalidSpec("Every project must have a name.")
+    if len(set(names)) != len(names):
+        raise InvalidSpec("Project names must be unique.")
+
+    for project in projects:
+        facets_by_group = project.get("facets") or {}
+        if not isinstance(facets_by_group, dict) or not all(
+            isinstance(group_facets, list)
+            and all(isinstance(facet, str) and facet for facet in group_facets)
+            for group_facets in facets_by_group.values()
+        ):
+            raise InvalidSpec(
+                f"Facets of project {project['name']} must map groups to "
+                "lists of facet names."
+            )
+
+        facets = [
+            facet
+            for group_facets in facets_by_group.values()
+            for facet in group_facets
+        ]
+        if len(set(facets)) != len(facets):
+            raise InvalidSpec(
+                f"Facets of project {project['name']} must be unique."
+            )
+
+
+def get_project_facets(project: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Returns the (facet, group) pairs of a project spec, in order."""
+    return [
+        (facet, group)
+        for group, facets in (project.get("facets") or {}).items()
+        for facet in facets
+    ]
+
+
+def sync_catalogue(
+    spec: Dict[str, Any], prune: bool = False, dry_run: bool = False
+) -> Dict[str, Dict[str, int]]:
+    """Syncs the project catalogue with a spec.
+
+    :param spec: The catalogue spec
+    :param prune: Deletes the projects that are not in the spec, along with
+        the saved searches of those projects, and unused facets and groups
+    :param dry_run: Computes the changes without applying them
+    :returns: The number of rows created, updated and deleted per model
+    :raises ProjectConflict: If a project of the spec conflicts with another
+        project, e.g. by having the same 'full_name'
+    """
+    changes = defaultdict(
+        lambda: {"created": 0, "updated": 0, "deleted": 0}
+    )  # type: Dict[str, Dict[str, int]]
+
+    with transaction.atomic():
+        groups = sync_groups(spec, changes)
+        facets = sync_facets(spec, changes)
+        sync_projects(spec, groups, facets, changes, prune)
+
+        if prune:
+            prune_unused(changes)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        elif any(sum(counts.values()) for counts in changes.values()):
+            invalidate_project_catalogue()
+
+    return dict(changes)
+
+
+def sync_groups(spec, changes) -> Dict[str, FacetGroup]:
+    descriptions = dict(spec.get("groups") or {})
+    for project in spec.get("projects", []):
+        for group in project.get("facets") or {}:
+            descriptions.setdefault(group, None)
+
+    # Group names are not unique, so the first group of a name is used
+    groups = {}  # type: Dict[str, FacetGroup]
+    for group in FacetGroup.objects.order_by("pk"):
+        groups.setdefault(group.name, group)
+
+    new_groups = [
+        FacetGroup(name=name, description=description)
+        for name, description in descriptions.items()
+        if name not in groups
+    ]
+    updated_groups = [
+        groups[name]
+        for name, description in descriptions.items()
+        if name in groups
+        and description is not None
+        and groups[name].description != description
+    ]
+    for group in updated_groups:
+        group.description = descriptions[group.name]
+
+    FacetGroup.objects.bulk_create(new_groups)
+    FacetGroup.objects.bulk_update(updated_groups, ["description"])
+    changes["groups"]["created"] += len(new_groups)
+    changes["groups"]["updated"] += len(updated_groups)
+
+    groups.update((group.name, group) for group in new_groups)
+    return groups
+
+
+def sync_facets(spec, changes) -> Dict[str, Facet]:
+    descriptions = dict(spec.get("facets") or {})
+    for project in spec.get("projects", []):
+        for facet, _ in get_project_facets(project):
+            descriptions.setdefault(facet, None)
+
+    facets = {facet.name: facet for facet in Facet.objects.all()}
+
+    new_facets = [
+        Facet(name=name, description=description)
+        for name, description in descriptions.items()
+        if name not in facets
+    ]
+    updated_facets = [
+        facets[name]
+        for name, description in descriptions.items()
+        if name in facets
+        and description is not None
+        and facets[name].description != description
+    ]
+    for updated in updated_facets:
+        updated.description = descriptions[updated.name]
+
+    Facet.objects.bulk_create(new_facets)
+    Facet.objects.bulk_update(updated_facets, ["description"])
+    changes["facets"]["created"] += len(new_facets)
+    changes["facets"]["updated"] += len(updated_facets)
+
+    facets.update((facet.name, facet) for facet in new_facets)
+    return facets
+
+
+def sync_projects(spec, groups, facets, changes, prune: bool):
+    projects = {project.name: project for project in Project.objects.all()}
+    specs = {project["name"]: project for project in spec.get("projects", [])}
+
+    new_projects = []
+    updated_projects = []
+    for name, project_spec in specs.items():
+        project = projects.get(name)
+        if project is None:
+            project = Project(name=name)
+            new_projects.append(project)
+        elif all(
+            getattr(project, field) == project_spec.get(field)
+            for field in PROJECT_FIELDS
+        ):
+            continue
+        else:
+            updated_projects.append(project)
+
+        for field in PROJECT_FIELDS:
+            setattr(project, field, project_spec.get(field))
+
+    try:
+        with transaction.atomic():
+            Project.objects.bulk_create(new_projects)
+            Project.objects.bulk_update(updated_projects, PROJECT_FIELDS)
+    except IntegrityError:
+        # Saves the projects one by one to find the one that conflicts
+        for project in new_projects + updated_projects:
+            try:
+                with transaction.atomic():
+                    project.save()
+            except IntegrityError as e:
+                raise ProjectConflict(project.name, e)
+        raise
+    changes["projects"]["created"] += len(new_projects)
+    changes["projects"]["updated"] += len(updated_projects)
+    projects.update((project.name, project) for project in new_projects)
+
+    if prune:
+        # Deleting a project also deletes the saved searches of it
+        pruned_names = set(projects) - set(specs)
+        Project.objects.filter(name__in=pruned_names).delete()
+        changes["projects"]["deleted"] += len(pruned_names)
+
+    sync_project_facets(specs, projects, groups, facets, changes)
+
+
+def sync_project_facets(specs, projects, groups, facets, changes):
+    """Syncs the facets of the projects in place, by facet name.
+
+    The facets of a group are ordered by their pks, so a facet is kept, and
+    moved to another group if need be, as long as it stays in order. From the
+    first facet of a group that is added or moved on, the facets of the group
+    are recreated in order, keeping the cardinalities that were discovered
+    for them (see metagrid.projects.discovery).
+    """
+    current_facets = defaultdict(list)  # type: Dict[int, List[ProjectFacet]]
+    for project_facet in ProjectFacet.objects.select_related(
+        "facet", "group"
+    ).order_by("pk"):
+        current_facets[project_facet.project_id].append(project_facet)
+
+    stale_ids = []  # type: List[int]
+    updated_project_facets = []  # type: List[ProjectFacet]
+    new_project_facets = []  # type: List[ProjectFacet]
+    for name, project_spec in specs.items():
+        project = projects[name]
+        current = current_facets.get(project.pk, [])
+        facets_by_group = {
+            group: list(group_facets)
+            for group, group_facets in (
+                project_spec.get("facets") or {}
+            ).items()
+            if group_facets
+        }
+        if group_facet_names(current) == facets_by_group:
+            continue
+
+        current_by_name = {
+            project_facet.facet.name: project_facet
+            for project_facet in current
+        }
+        kept_ids = set()
+        last_pks = defaultdict(int)  # type: Dict[str, Optional[int]]
+        for facet, group in get_project_facets(project_spec):
+            existing = current_by_name.get(facet)
+            if (
+                existing is not None
+                and last_pks[group] is not None
+                and existing.pk > last_pks[group]
+            ):
+                kept_ids.add(existing.pk)
+                last_pks[group] = existing.pk
+                if existing.group_id != groups[group].pk:
+                    existing.group = groups[group]
+                    updated_project_facets.append(existing)
+                continue
+
+            # Facets created from here on come after every existing facet
+            last_pks[group] = None
+            new_project_facets.append(
+                ProjectFacet(
+                    project=project,
+                    facet=facets[facet],
+                    group=groups[group],
+                    cardinality=existing.cardinality
+                    if existing is not None
+                    else None,
+                )
+            )
+
+        stale_ids.extend(
+            project_facet.pk
+            for project_facet in current
+            if project_facet.pk not in kept_ids
+        )
+
+    ProjectFacet.objects.filter(pk__in=stale_ids).delete()
+    ProjectFacet.objects.bulk_update(updated_project_facets, ["group"])
+    ProjectFacet.objects.bulk_create(new_project_facets)
+    changes["project_facets"]["created"] += len(new_project_facets)
+    changes["project_facets"]["updated"] += len(updated_project_facets)
+    changes["project_facets"]["deleted"] += len(stale_ids)
+
+
+def group_facet_names(
+    project_facets: List[ProjectFacet],
+) -> Dict[str, List[str]]:
+    """Returns the names of project facets by group, in order."""
+    facets_by_group = defaultdict(list)  # type: Dict[str, List[str]]
+    for project_facet in project_facets:
+        facets_by_group[project_facet.group.name].append(
+            project_facet.facet.name
+        )
+    return dict(facets_by_group)
+
+
+def prune_unused(changes):
+    """Deletes the facets and groups that no project uses anymore."""
+    unused_facets = Facet.objects.filter(projectfacet__isnull=True)
+    changes["facets"]["deleted"] += unused_facets.count()
+    unused_facets.delete()
+
+    unused_groups = FacetGroup.objects.filter(projectfacet__isnull=True)
+    changes["groups"]["deleted"] += unused_groups.count()
+    unused_groups.delete()
+
+
+def get_facets_by_group() -> Dict[int, Dict[str, List[str]]]:
+    """Returns the facet names of each project by group, in order."""
+    facets_by_group = defaultdict(
+        lambda: defaultdict(list)
+    )  # type: Dict[int, Dict[str, List[str]]]
+
+    for project_id, facet_name, group_name in ProjectFacet.objects.order_by(
+        "pk"
+    ).values_list("project_id", "facet__name", "group__name"):
+        facets_by_group[project_id][group_name].append(facet_name)
+
+    return {
+        project_id: dict(project_facets)
+        for project_id, project_facets in facets_by_group.items()
+    }
+
+
+def export_catalogue() -> Dict[str, Any]:
+    """Exports the project catalogue in the database as a spec."""
+    project_facets = get_facets_by_group()
+
+    return {
+        "version": SPEC_VERSION,
+        "groups": {
+            group.name: group.description
+            for group in FacetGroup.objects.order_by("pk")
+        },
+        "facets": {
+            facet.name: facet.description
+            for facet in Facet.objects.order_by("name")
+        },
+        "projects": [
+            {
+                "name": project.name,
+                **{field: getattr(project, field) for field in PROJECT_FIELDS},
+                "facets": project_facets.get(project.pk, {}),
+            }
+            for project in Project.objects.order_by("pk")
+        ],
+    }
+
+
+def dump_spec(spec: Dict[str, Any], path: str):
+    with open(path, "w") as file:
+        if path.endswith(".json"):
+            json.dump(spec, file, indent=2)
+            file.write("\n")
+        else:
+            yaml.safe_dump(spec, file, sort_keys=False, allow_unicode=True)
@@ -0,0 +1,107 @@
+from typing import TYPE_CHECKING
+
+import pytest
+from django.core.cache import cache
+
+from metagrid.projects.catalogue import (
+    CATALOGUE_CACHE_KEY,
+    build_project_catalogue,
+    get_project_catalogue,
+    get_project_catalogue_version,
+)
+from metagrid.projects.models import ProjectFacet
+from metagrid.projects.tests.factories import (
+    FacetFactory,
+    FacetGroupFactory,
+    ProjectFacetFactory,
+    ProjectFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+if TYPE_CHECKING:
+    from metagrid.projects.models import Project
+
+
+class TestBuildProjectCatalogue:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.project = ProjectFactory.create(name="CMIP6")  # type: Project
+        ProjectFacet.objects.filter(project=self.project).delete()
+
+        general = FacetGroupFactory.create(name="General")
+        identifiers = FacetGroupFactory.create(name="Identifiers")
+        for name, group in [
+            ("source_id", identifiers),
+            ("activity_id", general),
+            ("variant_label", identifiers),
+        ]:
+            ProjectFacetFactory.create(
+                project=self.project,
+                facet=FacetFactory.create(name=name),
+                group=group,
+            )
+
+    def test_matches_project_properties(self):
+        entry = build_project_catalogue()[self.project.pk]
+
+        assert entry["facets_url"] == self.project.facets_url
+        assert entry["facets_by_group"] == {
+            "General": ["activity_id"],
+            "Identifiers": ["source_id", "variant_label"],
+        }
+
+    def test_uses_fixed_number_of_queries(self, django_assert_num_queries):
+        ProjectFactory.create_batch(10)
+
+        with django_assert_num_queries(2):
+            catalogue = build_project_catalogue()
+
+        assert len(catalogue) >= 11
+
+    def test_includes_projects_without_facets(self):
+        project = ProjectFactory.create(name="CMIP5")  # type: Project
+        ProjectFacet.objects.filter(project=project).delete()
+
+        entry = build_project_catalogue()[project.pk]
+        assert entry["facets_url"] is None
+        assert entry["facets_by_group"] == {}
+
+
+class TestGetProjectCatalogue:
+    def test_caches_catalogue(self, django_assert_num_queries):
+        project = ProjectFactory.create()  # type: Project
+        get_project_catalogue()
+
+        with django_assert_num_queries(0):
+            catalogue = get_project_catalogue()
+
+        assert project.pk in catalogue
+
+    @pytest.mark.parametrize(
+        "factory", [ProjectFactory, FacetFactory, FacetGroupFactory]
+    )
+    def test_changes_invalidate_catalogue(self, factory):
+        get_project_catalogue()
+        assert cache.get(CATALOGUE_CACHE_KEY) is not None
+
+        factory.create()
+        assert cache.get(CATALOGUE_CACHE_KEY) is None
+
+    def test_deleting_project_facet_invalidates_catalogue(self):
+        project = ProjectFactory.create()  # type: Project
+        get_project_catalogue()
+
+        project.facets.first().delete()
+        assert cache.get(CATALOGUE_CACHE_KEY) is None
+
+
+class TestGetProjectCatalogueVersion:
+    def test_version_changes_with_catalogue(self):
+        project = ProjectFactory.create()  # type: Project
+        version = get_project_catalogue_version()
+        assert get_project_catalogue_version() == version
+
+        project.description = "new description"
+        project.save()
+        assert get_project_catalogue_version() != version
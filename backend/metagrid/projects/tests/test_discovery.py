@@ -0,0 +1,223 @@
+import json
+from unittest import mock
+
+import pytest
+import requests
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from metagrid.api_proxy.tests.utils import make_response
+from metagrid.projects.catalogue import get_project_catalogue
+from metagrid.projects.discovery import (
+    discover_facets,
+    get_cardinalities,
+    propose_groups,
+)
+from metagrid.projects.models import Project, ProjectFacet
+
+pytestmark = pytest.mark.django_db
+
+FACET_COUNTS = {
+    "activity_id": ["CMIP", 10, "ScenarioMIP", 5],
+    "variable_id": ["tas", 3, "pr", 2, "ts", 1],
+    "nominal_resolution": ["100 km", 4],
+    "new_facet": ["a", 1],
+    "empty_facet": [],
+    "version": ["20200101", 1],
+}
+
+
+def make_search_response(facet_counts=FACET_COUNTS):
+    return make_response(
+        json.dumps(
+            {
+                "response": {"numFound": 15, "docs": []},
+                "facet_counts": {"facet_fields": facet_counts},
+            }
+        ).encode()
+    )
+
+
+def get_project_facets(name):
+    return {
+        facet: (group, cardinality)
+        for facet, group, cardinality in ProjectFacet.objects.filter(
+            project__name=name
+        ).values_list("facet__name", "group__name", "cardinality")
+    }
+
+
+def test_get_cardinalities_skips_empty_and_ignored_facets():
+    assert get_cardinalities(FACET_COUNTS) == {
+        "activity_id": 2,
+        "variable_id": 3,
+        "nominal_resolution": 1,
+        "new_facet": 1,
+    }
+
+
+def test_propose_groups():
+    groups = propose_groups(
+        {"activity_id": 2, "source_id": 1, "grid_res": 5, "other": 1},
+        {"activity_id": "Identifiers"},
+    )
+
+    assert groups == {
+        "General": ["other"],
+        "Identifiers": ["source_id", "activity_id"],
+        "Resolutions": ["grid_res"],
+    }
+
+
+class TestDiscoverFacets:
+    def test_populates_new_project(self):
+        project = Project(name="NewMIP", full_name="New MIP")
+
+        result = discover_facets(project, FACET_COUNTS)
+
+        assert Project.objects.get(name="NewMIP").full_name == "New MIP"
+        # Groups of facets are taken from the existing projects
+        assert get_project_facets("NewMIP") == {
+            "activity_id": ("General", 2),
+            "variable_id": ("Classifications", 3),
+            "nominal_resolution": ("Resolutions", 1),
+            "new_facet": ("General", 1),
+        }
+        assert result["changes"]["project_facets"]["created"] == 4
+
+    def test_exposes_cardinalities_in_catalogue(self):
+        discover_facets(Project(name="NewMIP"), FACET_COUNTS)
+
+        entry = next(
+            project
+            for project in get_project_catalogue().values()
+            if project["name"] == "NewMIP"
+        )
+        assert entry["facet_cardinalities"]["variable_id"] == 3
+
+    def test_rediscovery_only_updates_cardinalities(self):
+        discover_facets(Project(name="NewMIP"), FACET_COUNTS)
+        facet_ids = set(
+            ProjectFacet.objects.filter(project__name="NewMIP").values_list(
+                "pk", flat=True
+            )
+        )
+
+        result = discover_facets(
+            Project.objects.get(name="NewMIP"),
+            {**FACET_COUNTS, "variable_id": ["tas", 3, "pr", 2]},
+        )
+
+        assert result["changes"]["project_facets"] == {
+            "created": 0,
+            "updated": 1,
+            "deleted": 0,
+        }
+        assert (
+            set(
+                ProjectFacet.objects.filter(
+                    project__name="NewMIP"
+                ).values_list("pk", flat=True)
+            )
+            == facet_ids
+        )
+        assert get_project_facets("NewMIP")["variable_id"][1] == 2
+
+    def test_leaves_facets_of_existing_project(self):
+        project = Project.objects.get(name="CMIP6")
+        facets = list(
+            ProjectFacet.objects.filter(project=project)
+            .order_by("pk")
+            .values_list("pk", "facet__name", "group__name")
+        )
+
+        result = discover_facets(project, FACET_COUNTS)
+
+        assert (
+            list(
+                ProjectFacet.objects.filter(project=project)
+                .order_by("pk")
+                .values_list("pk", "facet__name", "group__name")
+            )
+            == facets
+        )
+        assert get_project_facets("CMIP6")["activity_id"][1] == 2
+        assert result["unlisted"] == ["new_facet"]
+        assert result["changes"]["project_facets"]["created"] == 0
+
+    def test_rolls_back_project_if_cardinalities_fail(self):
+        with mock.patch(
+            "metagrid.projects.discovery.update_cardinalities",
+            side_effect=RuntimeError,
+        ):
+            with pytest.raises(RuntimeError):
+                discover_facets(Project(name="NewMIP"), FACET_COUNTS)
+
+        assert not Project.objects.filter(name="NewMIP").exists()
+
+    def test_dry_run(self):
+        result = discover_facets(
+            Project(name="NewMIP"), FACET_COUNTS, dry_run=True
+        )
+
+        assert "activity_id" in result["facets_by_group"]["General"]
+        assert not Project.objects.filter(name="NewMIP").exists()
+
+
+class TestDiscoverFacetsCommand:
+    def test_queries_index(self, settings, capsys):
+        settings.ESGF_SEARCH_URL = (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+        with mock.patch.object(
+            requests.Session, "get", return_value=make_search_response()
+        ) as mock_get:
+            call_command("discover_facets", "NewMIP", "--full-name", "New")
+
+        params = mock_get.call_args[1]["params"]
+        assert params["project"] == "NewMIP"
+        assert params["facets"] == "*"
+        assert params["limit"] == 0
+        assert "Populated 4 facets of NewMIP" in capsys.readouterr().out
+
+    def test_reads_file(self, tmp_path):
+        path = tmp_path / "response.json"
+        path.write_bytes(make_search_response().raw.read())
+
+        call_command("discover_facets", "NewMIP", "--from-file", str(path))
+
+        assert len(get_project_facets("NewMIP")) == 4
+
+    def test_updates_cardinalities_only(self, tmp_path, capsys):
+        path = tmp_path / "response.json"
+        path.write_bytes(
+            make_search_response(
+                {"activity_id": ["CMIP", 1], "unknown": ["a", 1]}
+            ).raw.read()
+        )
+        facet_count = ProjectFacet.objects.filter(
+            project__name="CMIP6"
+        ).count()
+
+        call_command(
+            "discover_facets",
+            "CMIP6",
+            "--from-file",
+            str(path),
+            "--cardinality-only",
+        )
+
+        facets = get_project_facets("CMIP6")
+        assert len(facets) == facet_count
+        assert facets["activity_id"][1] == 1
+        assert "Updated 1 cardinalities" in capsys.readouterr().out
+
+    def test_reports_unreachable_index(self, settings):
+        settings.ESGF_SEARCH_URL = (
+            "https://esgf-node.llnl.gov/esg-search/search/"
+        )
+        with mock.patch.object(
+            requests.Session, "get", side_effect=requests.ConnectionError()
+        ):
+            with pytest.raises(CommandError, match="ESGF index"):
+                call_command("discover_facets", "CMIP6")
@@ -0,0 +1,262 @@
+import json
+import os
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from metagrid.cart.tests.factories import SearchFactory
+from metagrid.projects.catalogue import (
+    CATALOGUE_CACHE_KEY,
+    get_project_catalogue,
+)
+from metagrid.projects.models import Facet, FacetGroup, Project, ProjectFacet
+from metagrid.projects.sync import (
+    InvalidSpec,
+    export_catalogue,
+    load_spec,
+    sync_catalogue,
+)
+
+pytestmark = pytest.mark.django_db
+
+CATALOGUE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "catalogue.yaml"
+)
+
+
+def make_spec(**projects):
+    return {
+        "version": 1,
+        "groups": {"General": "General facets"},
+        "projects": [
+            {
+                "name": name,
+                "full_name": f"{name} project",
+                "description": None,
+                "facets": facets,
+            }
+            for name, facets in projects.items()
+        ],
+    }
+
+
+def get_facet_names(project_name):
+    return list(
+        ProjectFacet.objects.filter(project__name=project_name)
+        .order_by("pk")
+        .values_list("group__name", "facet__name")
+    )
+
+
+class TestSyncCatalogue:
+    def test_shipped_catalogue_matches_migrations(self):
+        changes = sync_catalogue(load_spec(CATALOGUE_PATH))
+
+        assert not any(
+            sum(counts.values()) for counts in changes.values()
+        ), changes
+
+    def test_export_is_idempotent(self):
+        spec = export_catalogue()
+
+        changes = sync_catalogue(spec)
+
+        assert not any(sum(counts.values()) for counts in changes.values())
+
+    def test_creates_and_updates(self):
+        spec = make_spec(
+            NewMIP={"General": ["a_id", "b_id"], "Identifiers": ["c_id"]}
+        )
+        changes = sync_catalogue(spec)
+
+        assert changes["projects"]["created"] == 1
+        assert changes["facets"]["created"] == 3
+        assert changes["project_facets"]["created"] == 3
+        assert FacetGroup.objects.get(name="General").description == (
+            "General facets"
+        )
+        assert get_facet_names("NewMIP") == [
+            ("General", "a_id"),
+            ("General", "b_id"),
+            ("Identifiers", "c_id"),
+        ]
+
+        spec["projects"][0]["full_name"] = "Renamed"
+        spec["projects"][0]["facets"]["General"] = ["b_id", "a_id"]
+        changes = sync_catalogue(spec)
+
+        assert changes["projects"]["updated"] == 1
+        assert changes["project_facets"] == {
+            "created": 1,
+            "updated": 0,
+            "deleted": 1,
+        }
+        assert Project.objects.get(name="NewMIP").full_name == "Renamed"
+        assert get_facet_names("NewMIP") == [
+            ("General", "b_id"),
+            ("Identifiers", "c_id"),
+            ("General", "a_id"),
+        ]
+
+    def test_updates_facets_in_place(self):
+        spec = make_spec(NewMIP={"General": ["a_id", "b_id", "c_id"]})
+        sync_catalogue(spec)
+        ProjectFacet.objects.filter(project__name="NewMIP").update(
+            cardinality=5
+        )
+        a_id, b_id, c_id = ProjectFacet.objects.filter(
+            project__name="NewMIP"
+        ).order_by("pk")
+
+        spec["projects"][0]["facets"] = {
+            "General": ["a_id", "c_id", "b_id", "d_id"],
+            "Identifiers": [],
+        }
+        sync_catalogue(spec)
+        assert get_facet_names("NewMIP") == [
+            ("General", "a_id"),
+            ("General", "c_id"),
+            ("General", "b_id"),
+            ("General", "d_id"),
+        ]
+
+        spec["projects"][0]["facets"] = {
+            "General": ["c_id"],
+            "Identifiers": ["a_id"],
+        }
+        changes = sync_catalogue(spec)
+
+        assert changes["project_facets"] == {
+            "created": 0,
+            "updated": 1,
+            "deleted": 2,
+        }
+        project_facets = ProjectFacet.objects.filter(
+            project__name="NewMIP"
+        ).order_by("pk")
+        assert [
+            (project_facet.facet.name, project_facet.cardinality)
+            for project_facet in project_facets
+        ] == [("a_id", 5), ("c_id", 5)]
+        assert {project_facet.pk for project_facet in project_facets} == {
+            a_id.pk,
+            c_id.pk,
+        }
+        assert get_facet_names("NewMIP") == [
+            ("Identifiers", "a_id"),
+            ("General", "c_id"),
+        ]
+
+    def test_leaves_other_projects_unless_pruned(self):
+        SearchFactory(project=Project.objects.get(name="CMIP5"))
+        spec = make_spec(NewMIP={"General": ["a_id"]})
+
+        sync_catalogue(spec)
+        assert Project.objects.filter(name="CMIP5").exists()
+
+        changes = sync_catalogue(spec, prune=True)
+        assert list(Project.objects.values_list("name", flat=True)) == [
+            "NewMIP"
+        ]
+        assert changes["projects"]["deleted"] > 0
+        assert list(Facet.objects.values_list("name", flat=True)) == ["a_id"]
+        assert list(FacetGroup.objects.values_list("name", flat=True)) == [
+            "General"
+        ]
+
+    def test_dry_run(self):
+        changes = sync_catalogue(
+            make_spec(NewMIP={"General": ["a_id"]}), dry_run=True
+        )
+
+        assert changes["projects"]["created"] == 1
+        assert not Project.objects.filter(name="NewMIP").exists()
+
+    def test_invalidates_catalogue(self):
+        get_project_catalogue()
+
+        sync_catalogue(make_spec(NewMIP={"General": ["a_id"]}))
+
+        assert cache.get(CATALOGUE_CACHE_KEY) is None
+        assert "NewMIP" in [
+            project["name"] for project in get_project_catalogue().values()
+        ]
+
+    def test_runs_in_constant_queries(self, django_assert_max_num_queries):
+        spec = export_catalogue()
+        for project in spec["projects"]:
+            project["description"] = "Updated"
+            for facets in project["facets"].values():
+                facets.reverse()
+
+        with django_assert_max_num_queries(20):
+            sync_catalogue(spec)
+
+
+class TestLoadSpec:
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            [],
+            {"version": 2},
+            {"version": 1, "projects": [{"name": ""}]},
+            {"version": 1, "projects": [{"name": "A"}, {"name": "A"}]},
+            {
+                "version": 1,
+                "projects": [{"name": "A", "facets": {"G": ["a", "a"]}}],
+            },
+            {"version": 1, "projects": None},
+            {"version": 1, "projects": {"name": "A"}},
+            {"version": 1, "projects": ["A"]},
+            {"version": 1, "facets": ["a"]},
+            {"version": 1, "groups": "G"},
+            {"version": 1, "projects": [{"name": "A", "facets": ["a"]}]},
+            {"version": 1, "projects": [{"name": "A", "facets": {"G": None}}]},
+            {"version": 1, "projects": [{"name": "A", "facets": {"G": "a"}}]},
+            {"version": 1, "projects": [{"name": "A", "facets": {"G": [1]}}]},
+        ],
+    )
+    def test_rejects_invalid_specs(self, tmp_path, spec):
+        path = tmp_path / "catalogue.json"
+        path.write_text(json.dumps(spec))
+
+        with pytest.raises(InvalidSpec):
+            load_spec(str(path))
+
+
+class TestSyncProjectsCommand:
+    def test_syncs_json(self, tmp_path, capsys):
+        path = tmp_path / "catalogue.json"
+        path.write_text(json.dumps(make_spec(NewMIP={"General": ["a_id"]})))
+
+        call_command("sync_projects", str(path))
+
+        assert Project.objects.filter(name="NewMIP").exists()
+        assert "projects: 1 created" in capsys.readouterr().out
+
+    def test_exports(self, tmp_path):
+        path = tmp_path / "catalogue.yaml"
+
+        call_command("sync_projects", str(path), "--export")
+
+        assert load_spec(str(path)) == export_catalogue()
+
+    def test_reports_invalid_spec(self, tmp_path):
+        path = tmp_path / "catalogue.yaml"
+        path.write_text("version: 2\n")
+
+        with pytest.raises(CommandError, match="Unsupported spec version"):
+            call_command("sync_projects", str(path))
+
+    def test_reports_conflicting_project(self, tmp_path):
+        spec = make_spec(NewMIP={}, OtherMIP={})
+        spec["projects"][1]["full_name"] = spec["projects"][0]["full_name"]
+        path = tmp_path / "catalogue.json"
+        path.write_text(json.dumps(spec))
+
+        with pytest.raises(CommandError, match="Could not sync project Other"):
+            call_command("sync_projects", str(path))
+
+        assert not Project.objects.filter(name__in=["NewMIP", "OtherMIP"])
@@ -14,3 +14,8 @@ def test_detail():
     post = factories.ProjectFactory(name="CMIP6")
     result = reverse("project-detail", kwargs={"name": post.name})
     assert result == f"/api/v1/projects/{post.name}/"
+
+
+def test_facet_counts():
+    result = reverse("project-facet-counts", kwargs={"name": "CMIP6"})
+    assert result == "/api/v1/projects/CMIP6/facet-counts/"
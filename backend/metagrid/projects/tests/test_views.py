@@ -1,8 +1,15 @@
+import json
+from unittest import mock
+
 import pytest
+import requests
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from metagrid.api_proxy.tests.utils import make_response
 from metagrid.projects.tests import factories
 
 pytestmark = pytest.mark.django_db
@@ -20,9 +27,163 @@ class TestProjectsViewSet(APITestCase):
         # Check a list of Project objects are being returned
         assert len(response.data) > 0
 
+    def test_list_uses_fixed_number_of_queries(self):
+        list_url = reverse("project-list")
+        factories.ProjectFactory.create_batch(5)
+        # Warm up the project catalogue
+        self.client.get(list_url)
+
+        factories.ProjectFactory.create_batch(5)
+        self.client.get(list_url)
+
+        # Count and select of the paginated projects, wrapped in a savepoint
+        # since requests are atomic
+        with self.assertNumQueries(4):
+            response = self.client.get(list_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert all(
+            project["facets_url"] for project in response.data["results"]
+        )
+
+    def test_list_returns_requested_fields_only(self):
+        factories.ProjectFactory.create_batch(2)
+
+        with mock.patch(
+            "metagrid.projects.serializers.get_project_catalogue"
+        ) as get_project_catalogue:
+            response = self.client.get(
+                reverse("project-list"), {"fields": "pk,name"}
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert all(
+            set(project) == {"pk", "name"}
+            for project in response.data["results"]
+        )
+        # The facets of the projects are never computed
+        get_project_catalogue.assert_not_called()
+
     def test_detail(self):
         post = factories.ProjectFactory(name="CMIP6")
         detail_url = reverse("project-detail", kwargs={"name": post.name})
 
         response = self.client.get(detail_url)
         assert response.json().get("name") == post.name
+
+    def test_list_returns_etag_and_cache_headers(self):
+        list_url = reverse("project-list")
+        factories.ProjectFactory.create()
+
+        response = self.client.get(list_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"].startswith('"')
+        assert "public" in response["Cache-Control"]
+        assert "max-age" in response["Cache-Control"]
+
+    def test_list_returns_not_modified_without_queries(self):
+        list_url = reverse("project-list")
+        factories.ProjectFactory.create()
+        etag = self.client.get(list_url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert not response.content
+        assert not [q for q in queries if q["sql"].startswith("SELECT")]
+
+    def test_list_etag_changes_with_catalogue(self):
+        list_url = reverse("project-list")
+        project = factories.ProjectFactory.create()
+        etag = self.client.get(list_url)["ETag"]
+
+        project.full_name = "new full name"
+        project.save()
+
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_detail_returns_not_modified(self):
+        post = factories.ProjectFactory(name="CMIP6")
+        detail_url = reverse("project-detail", kwargs={"name": post.name})
+        etag = self.client.get(detail_url)["ETag"]
+
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_detail_not_found_has_no_etag(self):
+        detail_url = reverse("project-detail", kwargs={"name": "foo"})
+
+        response = self.client.get(detail_url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not response.has_header("ETag")
+
+
+class TestProjectFacetCounts(APITestCase):
+    def setUp(self):
+        self.project = factories.ProjectFactory(name="CMIP6")
+        self.url = reverse(
+            "project-facet-counts", kwargs={"name": self.project.name}
+        )
+
+        patcher = mock.patch.object(requests.Session, "get")
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_facet_counts_of_project(self):
+        self.mock_get.return_value = make_response(
+            json.dumps(
+                {
+                    "response": {"numFound": 1},
+                    "facet_counts": {"facet_fields": {"foo": ["bar", 1]}},
+                }
+            ).encode()
+        )
+
+        response = self.client.get(self.url, {"source_id": "foo"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "num_found": 1,
+            "facet_fields": {"foo": ["bar", 1]},
+        }
+        url = self.mock_get.call_args[0][0]
+        assert "project=CMIP6" in url
+        assert "source_id=foo" in url
+
+    def test_ignores_project_and_response_params(self):
+        self.mock_get.return_value = make_response(
+            json.dumps(
+                {
+                    "response": {"numFound": 1},
+                    "facet_counts": {"facet_fields": {"foo": ["bar", 1]}},
+                }
+            ).encode()
+        )
+
+        response = self.client.get(
+            self.url, {"project": "CMIP5", "expand": "x", "omit": "y"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        url = self.mock_get.call_args[0][0]
+        assert "project=CMIP6" in url
+        assert "CMIP5" not in url
+        assert "expand" not in url
+        assert "omit" not in url
+
+    def test_returns_not_found_for_unknown_project(self):
+        url = reverse("project-facet-counts", kwargs={"name": "foo"})
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_returns_bad_gateway_when_upstream_fails(self):
+        self.mock_get.return_value = make_response(status_code=500)
+
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
@@ -1,12 +1,111 @@
+import hashlib
+
+import requests
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from metagrid.api_proxy.exceptions import UpstreamTimeout, UpstreamUnavailable
+from metagrid.api_proxy.facets import get_facet_counts, get_facet_counts_query
 
+from .catalogue import get_project_catalogue, get_project_catalogue_version
 from .models import Project
 from .serializers import ProjectSerializer
 
 
 class ProjectsViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Project.objects.all().order_by("id").prefetch_related()
+    queryset = Project.objects.all().order_by("id")
     serializer_class = ProjectSerializer
     permission_classes = [AllowAny]
     lookup_field = "name"
+
+    def get_etag(self, request) -> str:
+        """Returns a strong ETag for the requested representation.
+
+        It is derived from the project catalogue version, so it can be
+        computed without touching the database.
+        """
+        representation = ":".join(
+            (
+                get_project_catalogue_version(),
+                request.get_full_path(),
+                request.accepted_media_type,
+            )
+        )
+        return quote_etag(hashlib.sha256(representation.encode()).hexdigest())
+
+    def get_conditional_response(self, request, view, *args, **kwargs):
+        """
+        Answers conditional GET requests with a 304 before any queries or
+        serialization are done, and sets the headers that let browsers and
+        proxies reuse the response.
+        """
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.PROJECTS_CATALOGUE_MAX_AGE,
+            )
+            patch_vary_headers(response, ("Accept",))
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    @action(detail=True, url_path="facet-counts")
+    def facet_counts(self, request, name=None):
+        """
+        Returns the facet value counts of a project from the ESGF Search API,
+        narrowed down by the active facets passed as query parameters.
+        """
+        project = next(
+            (
+                project
+                for project in get_project_catalogue().values()
+                if project["name"] == name
+            ),
+            None,
+        )
+        if project is None:
+            raise Http404
+        if not project["facets_url"]:
+            return Response({"num_found": 0, "facet_fields": {}})
+
+        filters = [
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        ]
+        query = get_facet_counts_query(project["facets_url"], filters)
+
+        try:
+            facet_counts = get_facet_counts(query)
+        except requests.Timeout:
+            raise UpstreamTimeout()
+        except (requests.RequestException, ValueError, KeyError):
+            raise UpstreamUnavailable()
+
+        return Response(facet_counts)
@@ -0,0 +1,110 @@
+"""
+Keycloak login with cached lookups.
+
+Every login through dj-rest-auth looks up the Keycloak SocialApp and asks
+Keycloak for the user's profile, so both are cached: the SocialApp until it
+changes (see metagrid.users.signals), and the profile of an access token for
+KEYCLOAK_USERINFO_TTL seconds. A burst of logins with the same token then
+reaches Keycloak once. The duration of each step of a login is logged.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
+from allauth.socialaccount.providers.keycloak.views import (
+    KeycloakOAuth2Adapter,
+)
+from django.conf import settings
+from django.core.cache import cache
+
+from metagrid.users import keycloak
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def log_duration(step: str):
+    """Logs the duration of a step of a Keycloak login."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started_at) * 1000
+        logger.info(f"Keycloak login: {step} took {elapsed:.1f} ms")
+
+
+def get_social_app_cache_key(provider: str) -> str:
+    return f"users:social_app:{provider}:{settings.SITE_ID}"
+
+
+def invalidate_social_apps():
+    cache.delete(get_social_app_cache_key(keycloak.PROVIDER))
+
+
+class SocialAccountAdapter(DefaultSocialAccountAdapter):
+    """Caches the SocialApp of a provider for the current site."""
+
+    def get_app(self, request, provider):
+        key = get_social_app_cache_key(provider)
+        app = cache.get(key)
+
+        if app is None:
+            with log_duration("social app lookup"):
+                app = super().get_app(request, provider)
+            cache.set(key, app, settings.SOCIAL_APP_CACHE_TTL)
+
+        return app
+
+
+class CachedKeycloakOAuth2Adapter(KeycloakOAuth2Adapter):
+    """Caches the Keycloak profile of each access token."""
+
+    def get_userinfo(self, token: str):
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        key = f"users:keycloak_userinfo:{digest}"
+        userinfo = cache.get(key)
+
+        if userinfo is None:
+            with log_duration("userinfo request"):
+                response = requests.post(
+                    self.profile_url,
+                    headers={"Authorization": f"Bearer {token}"},
+                    timeout=settings.KEYCLOAK_TIMEOUT,
+                )
+                response.raise_for_status()
+                userinfo = response.json()
+            cache.set(key, userinfo, settings.KEYCLOAK_USERINFO_TTL)
+
+        return userinfo
+
+    def complete_login(self, request, app, token, response):
+        extra_data = dict(self.get_userinfo(str(token)))
+        extra_data["id"] = extra_data.pop("sub")
+
+        return self.get_provider().sociallogin_from_response(
+            request, extra_data
+        )
+
+
+def warm_up():
+    """Loads the Keycloak lookups into the cache ahead of the first login.
+
+    Failures are only logged, since the lookups are retried on demand.
+    """
+    try:
+        with log_duration("warm-up"):
+            SocialAccountAdapter().get_app(None, keycloak.PROVIDER)
+            keycloak.get_jwks()
+    except Exception:
+        logger.exception("Failed to warm up the Keycloak lookups")
+
+
+def warm_up_in_background():
+    """Warms up the Keycloak lookups without delaying the worker's start."""
+    threading.Thread(
+        target=warm_up, name="keycloak-warm-up", daemon=True
+    ).start()
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = "metagrid.users"
+
+    def ready(self):
+        import metagrid.users.checks  # noqa F401
+        import metagrid.users.signals  # noqa F401
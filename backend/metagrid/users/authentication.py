@@ -0,0 +1,128 @@
+"""
+Authentication of API requests by JWT, resolving users through the cache.
+
+Authenticated requests only need the user that a token identifies, so the
+user is cached under the id in the token's claims instead of being loaded
+from the database on every request. Only the fields in CACHED_USER_FIELDS are
+cached, which leave out the password hash; it is loaded from the database if
+a request needs it.
+
+Cached users are invalidated when they are saved or deleted (see
+metagrid.users.signals), in the default cache. Deactivating a user therefore
+takes effect on its next request only if that cache is shared by every
+process (see metagrid.users.checks). Otherwise, and for bulk updates such as
+QuerySet.update(), which send no signals, it takes effect once the cached
+user expires, after USER_CACHE_TTL seconds.
+"""
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (
+    BaseAuthentication,
+    get_authorization_header,
+)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from metagrid.users import keycloak
+from metagrid.users.models import User
+
+
+# Fields of the users that are cached, which are all but the password hash
+CACHED_USER_FIELDS = tuple(
+    field.attname
+    for field in User._meta.concrete_fields
+    if field.attname != "password"
+)
+
+
+def get_user_cache_key(user_id) -> str:
+    return f"users:user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """Discards a cached user so that it is loaded on its next request.
+
+    It is discarded again once the current transaction commits, otherwise a
+    concurrent request could cache the user as it was before the commit.
+    """
+    key = get_user_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_cached_user(user_id) -> User:
+    """Returns an active user by id, loading it if it is not cached.
+
+    The password of the user is deferred, so saving the user leaves it as
+    it is.
+    """
+    key = get_user_cache_key(user_id)
+    values = cache.get(key)
+
+    # Users cached with other fields, e.g. before a deploy, are loaded again
+    if values is None or set(values) != set(CACHED_USER_FIELDS):
+        values = (
+            User.objects.filter(pk=user_id).values(*CACHED_USER_FIELDS).first()
+        )
+        if values is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        cache.set(key, values, settings.USER_CACHE_TTL)
+
+    user = User.from_db(
+        User.objects.db,
+        CACHED_USER_FIELDS,
+        [values[field] for field in CACHED_USER_FIELDS],
+    )
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
+
+
+class CachedJWTCookieAuthentication(JWTCookieAuthentication):
+    """
+    Authenticates users by the JWT in the 'Authorization' header or the
+    JWT_AUTH_COOKIE cookie, caching them for USER_CACHE_TTL seconds.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        return get_cached_user(user_id)
+
+
+class KeycloakTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates users by a Keycloak access token in the 'Authorization'
+    header, validated offline against the realm's cached signing keys.
+
+    Users are provisioned the first time their Keycloak subject is seen.
+    Tokens from other issuers are left to the other authentication classes.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if len(header) != 2 or header[0].decode() != self.keyword:
+            return None
+
+        token = header[1].decode()
+        if not keycloak.is_keycloak_token(token):
+            return None
+
+        try:
+            claims = keycloak.decode_token(token)
+            user_id = keycloak.get_user_id(claims)
+        except keycloak.InvalidKeycloakToken as e:
+            raise AuthenticationFailed(str(e), code="token_not_valid")
+
+        return (get_cached_user(user_id), claims)
+
+    def authenticate_header(self, request):
+        return f'{self.keyword} realm="api"'
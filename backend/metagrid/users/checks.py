@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_user_cache(app_configs, **kwargs):
+    """Warns when the users that authenticate requests are cached per process.
+
+    Saving or deleting a user only invalidates its cached copy in the cache
+    of the process that did it, so the other workers would keep authenticating
+    a deactivated user for up to USER_CACHE_TTL seconds.
+    """
+    if settings.USER_CACHE_TTL and isinstance(caches["default"], LocMemCache):
+        return [
+            Warning(
+                "Users are cached in the local memory of each process, so "
+                "deactivating a user only takes effect in the other "
+                "processes after USER_CACHE_TTL seconds.",
+                hint=(
+                    "Set DJANGO_CACHE_URL to a cache shared by the processes, "
+                    "or USER_CACHE_TTL to 0 to not cache users."
+                ),
+                id="users.W001",
+            )
+        ]
+    return []
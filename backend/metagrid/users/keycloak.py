@@ -0,0 +1,201 @@
+"""
+Offline validation of Keycloak access tokens.
+
+Tokens are verified against the signing keys (JWKS) of the Keycloak realm,
+which are fetched through its OpenID Connect discovery document. Both are
+cached and refreshed in the background before they go stale, so validating
+a token never waits on Keycloak unless nothing is cached yet or the token is
+signed with a key that has just been rotated in.
+https://openid.net/specs/openid-connect-discovery-1_0.html
+"""
+from functools import partial
+from typing import Any, Dict, Optional
+
+import jwt
+import requests
+from allauth.socialaccount.models import SocialAccount
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from metagrid.core.swr import get_or_refresh
+from metagrid.users.models import User
+
+CACHE_ALIAS = "default"
+PROVIDER = "keycloak"
+
+# Seconds before the JWKS can be reloaded again for an unknown key id, which
+# stops tokens with made-up key ids from hammering Keycloak
+UNKNOWN_KEY_RELOAD_INTERVAL = 60
+
+
+class InvalidKeycloakToken(Exception):
+    """Raised when a Keycloak access token fails validation."""
+
+
+def get_issuer() -> str:
+    provider = settings.SOCIALACCOUNT_PROVIDERS[PROVIDER]
+    return f"{provider['KEYCLOAK_URL']}/realms/{provider['KEYCLOAK_REALM']}"
+
+
+def fetch_json(url: str) -> Dict[str, Any]:
+    response = requests.get(url, timeout=settings.KEYCLOAK_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_cached_json(key: str, url: str) -> Dict[str, Any]:
+    return get_or_refresh(
+        CACHE_ALIAS,
+        key,
+        partial(fetch_json, url),
+        ttl=settings.KEYCLOAK_JWKS_TTL,
+        stale_ttl=settings.KEYCLOAK_JWKS_STALE_TTL,
+    )
+
+
+def get_openid_configuration() -> Dict[str, Any]:
+    return get_cached_json(
+        "keycloak:openid_configuration",
+        f"{get_issuer()}/.well-known/openid-configuration",
+    )
+
+
+def get_jwks() -> Dict[str, Any]:
+    return get_cached_json(
+        "keycloak:jwks", get_openid_configuration()["jwks_uri"]
+    )
+
+
+def find_key(jwks: Dict[str, Any], kid: str) -> Optional[Dict[str, Any]]:
+    return next((key for key in jwks["keys"] if key.get("kid") == kid), None)
+
+
+def get_signing_key(kid: str) -> Dict[str, Any]:
+    """Returns the JWK that a token's key id refers to.
+
+    Keys that are not in the cached JWKS may have just been rotated in, so
+    the JWKS is reloaded once, at most every UNKNOWN_KEY_RELOAD_INTERVAL
+    seconds.
+    """
+    key = find_key(get_jwks(), kid)
+
+    if key is None and cache.add(
+        "keycloak:jwks:reloaded", True, UNKNOWN_KEY_RELOAD_INTERVAL
+    ):
+        cache.delete("keycloak:jwks")
+        key = find_key(get_jwks(), kid)
+    if key is None:
+        raise InvalidKeycloakToken("Token is signed with an unknown key")
+
+    return key
+
+
+def is_keycloak_token(token: str) -> bool:
+    """Returns whether a token claims to be issued by the Keycloak realm.
+
+    The claims are read without verification, which only tells Keycloak
+    tokens apart from the tokens that this API issues itself.
+    """
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return False
+    return claims.get("iss") == get_issuer()
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Validates a Keycloak access token and returns its claims."""
+    try:
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid")
+        if not isinstance(kid, str):
+            raise InvalidKeycloakToken("The token does not name its key")
+        key = get_signing_key(kid)
+        claims = jwt.decode(
+            token,
+            key=jwt.PyJWK(key).key,
+            algorithms=[key.get("alg", "RS256")],
+            issuer=get_issuer(),
+            options={"require": ["exp", "iat", "sub"], "verify_aud": False},
+        )
+    except (jwt.InvalidTokenError, jwt.PyJWKError) as e:
+        raise InvalidKeycloakToken(str(e))
+    except (requests.RequestException, KeyError, ValueError):
+        raise InvalidKeycloakToken("The signing keys could not be fetched")
+
+    # Access tokens are issued to the client that requested them, which is
+    # named by 'azp' since their audience is the resource servers
+    if claims.get("azp") != settings.KEYCLOAK_CLIENT_ID:
+        raise InvalidKeycloakToken("Token was issued to another client")
+    return claims
+
+
+def get_user_id(claims: Dict[str, Any]) -> Any:
+    """Returns the id of a Keycloak subject's user, provisioning it if new.
+
+    New subjects are linked to the user with the same email address only if
+    Keycloak has verified it (see provision_user).
+    """
+    user_id = cache.get(f"users:keycloak:{claims['sub']}")
+    if user_id is None:
+        user_id = (
+            SocialAccount.objects.filter(provider=PROVIDER, uid=claims["sub"])
+            .values_list("user_id", flat=True)
+            .first()
+        )
+        if user_id is None:
+            user_id = provision_user(claims).pk
+
+        cache.set(
+            f"users:keycloak:{claims['sub']}",
+            user_id,
+            settings.USER_CACHE_TTL,
+        )
+    return user_id
+
+
+def provision_user(claims: Dict[str, Any]) -> User:
+    """Creates the user of a new Keycloak subject, or links it to a user.
+
+    A subject is only linked to the existing user with its email address if
+    Keycloak has verified the address and the user is not linked to another
+    Keycloak subject. Otherwise anyone who could register the address in the
+    realm would take over the user, with its carts and saved searches.
+    """
+    email = claims.get("email")
+    if not email:
+        raise InvalidKeycloakToken("Token has no email address")
+
+    try:
+        with transaction.atomic():
+            user = User.objects.filter(email__iexact=email).first()
+            if user is None:
+                user = User(
+                    email=User.objects.normalize_email(email),
+                    first_name=claims.get("given_name", ""),
+                    last_name=claims.get("family_name", ""),
+                )
+                user.set_unusable_password()
+                user.save()
+            elif claims.get("email_verified") is not True:
+                raise InvalidKeycloakToken(
+                    "Token's email address belongs to another user and is "
+                    "not verified"
+                )
+            elif SocialAccount.objects.filter(
+                user=user, provider=PROVIDER
+            ).exists():
+                raise InvalidKeycloakToken(
+                    "Token's email address belongs to another Keycloak user"
+                )
+            SocialAccount.objects.create(
+                user=user, provider=PROVIDER, uid=claims["sub"]
+            )
+    except IntegrityError:
+        # The subject was provisioned by a concurrent request
+        return SocialAccount.objects.get(
+            provider=PROVIDER, uid=claims["sub"]
+        ).user
+
+    return user
@@ -0,0 +1,191 @@
+import csv
+import json
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_datetime
+
+from metagrid.cart.models import Cart
+from metagrid.users.models import User
+
+# Fields of the users that can be imported
+FIELDS = (
+    "email",
+    "first_name",
+    "last_name",
+    "password",
+    "is_active",
+    "date_joined",
+)
+
+
+def read_users(path: str, file_format: str) -> List[Dict[str, Any]]:
+    """Reads users from a CSV file with a header row, or a JSON array."""
+    with open(path, newline="") as file:
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            rows = []
+            for row in reader:
+                # DictReader keys the columns beyond the header by None
+                if None in row:
+                    raise ValueError(
+                        f"Too many columns on line {reader.line_num}"
+                    )
+                rows.append(row)
+            return rows
+        users = json.load(file)
+
+    if not isinstance(users, list) or not all(
+        isinstance(user, dict) for user in users
+    ):
+        raise CommandError("The JSON file must hold an array of objects.")
+    return users
+
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+
+def build_user(row: Dict[str, Any]) -> User:
+    """Builds a user from an imported row, without saving it.
+
+    Passwords must already be hashed in a format of PASSWORD_HASHERS, since
+    hashing them here would dominate the import. Users without a password
+    get an unusable one and log in through Keycloak.
+    """
+    unknown_fields = set(row) - set(FIELDS)
+    if unknown_fields:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown_fields))}"
+        )
+
+    email = User.objects.normalize_email((row.get("email") or "").strip())
+    if not email:
+        raise ValueError("The email is missing")
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f"The email {email!r} is not valid")
+
+    password = row.get("password")
+    if password:
+        identify_hasher(password)
+    else:
+        password = make_password(None)
+
+    user = User(
+        email=email,
+        first_name=row.get("first_name") or "",
+        last_name=row.get("last_name") or "",
+        password=password,
+    )
+    if row.get("is_active") not in (None, ""):
+        user.is_active = parse_bool(row["is_active"])
+    if row.get("date_joined"):
+        date_joined = parse_datetime(row["date_joined"])
+        if date_joined is None:
+            raise ValueError("The date_joined is not a valid datetime")
+        user.date_joined = date_joined
+
+    return user
+
+
+def chunked(users: List[User], size: int) -> Iterator[List[User]]:
+    iterator = iter(users)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users, and creates their carts, from a CSV or JSON file in "
+        "bulk. Users whose email already exists are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the CSV or JSON file")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "json"),
+            help="Format of the file, which defaults to its extension",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users inserted per query",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.rsplit(".", 1)[-1].lower()
+        if file_format not in ("csv", "json"):
+            raise CommandError("Pass --format for files without extension.")
+
+        started_at = time.monotonic()
+        try:
+            rows = read_users(path, file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        users = {}  # type: Dict[str, User]
+        errors = []
+        for number, row in enumerate(rows, start=1):
+            try:
+                user = build_user(row)
+            except ValueError as e:
+                errors.append(f"Row {number}: {e}")
+                continue
+            # Repeated emails keep their first row
+            users.setdefault(user.email.lower(), user)
+
+        if errors:
+            raise CommandError(
+                "No users were imported, since rows are invalid:\n"
+                + "\n".join(errors[:20])
+            )
+
+        created = 0
+        with transaction.atomic():
+            for chunk in chunked(list(users.values()), options["chunk_size"]):
+                existing = set(
+                    User.objects.annotate(email_lower=Lower("email"))
+                    .filter(
+                        email_lower__in=[user.email.lower() for user in chunk]
+                    )
+                    .values_list("email_lower", flat=True)
+                )
+                new_users = [
+                    user
+                    for user in chunk
+                    if user.email.lower() not in existing
+                ]
+
+                # Ids are generated before the insert, so the carts can be
+                # created without reading the users back
+                User.objects.bulk_create(new_users)
+                Cart.objects.bulk_create(
+                    [Cart(user_id=user.id) for user in new_users]
+                )
+                created += len(new_users)
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {created} users with carts in {elapsed:.2f} s "
+                f"({created / elapsed if elapsed else 0:.0f} users/s), "
+                f"skipped {len(rows) - created} existing or repeated users"
+            )
+        )
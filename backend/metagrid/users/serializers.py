@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
+from metagrid.core.serializers import DynamicFieldsMixin
 from metagrid.users.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
@@ -0,0 +1,22 @@
+from allauth.socialaccount.models import SocialApp
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from metagrid.users.adapters import invalidate_social_apps
+from metagrid.users.authentication import invalidate_cached_user
+from metagrid.users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    """Invalidates the cached user that authenticates requests."""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=SocialApp)
+@receiver(post_delete, sender=SocialApp)
+@receiver(m2m_changed, sender=SocialApp.sites.through)
+def invalidate_social_app(sender, **kwargs):
+    """Invalidates the cached SocialApp that Keycloak logins look up."""
+    invalidate_social_apps()
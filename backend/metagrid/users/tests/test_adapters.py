@@ -0,0 +1,98 @@
+import logging
+from unittest import mock
+
+import pytest
+from allauth.socialaccount.models import SocialApp, SocialToken
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from metagrid.users import adapters, keycloak
+from metagrid.users.adapters import (
+    CachedKeycloakOAuth2Adapter,
+    SocialAccountAdapter,
+    get_social_app_cache_key,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+class TestSocialAccountAdapter:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get("/")
+
+    def test_caches_social_app(self, django_assert_num_queries):
+        app = SocialAccountAdapter().get_app(self.request, "keycloak")
+
+        with django_assert_num_queries(0):
+            cached_app = SocialAccountAdapter().get_app(
+                self.request, "keycloak"
+            )
+        assert cached_app == app
+
+    def test_invalidates_changed_social_app(self):
+        app = SocialAccountAdapter().get_app(self.request, "keycloak")
+
+        app.client_id = "other-client"
+        app.save()
+
+        assert cache.get(get_social_app_cache_key("keycloak")) is None
+        assert (
+            SocialAccountAdapter().get_app(self.request, "keycloak").client_id
+            == "other-client"
+        )
+
+    def test_invalidates_social_app_sites(self):
+        SocialAccountAdapter().get_app(self.request, "keycloak")
+
+        SocialApp.objects.get(provider="keycloak").sites.clear()
+
+        assert cache.get(get_social_app_cache_key("keycloak")) is None
+
+
+class TestCachedKeycloakOAuth2Adapter:
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get("/")
+        self.adapter = CachedKeycloakOAuth2Adapter(self.request)
+        patcher = mock.patch("requests.post")
+        self.mock_post = patcher.start()
+        self.mock_post.return_value.json.return_value = {
+            "sub": "subject-1",
+            "email": "jdoe@llnl.gov",
+        }
+        yield
+        patcher.stop()
+
+    def test_caches_userinfo_per_token(self, caplog):
+        app = SocialApp.objects.get(provider="keycloak")
+
+        with caplog.at_level(logging.INFO, logger=adapters.__name__):
+            for token in ("token-1", "token-1", "token-2"):
+                login = self.adapter.complete_login(
+                    self.request, app, SocialToken(token=token), None
+                )
+
+        assert self.mock_post.call_count == 2
+        assert login.account.uid == "subject-1"
+        assert login.account.extra_data["email"] == "jdoe@llnl.gov"
+        assert "Keycloak login: userinfo request took" in caplog.text
+
+
+class TestWarmUp:
+    def test_loads_lookups(self):
+        cache.clear()
+
+        with mock.patch.object(keycloak, "get_jwks") as mock_get_jwks:
+            adapters.warm_up()
+
+        mock_get_jwks.assert_called_once()
+        assert cache.get(get_social_app_cache_key("keycloak")) is not None
+
+    def test_logs_failures(self, caplog):
+        with mock.patch.object(keycloak, "get_jwks", side_effect=ValueError()):
+            adapters.warm_up()
+
+        assert "Failed to warm up" in caplog.text
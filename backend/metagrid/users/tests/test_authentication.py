@@ -0,0 +1,109 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from metagrid.users.authentication import (
+    get_cached_user,
+    get_user_cache_key,
+)
+from metagrid.users.checks import check_user_cache
+from metagrid.users.models import User
+from metagrid.users.tests.factories import UserFactory, raw_password
+
+pytestmark = pytest.mark.django_db
+
+
+class TestCachedJWTCookieAuthentication(APITestCase):
+    def setUp(self):
+        self.user = User.objects.get(pk=UserFactory().pk)
+        cache.delete(get_user_cache_key(self.user.pk))
+        self.client.cookies[settings.JWT_AUTH_COOKIE] = str(
+            AccessToken.for_user(self.user)
+        )
+        self.url = reverse("cart-detail", kwargs={"user": self.user.pk})
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    def test_caches_user(self):
+        first_queries = self.count_queries()
+
+        cached = cache.get(get_user_cache_key(self.user.pk))
+        assert cached["email"] == self.user.email
+        assert "password" not in cached
+        assert self.count_queries() == first_queries - 1
+
+    def test_loads_password_of_cached_user_when_needed(self):
+        self.count_queries()
+
+        user = get_cached_user(self.user.pk)
+        assert user == self.user
+        assert user.get_deferred_fields() == {"password"}
+        assert user.check_password(raw_password)
+
+    def test_saving_cached_user_keeps_password(self):
+        self.count_queries()
+
+        user = get_cached_user(self.user.pk)
+        user.first_name = "Jane"
+        user.save()
+
+        self.user.refresh_from_db()
+        assert self.user.first_name == "Jane"
+        assert self.user.check_password(raw_password)
+
+    def test_authenticates_with_header(self):
+        self.client.cookies.clear()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+        assert self.client.get(self.url).status_code == status.HTTP_200_OK
+
+    def test_save_invalidates_user(self):
+        self.count_queries()
+
+        self.user.first_name = "Jane"
+        self.user.save()
+
+        assert cache.get(get_user_cache_key(self.user.pk)) is None
+
+    def test_rejects_deactivated_user(self):
+        self.count_queries()
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_rejects_deleted_user(self):
+        self.count_queries()
+
+        self.user.delete()
+
+        response = self.client.get(self.url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestCheckUserCache:
+    def test_warns_about_cache_per_process(self, settings):
+        settings.USER_CACHE_TTL = 60
+
+        assert [warning.id for warning in check_user_cache(None)] == [
+            "users.W001"
+        ]
+
+    def test_passes_without_cached_users(self, settings):
+        settings.USER_CACHE_TTL = 0
+
+        assert check_user_cache(None) == []
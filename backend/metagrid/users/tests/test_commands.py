@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from metagrid.cart.models import Cart
+from metagrid.users.models import User
+from metagrid.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestImportUsers:
+    def test_imports_csv(self, tmp_path, capsys):
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "email,first_name,last_name,password,is_active,date_joined\n"
+            f"jdoe@llnl.gov,John,Doe,{make_password('secret')},true,"
+            "2019-01-01T00:00:00Z\n"
+            "jane@llnl.gov,Jane,Doe,,false,\n"
+        )
+
+        call_command("import_users", str(path), "--chunk-size", "1")
+
+        john = User.objects.get(email="jdoe@llnl.gov")
+        assert john.check_password("secret")
+        assert john.first_name == "John"
+        assert john.date_joined.year == 2019
+        jane = User.objects.get(email="jane@llnl.gov")
+        assert not jane.has_usable_password()
+        assert not jane.is_active
+        assert Cart.objects.filter(user__in=[john, jane]).count() == 2
+        assert "Imported 2 users with carts" in capsys.readouterr().out
+
+    def test_imports_json_and_skips_existing_users(self, tmp_path, capsys):
+        UserFactory(email="jdoe@llnl.gov")
+        path = tmp_path / "users.json"
+        path.write_text(
+            json.dumps(
+                [
+                    {"email": "JDOE@llnl.gov"},
+                    {"email": "new@llnl.gov"},
+                    {"email": "new@LLNL.gov"},
+                ]
+            )
+        )
+
+        call_command("import_users", str(path))
+
+        assert User.objects.count() == 2
+        assert Cart.objects.count() == 2
+        assert "skipped 2 existing or repeated users" in (
+            capsys.readouterr().out
+        )
+
+    @pytest.mark.parametrize(
+        "row",
+        [
+            {"email": ""},
+            {"email": "not an email"},
+            {"email": "jdoe@llnl.gov", "password": "plaintext"},
+            {"email": "jdoe@llnl.gov", "username": "jdoe"},
+            {"email": "jdoe@llnl.gov", "date_joined": "yesterday"},
+        ],
+    )
+    def test_rejects_invalid_rows(self, tmp_path, row):
+        path = tmp_path / "users.json"
+        path.write_text(json.dumps([{"email": "ok@llnl.gov"}, row]))
+
+        with pytest.raises(CommandError, match="Row 2"):
+            call_command("import_users", str(path))
+        assert not User.objects.exists()
+
+    def test_rejects_rows_with_too_many_columns(self, tmp_path):
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "email,first_name\n"
+            "jdoe@llnl.gov,John\n"
+            "jane@llnl.gov,Jane,Doe\n"
+        )
+
+        with pytest.raises(CommandError, match="Too many columns on line 3"):
+            call_command("import_users", str(path))
+        assert not User.objects.exists()
+
+    def test_requires_known_format(self, tmp_path):
+        path = tmp_path / "users.txt"
+        path.write_text("")
+
+        with pytest.raises(CommandError):
+            call_command("import_users", str(path))
@@ -0,0 +1,169 @@
+import json
+import time
+from unittest import mock
+
+import jwt
+import pytest
+import requests
+from allauth.socialaccount.models import SocialAccount
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache
+from django.urls import reverse
+from jwt.algorithms import RSAAlgorithm
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from metagrid.users import keycloak
+from metagrid.users.models import User
+from metagrid.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+JWKS_URI = "http://keycloak:8080/auth/realms/metagrid/certs"
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048
+    )
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    return private_key, {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+PRIVATE_KEY, JWK = make_key("key-1")
+
+
+def make_token(private_key=PRIVATE_KEY, kid="key-1", **claims):
+    now = int(time.time())
+    payload = {
+        "iss": keycloak.get_issuer(),
+        "azp": "backend",
+        "sub": "subject-1",
+        "iat": now,
+        "exp": now + 300,
+        "email": "jdoe@llnl.gov",
+        "given_name": "John",
+        "family_name": "Doe",
+        **claims,
+    }
+    return jwt.encode(
+        payload,
+        private_key,
+        algorithm="RS256",
+        headers={"kid": kid} if kid else None,
+    )
+
+
+class TestKeycloakTokenAuthentication(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.jwks = {"keys": [JWK]}
+        patcher = mock.patch.object(
+            keycloak, "fetch_json", side_effect=self.fetch_json
+        )
+        self.mock_fetch_json = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fetch_json(self, url):
+        if url.endswith("/.well-known/openid-configuration"):
+            return {"issuer": keycloak.get_issuer(), "jwks_uri": JWKS_URI}
+        return self.jwks
+
+    def get(self, token):
+        return self.client.get(
+            reverse("search-list"), HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+    def test_provisions_user(self):
+        response = self.get(make_token())
+
+        assert response.status_code == status.HTTP_200_OK
+        user = User.objects.get(email="jdoe@llnl.gov")
+        assert user.first_name == "John"
+        assert not user.has_usable_password()
+        assert SocialAccount.objects.get(uid="subject-1").user == user
+        assert hasattr(user, "cart")
+
+    def test_links_existing_user_by_verified_email(self):
+        user = UserFactory(email="jdoe@llnl.gov")
+
+        response = self.get(make_token(email_verified=True))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert User.objects.count() == 1
+        assert str(SocialAccount.objects.get().user_id) == str(user.pk)
+
+    def test_does_not_link_existing_user_by_unverified_email(self):
+        UserFactory(email="jdoe@llnl.gov")
+
+        for token in (make_token(), make_token(email_verified=False)):
+            response = self.get(token)
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert not SocialAccount.objects.exists()
+
+    def test_does_not_link_user_of_another_subject(self):
+        self.get(make_token())
+
+        response = self.get(make_token(sub="subject-2", email_verified=True))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert SocialAccount.objects.get().uid == "subject-1"
+
+    def test_caches_signing_keys(self):
+        self.get(make_token())
+        self.get(make_token())
+
+        assert self.mock_fetch_json.call_count == 2
+
+    def test_reloads_keys_for_rotated_key(self):
+        self.get(make_token())
+        private_key, jwk = make_key("key-2")
+        self.jwks = {"keys": [JWK, jwk]}
+
+        response = self.get(make_token(private_key, kid="key-2"))
+        assert response.status_code == status.HTTP_200_OK
+
+        # Unknown keys only trigger a reload once per interval
+        other_key, _ = make_key("key-3")
+        response = self.get(make_token(other_key, kid="key-3"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert self.mock_fetch_json.call_count == 3
+
+    def test_rejects_invalid_tokens(self):
+        other_key, _ = make_key("key-1")
+        tokens = [
+            make_token(other_key),
+            make_token(kid=None),
+            make_token(exp=int(time.time()) - 10),
+            make_token(azp="other-client"),
+            make_token(email=None),
+        ]
+
+        for token in tokens:
+            assert self.get(token).status_code == status.HTTP_401_UNAUTHORIZED
+        assert User.objects.count() == 0
+
+    def test_rejects_inactive_user(self):
+        self.get(make_token())
+        User.objects.get(email="jdoe@llnl.gov").save()
+        User.objects.filter(email="jdoe@llnl.gov").update(is_active=False)
+
+        assert self.get(make_token()).status_code == (
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_rejects_tokens_when_keycloak_is_unavailable(self):
+        self.mock_fetch_json.side_effect = requests.ConnectionError()
+
+        assert self.get(make_token()).status_code == (
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_leaves_other_tokens_to_jwt_authentication(self):
+        user = User.objects.get(pk=UserFactory().pk)
+
+        response = self.get(AccessToken.for_user(user))
+
+        assert response.status_code == status.HTTP_200_OK
+        self.mock_fetch_json.assert_not_called()
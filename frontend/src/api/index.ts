@@ -174,11 +174,14 @@ export const updateUserCart = async (
 export const fetchUserSearchQueries = async (
   accessToken: string
 ): Promise<{
-  count: number;
+  next: string | null;
+  previous: string | null;
   results: UserSearchQueries;
 }> => {
   return axios
     .get(apiRoutes.userSearches.path, {
+      // The full projects are needed to run the saved searches again
+      params: { expand: 'project' },
       headers: {
         Authorization: `Bearer ${accessToken}`,
       },
@@ -192,7 +195,8 @@ export const fetchUserSearchQueries = async (
     })
     .then((res) => {
       return res.data as Promise<{
-        count: number;
+        next: string | null;
+        previous: string | null;
         results: UserSearchQueries;
       }>;
     })
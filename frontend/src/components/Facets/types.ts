@@ -3,6 +3,7 @@ export type RawProject = {
   name: string;
   facetsByGroup: { [key: string]: string[] };
   facetsUrl: string;
+  facetCardinalities?: { [key: string]: number };
   fullName: string;
 };
 export type RawProjects = Array<RawProject>;